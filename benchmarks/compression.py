@@ -0,0 +1,118 @@
+#############################################################################
+# Copyright (c) 2018 Eli Polonsky. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#   * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   * See the License for the specific language governing permissions and
+#   * limitations under the License.
+#
+#############################################################################
+
+"""
+Compare the compression codecs available for stored revisions.
+
+For every supported format, a typical configuration file is generated and committed
+multiple times (changing a single key each time) into a fresh repository per codec.
+The bytes stored on disk and the latency of reading a revision back are reported.
+
+Usage:
+
+    python -m benchmarks.compression [--keys 500] [--revisions 50] [--storage full]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import timeit
+
+from prettytable import PrettyTable
+
+from dictfile.api import compression
+from dictfile.api import constants
+from dictfile.api import writer
+from dictfile.api.repository import Repository
+
+from benchmarks.fixtures import generate
+
+
+def disk_usage(directory):
+
+    total = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def run(fmt, codec, keys, revisions, storage):
+
+    temp_dir = tempfile.mkdtemp()
+
+    try:
+
+        file_path = os.path.join(temp_dir, 'config')
+        dictionary = generate(fmt, keys)
+        writer.dump(obj=dictionary, file_path=file_path, fmt=fmt)
+
+        repo = Repository(config_dir=temp_dir)
+        repo.configure(name='compression', value=codec)
+        repo.configure(name='storage', value=storage)
+        repo.add(alias='config', file_path=file_path, fmt=fmt)
+
+        for version in range(revisions):
+            section = dictionary['services'] if 'services' in dictionary else dictionary
+            key = random.choice(sorted(section.keys()))
+            if isinstance(section[key], dict):
+                section[key]['port'] = str(version)
+            else:
+                section[key] = str(version)
+            writer.dump(obj=dictionary, file_path=file_path, fmt=fmt)
+            repo.commit('config')
+
+        raw = os.path.getsize(file_path) * (revisions + 1)
+        stored = disk_usage(os.path.join(repo.root, '.objects'))
+
+        number = 20
+        latency = timeit.timeit(lambda: repo.contents('config', random.randint(0, revisions)),
+                                number=number) / number
+
+        return raw, stored, latency
+
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def main():
+
+    arg_parser = argparse.ArgumentParser(description=__doc__,
+                                         formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--keys', type=int, default=500)
+    arg_parser.add_argument('--revisions', type=int, default=50)
+    arg_parser.add_argument('--storage', default='full', choices=['full', 'delta'])
+    args = arg_parser.parse_args()
+
+    random.seed(0)
+
+    table = PrettyTable(field_names=['format', 'codec', 'raw bytes', 'stored bytes', 'ratio',
+                                     'read latency (ms)'])
+
+    for fmt in constants.SUPPORTED_FORMATS:
+        for codec in compression.names():
+            raw, stored, latency = run(fmt, codec, args.keys, args.revisions, args.storage)
+            table.add_row([fmt, codec, raw, stored, '{0:.3f}'.format(float(stored) / raw),
+                           '{0:.3f}'.format(latency * 1000)])
+
+    print(table.get_string())
+
+
+if __name__ == '__main__':
+    main()
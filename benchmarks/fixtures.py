@@ -0,0 +1,56 @@
+#############################################################################
+# Copyright (c) 2018 Eli Polonsky. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#   * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   * See the License for the specific language governing permissions and
+#   * limitations under the License.
+#
+#############################################################################
+
+"""
+Documents shared by the benchmarks.
+"""
+
+from dictfile.api import constants
+
+
+def generate(fmt, keys):
+
+    """
+    A document of the given format that describes a fleet of services.
+
+    Args:
+        fmt (str): The format of the document.
+        keys (int): The number of services, each has 4 keys.
+
+    Returns:
+        dict: The document, shaped the way the format requires (sections for ini, flat keys
+            for properties).
+    """
+
+    services = {}
+    for i in range(keys):
+        services['service{0}'.format(i)] = {
+            'host': '10.0.{0}.{1}'.format(i // 256 % 256, i % 256),
+            'port': str(8000 + i),
+            'enabled': 'true',
+            'description': 'service number {0} of the fleet'.format(i)
+        }
+
+    if fmt == constants.INI:
+        return services
+
+    if fmt == constants.PROPERTIES:
+        return {'{0}.{1}'.format(service, key): value
+                for service, values in services.items()
+                for key, value in values.items()}
+
+    return {'services': services}
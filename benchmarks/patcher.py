@@ -0,0 +1,112 @@
+#############################################################################
+# Copyright (c) 2018 Eli Polonsky. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#   * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   * See the License for the specific language governing permissions and
+#   * limitations under the License.
+#
+#############################################################################
+
+"""
+Compare the Patcher, which walks the native dictionary, with the FlatDict
+based implementation it replaced.
+
+The FlatDict path converts the entire document on construction and rebuilds it
+with 'as_dict' when done, so its cost grows with the document size even for a
+single 'get' or 'put'. flatdict is no longer a dependency, install it to run the comparison
+(pip install flatdict==3.0.0).
+
+Usage:
+
+    python -m benchmarks.patcher [--keys 50000] [--number 20]
+"""
+
+import argparse
+import copy
+import timeit
+
+from prettytable import PrettyTable
+
+from dictfile.api import constants
+from dictfile.api.patcher import Patcher
+
+from benchmarks.fixtures import generate
+
+try:
+    import flatdict
+except ImportError:
+    flatdict = None
+
+
+KEY = 'services:service7:port'
+
+
+def flatdict_get(dictionary):
+    fdict = flatdict.FlatDict(dictionary)
+    return fdict[KEY]
+
+
+def flatdict_put(dictionary):
+    fdict = flatdict.FlatDict(dictionary)
+    fdict[KEY] = 9000
+    return fdict.as_dict()
+
+
+def patcher_get(dictionary):
+    return Patcher(dictionary).get(KEY)
+
+
+def patcher_put(dictionary):
+    return Patcher(dictionary).set(KEY, '9000').finish()
+
+
+def main():
+
+    arg_parser = argparse.ArgumentParser(description=__doc__,
+                                         formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--keys', type=int, default=50000)
+    arg_parser.add_argument('--number', type=int, default=20)
+    args = arg_parser.parse_args()
+
+    if flatdict is None:
+        arg_parser.error('flatdict is not installed (pip install flatdict==3.0.0)')
+
+    # 4 keys per service
+    dictionary = generate(constants.JSON, args.keys // 4)
+
+    table = PrettyTable(field_names=['operation', 'flatdict (ms)', 'patcher (ms)', 'speedup'])
+
+    for operation, baseline, candidate in [('get', flatdict_get, patcher_get),
+                                           ('put', flatdict_put, patcher_put)]:
+
+        # 'put' modifies the dictionary in place, keep the original intact for the next operation
+        dictionary = copy.deepcopy(dictionary)
+
+        # warm up, e.g lazy imports
+        baseline(dictionary)
+        candidate(dictionary)
+
+        # pylint: disable=cell-var-from-loop
+        baseline_time = timeit.timeit(lambda: baseline(dictionary),
+                                      number=args.number) / args.number
+        candidate_time = timeit.timeit(lambda: candidate(dictionary),
+                                       number=args.number) / args.number
+
+        table.add_row([operation,
+                       '{0:.3f}'.format(baseline_time * 1000),
+                       '{0:.3f}'.format(candidate_time * 1000),
+                       '{0:.0f}x'.format(baseline_time / candidate_time)])
+
+    print(table.get_string())
+
+
+if __name__ == '__main__':
+    main()
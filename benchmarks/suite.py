@@ -0,0 +1,345 @@
+#############################################################################
+# Copyright (c) 2018 Eli Polonsky. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#   * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   * See the License for the specific language governing permissions and
+#   * limitations under the License.
+#
+#############################################################################
+
+"""
+Benchmark the hot paths of dictfile: parsing, writing, patching, the repository and
+complete command line invocations.
+
+Fixtures are generated for every format and size into a temporary directory. Each benchmark
+is called repeatedly for at least --min-time seconds, and the best (out of --repeat) time per
+call is reported along with the stored baseline. A benchmark slower than its baseline by more
+than --threshold fails the run (exit code 1), so the suite can guard against regressions.
+
+Baselines are machine specific, so they are not part of the source tree. Record them locally
+(on the machine the suite runs on) with --save, before making changes.
+
+Usage:
+
+    python -m benchmarks.suite [--sizes 1KB,100KB,1MB] [--formats json,yaml,properties,ini]
+                               [--filter parser] [--repeat 3] [--min-time 0.2]
+                               [--threshold 0.5] [--baselines benchmarks/baselines.json]
+                               [--save]
+
+Available sizes are 1KB, 10KB, 100KB, 1MB, 10MB and 100MB.
+"""
+
+import argparse
+import collections
+import copy
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import timeit
+
+from prettytable import PrettyTable
+
+from dictfile.api import constants
+from dictfile.api import log
+from dictfile.api import parser
+from dictfile.api import writer
+from dictfile.api.patcher import Patcher
+from dictfile.api.repository import Repository
+
+from benchmarks.fixtures import generate
+
+
+SIZES = collections.OrderedDict([
+    ('1KB', 1024),
+    ('10KB', 10 * 1024),
+    ('100KB', 100 * 1024),
+    ('1MB', 1024 * 1024),
+    ('10MB', 10 * 1024 * 1024),
+    ('100MB', 100 * 1024 * 1024)
+])
+
+DEFAULT_SIZES = ['1KB', '100KB', '1MB']
+
+DEFAULT_BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+
+# a benchmark slower than its baseline by more than this (relative) amount is a regression
+DEFAULT_THRESHOLD = 0.5
+
+# differences smaller than this (in seconds) are considered noise, whatever the relative change
+NOISE_FLOOR = 20e-6
+
+# the revisions committed before measuring the repository
+REVISIONS = 10
+
+ALIAS = 'config'
+
+# shared by all patchers, the same way the command line does. (a logger created per patcher
+# adds a handler every time, which makes every following call slower)
+LOGGER = log.Logger('{0}.benchmarks'.format(constants.PROGRAM_NAME))
+
+# runs the command line the same way the installed 'dictfile' script does
+CLI = [sys.executable, '-c', 'from dictfile.client import main; main()']
+
+
+def fixture(fmt, size):
+
+    """A document of the given format, that is roughly the given size when written."""
+
+    sample = 100
+    per_key = float(len(writer.dumps(generate(fmt, sample), fmt=fmt))) / sample
+
+    return generate(fmt, max(1, int(size / per_key)))
+
+
+def port_key(fmt):
+
+    # the key of a (single) value in the middle of the fixture
+    if fmt == constants.INI:
+        return 'service0:port'
+    if fmt == constants.PROPERTIES:
+        return 'service0.port'
+    return 'services:service0:port'
+
+
+class Benchmark(object):
+
+    """A function to time, with an optional (untimed) setup before each call.
+
+    Args:
+        name (str): The name of the benchmark, e.g 'parser.loads'.
+        fmt (str): The format of the fixture.
+        size (str): The size of the fixture, one of SIZES.
+        func (callable): The function to time.
+        setup (callable): Called before each call of the function.
+
+    """
+
+    def __init__(self, name, fmt, size, func, setup=None):
+        self.name = name
+        self.fmt = fmt
+        self.size = size
+        self.func = func
+        self.setup = setup
+
+    @property
+    def id(self):
+        return '{0}[{1}-{2}]'.format(self.name, self.fmt, self.size)
+
+    def measure(self, repeat, min_time):
+
+        """The best time per call (in seconds), out of 'repeat' rounds."""
+
+        timer = timeit.default_timer
+        best = None
+
+        for _ in range(repeat):
+
+            elapsed = 0.0
+            calls = 0
+
+            while calls == 0 or elapsed < min_time:
+                if self.setup is not None:
+                    self.setup()
+                start = timer()
+                self.func()
+                elapsed += timer() - start
+                calls += 1
+
+            per_call = elapsed / calls
+            best = per_call if best is None else min(best, per_call)
+
+        return best
+
+
+def benchmarks(fmt, size, directory):
+
+    """The benchmarks of a single fixture, the fixture files are created in 'directory'."""
+
+    dictionary = fixture(fmt, SIZES[size])
+    string = writer.dumps(dictionary, fmt=fmt)
+    key = port_key(fmt)
+
+    # a modified version of the file, so that every commit has something to commit
+    modified = parser.loads(string, fmt=fmt)
+    Patcher(modified, logger=LOGGER).set(key, '9000')
+    strings = itertools.cycle([writer.dumps(modified, fmt=fmt), string])
+
+    file_path = os.path.join(directory, 'config.{0}'.format(fmt))
+    with open(file_path, 'w') as stream:
+        stream.write(string)
+
+    repo = Repository(config_dir=directory, logger=LOGGER)
+    repo.add(alias=ALIAS, file_path=file_path, fmt=fmt)
+
+    def modify():
+        with open(file_path, 'w') as f:
+            f.write(next(strings))
+
+    for _ in range(REVISIONS):
+        modify()
+        repo.commit(alias=ALIAS)
+
+    # the command line keeps its (separate) repository in the home directory
+    environment = dict(os.environ, HOME=directory, USERPROFILE=directory)
+    cli_file_path = os.path.join(directory, 'cli.{0}'.format(fmt))
+    shutil.copy(file_path, cli_file_path)
+
+    def cli(*args):
+        with open(os.devnull, 'w') as devnull:
+            subprocess.check_call(CLI + list(args), env=environment, stdout=devnull)
+
+    cli('repository', 'add', '--alias', ALIAS, '--file-path', cli_file_path, '--fmt', fmt)
+
+    values = itertools.cycle(['9000', '9001'])
+
+    # 'set' modifies the dictionary in place, the other benchmarks need the original
+    patched = copy.deepcopy(dictionary)
+
+    return [
+        Benchmark('parser.loads', fmt, size, lambda: parser.loads(string, fmt=fmt)),
+        Benchmark('writer.dumps', fmt, size, lambda: writer.dumps(dictionary, fmt=fmt)),
+        Benchmark('patcher.get', fmt, size,
+                  lambda: Patcher(dictionary, logger=LOGGER).get(key, fmt=fmt)),
+        Benchmark('patcher.set', fmt, size,
+                  lambda: Patcher(patched, logger=LOGGER).set(key, next(values)).finish()),
+        Benchmark('repository.revisions', fmt, size, lambda: repo.revisions(alias=ALIAS)),
+        Benchmark('repository.files', fmt, size, repo.files),
+        Benchmark('repository.contents', fmt, size,
+                  lambda: repo.contents(alias=ALIAS, version=1)),
+        # last, since it adds revisions to the repository
+        Benchmark('repository.commit', fmt, size, lambda: repo.commit(alias=ALIAS),
+                  setup=modify),
+        Benchmark('cli.get', fmt, size,
+                  lambda: cli('configure', ALIAS, 'get', '--key', key)),
+        Benchmark('cli.put', fmt, size,
+                  lambda: cli('configure', ALIAS, 'put', '--key', key, '--value', next(values)))
+    ]
+
+
+def load_baselines(file_path):
+
+    if not os.path.exists(file_path):
+        return {}
+
+    with open(file_path) as stream:
+        return json.load(stream)
+
+
+def save_baselines(file_path, baselines):
+
+    with open(file_path, 'w') as stream:
+        json.dump(baselines, stream, indent=2, sort_keys=True)
+        stream.write('\n')
+
+
+def compare(current, baseline, threshold):
+
+    """
+    Compare a measurement with its baseline.
+
+    Returns:
+        tuple: The relative change (None if there is no baseline), and whether it is a
+            regression.
+    """
+
+    if not baseline:
+        return None, False
+
+    change = current / baseline - 1
+    return change, change > threshold and current - baseline > NOISE_FLOOR
+
+
+def main():
+
+    arg_parser = argparse.ArgumentParser(description=__doc__,
+                                         formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--sizes', default=','.join(DEFAULT_SIZES))
+    arg_parser.add_argument('--formats', default=','.join(constants.SUPPORTED_FORMATS))
+    arg_parser.add_argument('--filter', default='',
+                            help='Only run benchmarks whose id contains this string')
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    arg_parser.add_argument('--min-time', type=float, default=0.2)
+    arg_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    arg_parser.add_argument('--baselines', default=DEFAULT_BASELINES)
+    arg_parser.add_argument('--save', action='store_true',
+                            help='Store the results as the new baselines')
+    args = arg_parser.parse_args()
+
+    sizes = args.sizes.split(',')
+    formats = args.formats.split(',')
+
+    for size in sizes:
+        if size not in SIZES:
+            arg_parser.error('Unknown size: {0} (choose from {1})'.format(
+                size, ', '.join(SIZES)))
+
+    for fmt in formats:
+        if fmt not in constants.SUPPORTED_FORMATS:
+            arg_parser.error('Unknown format: {0} (choose from {1})'.format(
+                fmt, ', '.join(constants.SUPPORTED_FORMATS)))
+
+    baselines = load_baselines(args.baselines)
+
+    table = PrettyTable(field_names=['benchmark', 'time (ms)', 'baseline (ms)', 'change'])
+    table.align['benchmark'] = 'l'
+
+    results = {}
+    regressions = []
+
+    for fmt in formats:
+        for size in sizes:
+
+            directory = tempfile.mkdtemp()
+
+            try:
+                for benchmark in benchmarks(fmt, size, directory):
+
+                    if args.filter not in benchmark.id:
+                        continue
+
+                    current = benchmark.measure(repeat=args.repeat, min_time=args.min_time)
+                    baseline = baselines.get(benchmark.id)
+                    change, regression = compare(current, baseline, args.threshold)
+
+                    results[benchmark.id] = current
+                    if regression:
+                        regressions.append(benchmark.id)
+
+                    table.add_row([
+                        benchmark.id,
+                        '{0:.3f}'.format(current * 1000),
+                        '-' if baseline is None else '{0:.3f}'.format(baseline * 1000),
+                        '-' if change is None else '{0:+.0%}{1}'.format(
+                            change, ' (regression)' if regression else '')
+                    ])
+            finally:
+                shutil.rmtree(directory)
+
+    print(table.get_string())
+
+    if args.save:
+        baselines.update(results)
+        save_baselines(args.baselines, baselines)
+        print('Saved {0} baselines to {1}'.format(len(results), args.baselines))
+        return
+
+    if regressions:
+        print('{0} benchmarks regressed by more than {1:.0%}: {2}'.format(
+            len(regressions), args.threshold, ', '.join(regressions)))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
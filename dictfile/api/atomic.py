@@ -0,0 +1,258 @@
+#############################################################################
+# Copyright (c) 2018 Eli Polonsky. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#   * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   * See the License for the specific language governing permissions and
+#   * limitations under the License.
+#
+#############################################################################
+
+import contextlib
+import os
+import stat
+import tempfile
+import threading
+
+from dictfile.api import exceptions
+from dictfile.api import profiler
+
+# files are replaced atomically, but not flushed to disk.
+NONE = 'none'
+
+# files are flushed to disk before replacing the original.
+FILE = 'file'
+
+# files are flushed to disk, and so is the directory entry of the replaced file.
+FULL = 'full'
+
+DURABILITY_MODES = [NONE, FILE, FULL]
+
+DEFAULT_DURABILITY = FILE
+
+_local = threading.local()
+
+
+@contextlib.contextmanager
+def barrier(durability=DEFAULT_DURABILITY):
+
+    """
+    Group multiple writes into a single durability barrier.
+
+    Writes inside the barrier still replace their files atomically (and immediately), and
+    each file is flushed to disk before it replaces the original, so a crash never leaves a
+    truncated file behind. Flushing the directory entries of the replaced files, and the
+    files that were modified in place (see 'sync'), is deferred to the end of the barrier,
+    where every directory (and file) is flushed once, no matter how many times it was
+    written. Nested barriers join the outermost one.
+
+    Args:
+        durability (str): One of DURABILITY_MODES, applies to every write inside the barrier.
+    """
+
+    validate(durability)
+
+    if getattr(_local, 'barrier', None) is not None:
+        yield
+        return
+
+    pending = _Barrier(durability)
+    _local.barrier = pending
+
+    try:
+        yield
+    finally:
+        _local.barrier = None
+        # whatever was written is already visible, so even if the
+        # barrier is exited with an error, it is flushed.
+        with profiler.span(profiler.WRITE):
+            pending.flush()
+
+
+@profiler.profiled(profiler.WRITE)
+def write(file_path, contents, binary=False, durability=DEFAULT_DURABILITY):
+
+    """
+    Atomically replace the contents of a file.
+
+    The contents are written to a temporary file in the same directory, which then replaces
+    the file. That is, readers (and a crash) see either the old or the new contents, never
+    a partially written file. The permissions (and if possible, the owner) of an existing
+    file are preserved, and symbolic links are followed (the link target is replaced, not the
+    link). Hard links are not preserved, the file is replaced by a new one.
+
+    Args:
+        file_path (str): The file.
+        contents (str, bytes): The contents to write.
+        binary (bool): Whether the contents are bytes.
+        durability (str): One of DURABILITY_MODES, ignored inside a barrier.
+    """
+
+    file_path = os.path.realpath(file_path)
+    directory = os.path.dirname(file_path)
+
+    pending = getattr(_local, 'barrier', None)
+
+    if pending is None:
+        validate(durability)
+    else:
+        durability = pending.durability
+
+    fd, temp_path = tempfile.mkstemp(dir=directory,
+                                     prefix='.{0}.'.format(os.path.basename(file_path)))
+
+    try:
+
+        with os.fdopen(fd, 'wb' if binary else 'w') as stream:
+            stream.write(contents)
+            stream.flush()
+            # the contents must reach the disk before the rename does, otherwise a crash
+            # can leave an empty file in place of the original.
+            if durability != NONE:
+                os.fsync(stream.fileno())
+
+        _copy_ownership(file_path, temp_path)
+
+        _replace(temp_path, file_path)
+
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    if pending is not None:
+        pending.add_directory(directory)
+    elif durability == FULL:
+        _fsync_directory(directory)
+
+
+@profiler.profiled(profiler.WRITE)
+def sync(file_path, durability=DEFAULT_DURABILITY):
+
+    """
+    Flush a file that was modified in place (e.g appended to) to disk.
+
+    Args:
+        file_path (str): The file.
+        durability (str): One of DURABILITY_MODES, ignored inside a barrier.
+    """
+
+    pending = getattr(_local, 'barrier', None)
+
+    if pending is not None:
+        pending.add(os.path.realpath(file_path))
+        return
+
+    validate(durability)
+
+    if durability != NONE:
+        _fsync(file_path)
+
+    if durability == FULL:
+        _fsync_directory(os.path.dirname(os.path.realpath(file_path)))
+
+
+def validate(durability):
+
+    if durability not in DURABILITY_MODES:
+        raise exceptions.InvalidArgumentsException(
+            'durability must be one of: {0}'.format(', '.join(DURABILITY_MODES)))
+
+
+class _Barrier(object):
+
+    def __init__(self, durability):
+        self.durability = durability
+        self._files = []
+        self._directories = []
+
+    def add(self, file_path):
+        if file_path not in self._files:
+            self._files.append(file_path)
+        self.add_directory(os.path.dirname(file_path))
+
+    def add_directory(self, directory):
+        if directory not in self._directories:
+            self._directories.append(directory)
+
+    def flush(self):
+
+        if self.durability == NONE:
+            return
+
+        for file_path in self._files:
+            if os.path.exists(file_path):
+                _fsync(file_path)
+
+        if self.durability == FULL:
+            for directory in self._directories:
+                _fsync_directory(directory)
+
+
+def _copy_ownership(file_path, temp_path):
+
+    try:
+        original = os.stat(file_path)
+    except OSError:
+        # a new file gets the same permissions 'open' would have created it with.
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(temp_path, 0o666 & ~umask)
+        return
+
+    os.chmod(temp_path, stat.S_IMODE(original.st_mode))
+
+    if not hasattr(os, 'chown'):
+        return
+
+    temp = os.stat(temp_path)
+
+    if (temp.st_uid, temp.st_gid) != (original.st_uid, original.st_gid):
+        try:
+            os.chown(temp_path, original.st_uid, original.st_gid)
+        except OSError:
+            # only a privileged user can give away a file, the file is then owned
+            # by whoever replaced it.
+            pass
+
+
+def _replace(src, dst):
+
+    if hasattr(os, 'replace'):
+        os.replace(src, dst)
+        return
+
+    # python 2, rename does not replace an existing file on windows.
+    if os.name == 'nt' and os.path.exists(dst):
+        os.remove(dst)
+    os.rename(src, dst)
+
+
+def _fsync(file_path):
+
+    # windows only allows flushing files that are open for writing.
+    fd = os.open(file_path, os.O_RDWR if os.name == 'nt' else os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _fsync_directory(directory):
+
+    if os.name == 'nt':
+        # directories cannot be opened (nor flushed) on windows.
+        return
+
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
@@ -0,0 +1,101 @@
+#############################################################################
+# Copyright (c) 2018 Eli Polonsky. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#   * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   * See the License for the specific language governing permissions and
+#   * limitations under the License.
+#
+#############################################################################
+
+import os
+
+from dictfile.api import exceptions
+
+
+# use the libyaml bindings if available, otherwise the pure python implementation.
+AUTO = 'auto'
+
+# the pure python implementation.
+PYTHON = 'python'
+
+# the libyaml bindings, considerably faster on large documents.
+C = 'c'
+
+YAML_BACKENDS = [AUTO, PYTHON, C]
+
+# allows forcing a backend without changing code.
+YAML_BACKEND_ENV_VAR = 'DICTFILE_YAML_BACKEND'
+
+_yaml_backend = None
+
+
+def set_yaml_backend(backend):
+
+    """
+    Force a specific yaml backend.
+
+    Args:
+        backend (str): One of YAML_BACKENDS. If None, the backend is determined by the
+            DICTFILE_YAML_BACKEND environment variable, and defaults to 'auto'.
+    """
+
+    global _yaml_backend  # pylint: disable=global-statement
+
+    if backend is not None:
+        _validate(backend)
+
+    _yaml_backend = backend
+
+
+def yaml_backend():
+
+    """
+    The yaml backend in use.
+
+    Returns:
+        str: Either 'python' or 'c'.
+    """
+
+    import yaml
+
+    backend = _yaml_backend or os.environ.get(YAML_BACKEND_ENV_VAR) or AUTO
+
+    _validate(backend)
+
+    if backend == AUTO:
+        return C if yaml.__with_libyaml__ else PYTHON
+
+    if backend == C and not yaml.__with_libyaml__:
+        raise exceptions.InvalidArgumentsException(
+            'The yaml C backend requires PyYAML to be installed with libyaml bindings')
+
+    return backend
+
+
+def yaml_loader():
+
+    import yaml
+
+    return yaml.CSafeLoader if yaml_backend() == C else yaml.SafeLoader
+
+
+def yaml_dumper():
+
+    import yaml
+
+    return yaml.CSafeDumper if yaml_backend() == C else yaml.SafeDumper
+
+
+def _validate(backend):
+
+    if backend not in YAML_BACKENDS:
+        raise exceptions.InvalidArgumentsException(
+            'yaml backend must be one of: {0}'.format(', '.join(YAML_BACKENDS)))
@@ -0,0 +1,240 @@
+#############################################################################
+# Copyright (c) 2018 Eli Polonsky. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#   * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   * See the License for the specific language governing permissions and
+#   * limitations under the License.
+#
+#############################################################################
+
+import collections
+import hashlib
+import os
+import tempfile
+
+from six.moves import cPickle as pickle
+
+from dictfile.api import parser
+from dictfile.api import utils
+
+
+class ParseCache(object):
+
+    """
+    A persistent cache of parsed documents.
+
+    Parsed documents are pickled to disk, keyed by the hash of the document contents,
+    the format it was parsed with and the version of its parser (see parser.version).
+    Loading a pickle is considerably faster than parsing yaml, ini or properties,
+    so repeatedly parsing unchanged files becomes cheap.
+
+    Every lookup returns a fresh copy of the document, so callers are free to mutate it.
+
+    Recently used documents are also kept in memory (pickled), this helps long running
+    processes, like the server, avoid reading the same documents from disk again and again.
+
+    Args:
+        directory (str): The directory to store the cache in.
+        max_entries (int): The maximum number of documents to keep. When exceeded,
+            the least recently written documents are evicted, down to three quarters
+            of the maximum.
+    """
+
+    _directory = None
+    _max_entries = None
+    _memory = None
+    _entries = None
+
+    def __init__(self, directory, max_entries=256):
+        self._directory = directory
+        self._max_entries = max_entries
+        self._memory = collections.OrderedDict()
+        # the number of entries on disk, as far as this process knows. it is
+        # only counted (by listing the directory) once something is stored.
+        self._entries = None
+        utils.smkdir(self._directory)
+
+    @staticmethod
+    def hash(contents):
+
+        """
+        Compute the key of a document.
+
+        Args:
+            contents (bytes): The document contents.
+
+        Returns:
+            str: The key to use with 'get' and 'put'.
+        """
+
+        return hashlib.sha256(contents).hexdigest()
+
+    def get(self, key, fmt):
+
+        """
+        Retrieve a parsed document.
+
+        Args:
+            key (str): The hash of the document contents.
+            fmt (str): The format the document was parsed with.
+
+        Returns:
+            The parsed document, or None if it is not in the cache.
+        """
+
+        name = self._name(key, fmt)
+
+        pickled = self._memory.pop(name, None)
+
+        try:
+            if pickled is None:
+                with open(self._path(name), 'rb') as stream:
+                    pickled = stream.read()
+            parsed = pickle.loads(pickled)
+        except Exception:  # pylint: disable=broad-except
+            # a missing or corrupted entry is just a cache miss.
+            return None
+
+        self._remember(name, pickled)
+
+        return parsed
+
+    def put(self, key, fmt, parsed):
+
+        """
+        Store a parsed document.
+
+        Args:
+            key (str): The hash of the document contents.
+            fmt (str): The format the document was parsed with.
+            parsed: The parsed document.
+        """
+
+        name = self._name(key, fmt)
+
+        pickled = pickle.dumps(parsed, pickle.HIGHEST_PROTOCOL)
+
+        self._remember(name, pickled)
+
+        fd, temp_path = tempfile.mkstemp(dir=self._directory, prefix='.')
+        with os.fdopen(fd, 'wb') as stream:
+            stream.write(pickled)
+
+        try:
+            os.rename(temp_path, self._path(name))
+        except OSError:
+            # on windows, rename fails if someone else
+            # stored the same document in the meantime.
+            os.remove(temp_path)
+
+        if self._entries is None:
+            self._entries = len(self._list())
+        else:
+            # an overestimate if the entry already existed, which only makes eviction
+            # happen a bit earlier (the directory is listed again anyway).
+            self._entries += 1
+
+        if self._entries > self._max_entries:
+            self._evict()
+
+    def loads(self, string, fmt):
+
+        """
+        Same as parser.loads, only cached.
+        """
+
+        contents = string.encode('utf-8') if not isinstance(string, bytes) else string
+
+        key = self.hash(contents)
+
+        parsed = self.get(key, fmt)
+
+        if parsed is None:
+            parsed = parser.loads(string=string, fmt=fmt)
+            self.put(key, fmt, parsed)
+
+        return parsed
+
+    def load(self, file_path, fmt):
+
+        """
+        Same as parser.load, only cached.
+        """
+
+        with open(file_path, 'rb') as stream:
+            contents = stream.read()
+
+        key = self.hash(contents)
+
+        parsed = self.get(key, fmt)
+
+        if parsed is None:
+            # the contents are already in memory, no need to read the file again.
+            parsed = parser.load_contents(contents, file_path=file_path, fmt=fmt)
+            self.put(key, fmt, parsed)
+
+        return parsed
+
+    def store(self, file_path, fmt, parsed):
+
+        """
+        Store the parsed document of a file, so that loading the file is a cache hit.
+
+        Args:
+            file_path (str): The file, typically one that was just written.
+            fmt (str): The format of the file.
+            parsed: The document that parsing the file results in.
+        """
+
+        with open(file_path, 'rb') as stream:
+            contents = stream.read()
+
+        self.put(self.hash(contents), fmt, parsed)
+
+    def _remember(self, name, pickled):
+
+        self._memory[name] = pickled
+
+        while len(self._memory) > self._max_entries:
+            self._memory.popitem(last=False)
+
+    @staticmethod
+    def _name(key, fmt):
+        return '{0}-{1}-{2}'.format(key, fmt, parser.version(fmt))
+
+    def _path(self, name):
+        return os.path.join(self._directory, name)
+
+    def _list(self):
+        return [os.path.join(self._directory, name) for name in utils.lsf(self._directory)
+                if not name.startswith('.')]
+
+    def _evict(self):
+
+        # listing the directory is expensive with many entries, evicting more than
+        # needed leaves room for the next puts without listing it again.
+        entries = self._list()
+        keep = self._max_entries - self._max_entries // 4
+
+        if len(entries) > self._max_entries:
+
+            entries.sort(key=os.path.getmtime)
+
+            for entry in entries[:len(entries) - keep]:
+                try:
+                    os.remove(entry)
+                except OSError:
+                    # someone else evicted it
+                    pass
+
+            entries = entries[len(entries) - keep:]
+
+        self._entries = len(entries)
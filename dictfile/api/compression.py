@@ -0,0 +1,100 @@
+#############################################################################
+# Copyright (c) 2018 Eli Polonsky. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#   * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   * See the License for the specific language governing permissions and
+#   * limitations under the License.
+#
+#############################################################################
+
+import bz2
+import gzip
+import zlib
+
+import six
+
+from dictfile.api import exceptions
+
+
+NONE = 'none'
+ZLIB = 'zlib'
+GZIP = 'gzip'
+BZ2 = 'bz2'
+LZMA = 'lzma'
+
+_codecs = {}
+
+
+def register(name, compressor, decompressor):
+
+    """
+    Register a compression codec.
+
+    Args:
+        name (str): The codec name, this is what the 'compression' repository setting refers to.
+        compressor (function): Accepts bytes and returns the compressed bytes.
+        decompressor (function): Accepts compressed bytes and returns the original bytes.
+    """
+
+    if not name or '\n' in name:
+        raise exceptions.InvalidArgumentsException('Illegal codec name: {0}'.format(name))
+
+    _codecs[name] = (compressor, decompressor)
+
+
+def names():
+
+    return sorted(_codecs.keys())
+
+
+def compress(data, codec):
+
+    return _get(codec)[0](data)
+
+
+def decompress(data, codec):
+
+    return _get(codec)[1](data)
+
+
+def _get(codec):
+
+    try:
+        return _codecs[codec]
+    except KeyError:
+        raise exceptions.InvalidArgumentsException('Unknown codec: {0}'.format(codec))
+
+
+def _gzip_compress(data):
+
+    stream = six.BytesIO()
+    with gzip.GzipFile(fileobj=stream, mode='wb', mtime=0) as gzip_file:
+        gzip_file.write(data)
+    return stream.getvalue()
+
+
+def _gzip_decompress(data):
+
+    with gzip.GzipFile(fileobj=six.BytesIO(data), mode='rb') as gzip_file:
+        return gzip_file.read()
+
+
+register(NONE, lambda data: data, lambda data: data)
+register(ZLIB, zlib.compress, zlib.decompress)
+register(GZIP, _gzip_compress, _gzip_decompress)
+register(BZ2, bz2.compress, bz2.decompress)
+
+try:
+    import lzma
+    register(LZMA, lzma.compress, lzma.decompress)
+except ImportError:
+    # lzma is only part of the standard library starting python 3.3
+    pass
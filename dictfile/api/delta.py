@@ -0,0 +1,196 @@
+#############################################################################
+# Copyright (c) 2018 Eli Polonsky. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#   * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   * See the License for the specific language governing permissions and
+#   * limitations under the License.
+#
+#############################################################################
+
+import bisect
+import difflib
+import json
+
+# regions without unique lines are matched with difflib (which takes quadratic time),
+# as long as they are at most this many lines in both blobs multiplied.
+MATCHER_LIMIT = 10000
+
+
+def diff(base, target):
+
+    """
+    Compute a line based delta that transforms one blob into another.
+
+    The delta is a json list of instructions, each instruction is either a [start, end]
+    pair, meaning 'copy lines start to end from the base', or a list of strings,
+    meaning 'insert these lines'. Lines are split on the raw bytes, so the blobs may be
+    in any encoding, inserted lines are stored as latin-1 strings (which map every byte
+    to a single character).
+
+    Lines are matched the way patience diff matches them, the common leading and trailing
+    lines first, then the lines that appear exactly once in both blobs anchor the rest.
+    This takes roughly linear time, however many lines repeat.
+
+    Args:
+        base (bytes): The blob to compute the delta against.
+        target (bytes): The blob to compute the delta to.
+
+    Returns:
+        bytes: The delta.
+    """
+
+    base_lines = base.splitlines(True)
+    target_lines = target.splitlines(True)
+
+    instructions = []
+
+    end = 0
+    for i, j, size in _matching_blocks(base_lines, target_lines):
+        if j > end:
+            instructions.append([line.decode('latin-1') for line in target_lines[end:j]])
+        if size:
+            instructions.append([i, i + size])
+        end = j + size
+
+    return json.dumps(instructions, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def patch(base, delta):
+
+    """
+    Apply a delta created by 'diff'.
+
+    Args:
+        base (bytes): The blob the delta was computed against.
+        delta (bytes): The delta.
+
+    Returns:
+        bytes: The target blob.
+    """
+
+    base_lines = base.splitlines(True)
+
+    target_lines = []
+
+    for instruction in json.loads(delta.decode('utf-8')):
+        if instruction and isinstance(instruction[0], int):
+            start, end = instruction
+            target_lines.extend(base_lines[start:end])
+        else:
+            target_lines.extend(line.encode('latin-1') for line in instruction)
+
+    return b''.join(target_lines)
+
+
+def _matching_blocks(a, b):
+
+    # (i, j, size) triples, meaning a[i:i + size] == b[j:j + size], in increasing order and
+    # terminated by (len(a), len(b), 0), like difflib's. the regions left to match are kept
+    # in a list rather than recursed into, since there may be as many as there are lines.
+    blocks = []
+    regions = [(0, len(a), 0, len(b))]
+
+    while regions:
+
+        alo, ahi, blo, bhi = regions.pop()
+
+        size = 0
+        while alo + size < ahi and blo + size < bhi and a[alo + size] == b[blo + size]:
+            size += 1
+        if size:
+            blocks.append((alo, blo, size))
+            alo, blo = alo + size, blo + size
+
+        size = 0
+        while alo < ahi - size and blo < bhi - size and a[ahi - size - 1] == b[bhi - size - 1]:
+            size += 1
+        if size:
+            blocks.append((ahi - size, bhi - size, size))
+            ahi, bhi = ahi - size, bhi - size
+
+        if alo == ahi or blo == bhi:
+            continue
+
+        anchors = _anchors(a, alo, ahi, b, blo, bhi)
+
+        # without anchors, a large region is replaced as a whole.
+        if not anchors:
+            if (ahi - alo) * (bhi - blo) <= MATCHER_LIMIT:
+                matcher = difflib.SequenceMatcher(a=a[alo:ahi], b=b[blo:bhi], autojunk=False)
+                blocks.extend((alo + i, blo + j, size)
+                              for i, j, size in matcher.get_matching_blocks() if size)
+            continue
+
+        for i, j in anchors:
+            blocks.append((i, j, 1))
+            regions.append((alo, i, blo, j))
+            alo, blo = i + 1, j + 1
+
+        regions.append((alo, ahi, blo, bhi))
+
+    blocks.sort()
+
+    merged = []
+    for i, j, size in blocks:
+        if merged and merged[-1][0] + merged[-1][2] == i and merged[-1][1] + merged[-1][2] == j:
+            merged[-1][2] += size
+        else:
+            merged.append([i, j, size])
+
+    merged.append([len(a), len(b), 0])
+
+    return merged
+
+
+def _anchors(a, alo, ahi, b, blo, bhi):
+
+    # the longest (ordered) sequence of lines that appear exactly once in both regions,
+    # as (i, j) pairs.
+    counts = {}
+    for i in range(alo, ahi):
+        counts[a[i]] = counts.get(a[i], 0) + 1
+
+    positions = {}
+    for j in range(blo, bhi):
+        if counts.get(b[j]) == 1:
+            # None marks a line that appears more than once in b.
+            positions[b[j]] = None if b[j] in positions else j
+
+    pairs = [(i, positions[a[i]]) for i in range(alo, ahi)
+             if counts[a[i]] == 1 and positions.get(a[i]) is not None]
+
+    return _longest_increasing(pairs)
+
+
+def _longest_increasing(pairs):
+
+    # patience sorting, the pairs are ordered by i, find the longest increasing run of j.
+    tails = []
+    tail_positions = []
+    links = []
+    for index, (_, j) in enumerate(pairs):
+        length = bisect.bisect_left(tail_positions, j)
+        links.append(tails[length - 1] if length else -1)
+        if length == len(tails):
+            tails.append(index)
+            tail_positions.append(j)
+        else:
+            tails[length] = index
+            tail_positions[length] = j
+
+    result = []
+    index = tails[-1] if tails else -1
+    while index >= 0:
+        result.append(pairs[index])
+        index = links[index]
+    result.reverse()
+
+    return result
@@ -0,0 +1,1108 @@
+#############################################################################
+# Copyright (c) 2018 Eli Polonsky. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#   * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   * See the License for the specific language governing permissions and
+#   * limitations under the License.
+#
+#############################################################################
+
+import json
+import re
+
+import six
+
+from dictfile.api import atomic
+from dictfile.api import backend
+from dictfile.api import constants
+from dictfile.api import exceptions
+from dictfile.api import keypath
+from dictfile.api import parser
+from dictfile.api import profiler
+from dictfile.api import writer
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+_STR_TAG = 'tag:yaml.org,2002:str'
+
+# inline yaml values are never wrapped
+_UNLIMITED_WIDTH = 2 ** 30
+
+# splicing a yaml document requires composing it, which with the pure python implementation
+# costs more than dumping the document entirely. so beyond this size, yaml documents are only
+# spliced if the libyaml bindings are available.
+PYTHON_YAML_SPLICE_LIMIT = 64 * 1024
+
+
+def dump(obj, file_path, fmt, changes, durability=atomic.DEFAULT_DURABILITY):
+
+    """
+    Write a patched document, only rewriting the text of the keys that were changed.
+
+    Everything else in the file (order, indentation, comments, quoting) is kept as is.
+    If the changes cannot be applied to the text, the document is written entirely,
+    the same way 'writer.dump' does.
+
+    Args:
+        obj (dict): The patched document.
+        file_path (str): The file the document was loaded from.
+        fmt (str): The format of the file.
+        changes (list): The (operation, key) pairs that modified the document,
+            see Patcher.changes.
+        durability (str): One of atomic.DURABILITY_MODES.
+
+    Returns:
+        bool: Whether the text was edited. If so, every change was verified, and parsing the
+            file results in the patched document.
+    """
+
+    with open(file_path) as stream:
+        string = stream.read()
+
+    edited = edit(string, fmt=fmt, obj=obj, changes=changes)
+
+    if edited is None:
+        writer.dump(obj=obj, file_path=file_path, fmt=fmt, durability=durability)
+        return False
+
+    atomic.write(file_path, edited, durability=durability)
+    return True
+
+
+@profiler.profiled(profiler.SERIALIZE)
+def edit(string, fmt, obj, changes):
+
+    """
+    Apply the changes made to a document onto its text.
+
+    The text is parsed once, and the changes are applied as replacements of spans of the
+    original text: the text of a deleted key is removed, the text of any other modified key
+    is replaced (or inserted) with its value in the patched document. Each replacement is
+    verified by parsing the text it results in (and not the entire document). Since only the
+    last occurrence of a repeated key is loaded, the text of a mapping that repeats a key is
+    never edited.
+
+    Args:
+        string (str): The text the document was loaded from.
+        fmt (str): The format of the text.
+        obj (dict): The patched document.
+        changes (list): The (operation, key) pairs that modified the document,
+            see Patcher.changes.
+
+    Returns:
+        str: The edited text, or None if the changes cannot be applied to the text
+            (or if applying them costs more than writing the document entirely).
+    """
+
+    editors = {
+        constants.JSON: _JsonEditor,
+        constants.YAML: _YamlEditor,
+        constants.INI: _IniEditor,
+        constants.PROPERTIES: _PropertiesEditor
+    }
+
+    if fmt not in editors:
+        raise exceptions.UnsupportedFormatException(fmt=fmt)
+
+    if fmt == constants.YAML and len(string) > PYTHON_YAML_SPLICE_LIMIT and \
+            backend.yaml_backend() == backend.PYTHON:
+        return None
+
+    try:
+
+        targets = _targets(obj, changes)
+
+        if not targets:
+            return string
+
+        document = editors[fmt](string, obj)
+
+        # keys whose text was written with their final value
+        written = []
+
+        for operation, steps in targets:
+
+            if any(steps[:len(prefix)] == prefix for prefix in written):
+                # written along with one of its parents
+                continue
+
+            if operation == 'delete':
+                document.delete(steps)
+            else:
+                written.append(steps[:document.set(steps)])
+
+        return document.text()
+
+    except _CannotEdit:
+        return None
+
+
+def _targets(obj, changes):
+
+    # what has to be written for the text to reflect the changes, regardless of the order
+    # they were made in: the final value of every modified key that exists in the patched
+    # document, and the removal of every deleted key that does not.
+    targets = []
+
+    for operation, key in changes:
+
+        steps = keypath.parse(key).steps
+
+        if operation == 'delete':
+            if not _exists(obj, steps[:-1]):
+                # its parent was deleted as well
+                continue
+            if isinstance(_value(obj, steps[:-1]), list):
+                # the following elements shift, the list is written entirely
+                target = ('put', steps[:-1])
+            elif _exists(obj, steps):
+                # deleted and then added again
+                target = ('put', steps)
+            else:
+                target = ('delete', steps)
+        elif _exists(obj, steps):
+            target = ('put', steps)
+        else:
+            # deleted afterwards, but the parents it created (if any) remain. the
+            # closest remaining one is written entirely.
+            parents = [steps[:depth] for depth in range(len(steps) - 1, 0, -1)
+                       if _exists(obj, steps[:depth])]
+            if not parents:
+                continue
+            target = ('put', parents[0])
+
+        if target not in targets:
+            targets.append(target)
+
+    puts = [steps for operation, steps in targets if operation == 'put']
+
+    # keys whose parent is written entirely don't need to be written on their own
+    return [(operation, steps) for operation, steps in targets
+            if not any(len(put) < len(steps) and steps[:len(put)] == put for put in puts)]
+
+
+def _loads(string, fmt, expected):
+
+    # whether a piece of text results in the expected value
+    try:
+        return parser.loads(string, fmt=fmt) == expected
+    except Exception:  # pylint: disable=broad-except
+        return False
+
+
+def _exists(obj, steps):
+
+    try:
+        _value(obj, steps)
+        return True
+    except _CannotEdit:
+        return False
+
+
+def _value(obj, steps):
+
+    # the value at the first levels of a key
+    try:
+        for part, index in steps:
+            obj = obj[index] if isinstance(obj, list) else obj[part]
+        return obj
+    except (KeyError, IndexError, TypeError):
+        raise _CannotEdit()
+
+
+def _repeated(root, children):
+
+    # whether an object is reachable from the root more than once
+    seen = set()
+    pending = [root]
+
+    while pending:
+        item = pending.pop()
+        if id(item) in seen:
+            return True
+        seen.add(id(item))
+        pending.extend(children(item))
+
+    return False
+
+
+def _duplicated(names):
+
+    # whether a key appears more than once in a mapping. only its last occurrence is loaded,
+    # so replacing (or removing) the text of one occurrence may reveal another.
+    return len(set(names)) != len(names)
+
+
+def _line_start(string, position):
+    return string.rfind('\n', 0, position) + 1
+
+
+def _line_end(string, position):
+
+    # the position after the line break ending the line
+    end = string.find('\n', position)
+    return len(string) if end == -1 else end + 1
+
+
+def _indentation(string, position):
+
+    start = _line_start(string, position)
+    return string[start:_WHITESPACE.match(string, start).end()].split('\n')[0]
+
+
+class _CannotEdit(Exception):
+    pass
+
+
+class _Splices(object):
+
+    """
+    Replacements of spans of a text, applied all at once.
+
+    Spans refer to the original text, so they can be computed from a single parse of it.
+    A replacement of a span that is covered by another replacement is dropped, it is
+    written along with the larger span. Replacements that partially overlap cannot be applied.
+    Insertions at the same position are applied by their order, and then in the order
+    they were added.
+
+    """
+
+    def __init__(self, string):
+        self._string = string
+        self._splices = []
+
+    def add(self, start, end, text, check=None, order=0):
+
+        """
+        Replace a span of the text.
+
+        Args:
+            start (int): The start of the span.
+            end (int): The end of the span (exclusive), the same as 'start' for an insertion.
+            text (str): The replacement.
+            check (callable): Verifies the replacement, returns False if it is wrong.
+            order (int): Orders insertions at the same position.
+        """
+
+        for splice in list(self._splices):
+
+            if self._covers(splice, start, end):
+                return
+
+            if self._covers((start, end), splice[0], splice[1]):
+                self._splices.remove(splice)
+            elif start < splice[1] and splice[0] < end:
+                raise _CannotEdit()
+
+        self._splices.append((start, end, order, text, check))
+
+    def text(self):
+
+        """
+        The text, with all the replacements applied.
+
+        Raises:
+            _CannotEdit: If any of the replacements is wrong.
+        """
+
+        if not all(check() for _, _, _, _, check in self._splices if check is not None):
+            raise _CannotEdit()
+
+        pieces = []
+        position = 0
+
+        # sorting is stable, insertions of the same order keep the order they were added in.
+        for start, end, _, text, _ in sorted(self._splices, key=lambda splice: splice[:3]):
+            pieces.append(self._string[position:start])
+            pieces.append(text)
+            position = end
+
+        pieces.append(self._string[position:])
+
+        return ''.join(pieces)
+
+    @staticmethod
+    def _covers(outer, start, end):
+
+        if outer[0] == outer[1]:
+            return False
+
+        if start == end:
+            # an insertion at either edge of the span is not covered by it
+            return outer[0] < start < outer[1]
+
+        return outer[0] <= start and end <= outer[1]
+
+
+class _JsonEditor(object):
+
+    def __init__(self, string, obj):
+
+        self._string = string
+        self._obj = obj
+        self._decoder = json.JSONDecoder()
+        self._splices = _Splices(string)
+        self._members_cache = {}
+
+        try:
+            start = _WHITESPACE.match(string).end()
+            self._root = {'key': start, 'start': start, 'end': self._end(start)}
+        except (ValueError, IndexError):
+            raise _CannotEdit()
+
+    def text(self):
+        return self._splices.text()
+
+    def set(self, steps):
+
+        frames = self._locate(steps)
+
+        if len(frames) == len(steps) + 1:
+            # an existing key, only its value is replaced. a (non empty) collection keeps
+            # its layout.
+            container, member = frames[-2], frames[-1]
+            if self._string[member['start']] in '{[' and \
+                    self._string[member['start'] + 1:member['end'] - 1].strip():
+                container = member
+            value = _value(self._obj, steps)
+            text = self._render(value, member['start'], container)
+            self._splices.add(member['start'], member['end'], text,
+                              check=lambda: _loads(text, constants.JSON, value))
+            return len(steps)
+
+        depth = len(frames) - 1
+        container = frames[-1]
+
+        if self._string[container['start']] != '{':
+            raise _CannotEdit()
+
+        members = self._members(container['start'])
+
+        if not members:
+            # nothing to align with, the (once empty) object is rendered entirely.
+            value = _value(self._obj, steps[:depth])
+            text = self._render(value, container['start'],
+                                {'start': 0, 'end': len(self._string)})
+            self._splices.add(container['start'], container['end'], text,
+                              check=lambda: _loads(text, constants.JSON, value))
+            return depth
+
+        name = steps[depth][0]
+        value = _value(self._obj, steps[:depth + 1])
+        last = members[-1]
+
+        if self._multiline(container):
+            indentation = _indentation(self._string, last['key'])
+            member = '\n{0}{1}: {2}'.format(indentation, json.dumps(name),
+                                            self._render(value, last['key'], container))
+        else:
+            member = ' {0}: {1}'.format(json.dumps(name),
+                                        self._render(value, last['key'], container))
+
+        self._splices.add(last['end'], last['end'], ',' + member,
+                          check=lambda: _loads('{' + member + '}', constants.JSON,
+                                               {name: value}))
+        return depth + 1
+
+    def delete(self, steps):
+
+        frames = self._locate(steps)
+
+        if len(frames) < len(steps) + 1:
+            return
+
+        container, member = frames[-2], frames[-1]
+
+        if self._string[container['start']] != '{':
+            raise _CannotEdit()
+
+        remaining = _value(self._obj, steps[:-1])
+
+        if not remaining:
+            self._splices.add(container['start'] + 1, container['end'] - 1, '')
+            return
+
+        members = self._members(container['start'])
+        position = [item['end'] for item in members].index(member['end'])
+
+        if any(item['name'] in remaining for item in members[position + 1:]):
+            # the member is removed along with the separator following it
+            self._splices.add(member['key'], members[position + 1]['key'], '')
+        elif position > 0:
+            # the member is one of the last ones, and is removed along with the
+            # separator preceding it
+            self._splices.add(members[position - 1]['end'], member['end'], '')
+        else:
+            raise _CannotEdit()
+
+    def _locate(self, steps):
+
+        # the text spans of the existing levels of a key, starting with the document itself.
+        try:
+            frames = [self._root]
+
+            for part, index in steps:
+
+                container = frames[-1]['start']
+                found = None
+
+                if self._string[container] == '{':
+                    for member in self._members(container):
+                        if member['name'] == part:
+                            found = member
+                elif self._string[container] == '[' and index is not None:
+                    elements = self._elements(container)
+                    if index < len(elements):
+                        found = elements[index]
+
+                if found is None:
+                    break
+
+                frames.append(found)
+
+            return frames
+
+        except (ValueError, IndexError):
+            raise _CannotEdit()
+
+    def _members(self, start):
+
+        # the text is never modified, so each container is scanned at most once.
+        members = self._members_cache.get(start)
+
+        if members is None:
+            members = self._members_cache[start] = list(self._scan_members(start))
+            if _duplicated([member['name'] for member in members]):
+                raise _CannotEdit()
+
+        return members
+
+    def _scan_members(self, start):
+
+        position = self._skip(start + 1)
+
+        if self._string[position] == '}':
+            return
+
+        while True:
+
+            key = position
+            name, position = json.decoder.scanstring(self._string, position + 1)
+            position = self._expect(self._skip(position), ':')
+            value = self._skip(position)
+            end = self._end(value)
+
+            yield {'name': name, 'key': key, 'start': value, 'end': end}
+
+            position = self._skip(end)
+            if self._string[position] == '}':
+                return
+            position = self._skip(self._expect(position, ','))
+
+    def _elements(self, start):
+
+        elements = []
+        position = self._skip(start + 1)
+
+        if self._string[position] == ']':
+            return elements
+
+        while True:
+
+            end = self._end(position)
+
+            elements.append({'key': position, 'start': position, 'end': end})
+
+            position = self._skip(end)
+            if self._string[position] == ']':
+                return elements
+            position = self._skip(self._expect(position, ','))
+
+    def _render(self, value, position, container):
+
+        if not self._multiline(container):
+            return json.dumps(value, sort_keys=True)
+
+        # nested lines are aligned with the line the value starts at
+        indentation = _indentation(self._string, position)
+        return json.dumps(value, sort_keys=True, indent=2).replace('\n', '\n' + indentation)
+
+    def _multiline(self, container):
+        return '\n' in self._string[container['start']:container['end']]
+
+    def _skip(self, position):
+        return _WHITESPACE.match(self._string, position).end()
+
+    def _expect(self, position, char):
+        if self._string[position] != char:
+            raise ValueError('Expecting {0!r} at {1}'.format(char, position))
+        return position + 1
+
+    def _end(self, position):
+        _, end = self._decoder.raw_decode(self._string, position)
+        return end
+
+
+class _YamlEditor(object):
+
+    def __init__(self, string, obj):
+
+        import yaml
+
+        self._yaml = yaml
+        self._string = string
+        self._obj = obj
+        self._splices = _Splices(string)
+
+        try:
+            self._root = yaml.compose(string, Loader=backend.yaml_loader())
+        except yaml.YAMLError:
+            raise _CannotEdit()
+
+        if not isinstance(self._root, yaml.MappingNode):
+            raise _CannotEdit()
+
+        # the text of a node that is referenced elsewhere (by an alias) cannot be replaced
+        # on its own.
+        if _repeated(self._root, self._children):
+            raise _CannotEdit()
+
+    def text(self):
+        return self._splices.text()
+
+    def set(self, steps):
+
+        frames = self._locate(steps)
+        flow = any(node.flow_style for _, node in frames if not self._scalar(node))
+
+        if len(frames) == len(steps) + 1:
+            # an existing key, only its value is replaced
+            key, node = frames[-1]
+            self._replace(key, node, _value(self._obj, steps), flow)
+            return len(steps)
+
+        depth = len(frames) - 1
+        _, node = frames[-1]
+
+        if not isinstance(node, self._yaml.MappingNode):
+            raise _CannotEdit()
+
+        if node.flow_style:
+            self._replace_inline(node, _value(self._obj, steps[:depth]))
+            return depth
+
+        name = steps[depth][0]
+        value = _value(self._obj, steps[:depth + 1])
+
+        column = node.start_mark.column
+        position = _line_end(self._string, self._end(node))
+        entry = '{0}{1}{2}\n'.format(' ' * column, self._inline(name),
+                                     self._mapped(value, column))
+
+        text = entry
+        if position == len(self._string) and not self._string.endswith('\n'):
+            text = '\n' + entry
+
+        # a key of a nested mapping ending at the same position is inserted before the
+        # keys of its parents.
+        self._splices.add(position, position, text,
+                          check=lambda: self._loads(entry, column, {name: value}),
+                          order=-column)
+        return depth + 1
+
+    def delete(self, steps):
+
+        frames = self._locate(steps)
+
+        if len(frames) < len(steps) + 1:
+            return
+
+        key, node = frames[-1]
+        parent_key, parent = frames[-2]
+
+        if parent.flow_style:
+            self._replace_inline(parent, _value(self._obj, steps[:-1]))
+            return
+
+        remaining = _value(self._obj, steps[:-1])
+
+        if not remaining:
+            # the parent is left empty, every deletion of its keys replaces it the same way.
+            if parent_key is None:
+                self._replace_inline(parent, remaining, end=self._end(parent))
+            else:
+                self._replace_entry(parent_key, parent_key.end_mark.index, self._end(parent),
+                                    ': ' + self._inline(remaining), remaining)
+            return
+
+        first = node if key is None else key
+        start = _line_start(self._string, first.start_mark.index)
+        prefix = self._string[start:first.start_mark.index].strip()
+
+        # only entire lines are removed
+        if prefix != ('-' if key is None else ''):
+            raise _CannotEdit()
+
+        self._splices.add(start, _line_end(self._string, self._end(node)), '')
+
+    def _locate(self, steps):
+
+        # the (key, value) nodes of the existing levels of a key, starting with the document.
+        frames = [(None, self._root)]
+
+        for part, index in steps:
+
+            _, node = frames[-1]
+            found = None
+
+            if isinstance(node, self._yaml.MappingNode):
+                if _duplicated([key.value for key, _ in node.value if self._scalar(key)]):
+                    raise _CannotEdit()
+                for key, value in node.value:
+                    if self._scalar(key) and key.tag == _STR_TAG and key.value == part:
+                        found = (key, value)
+            elif isinstance(node, self._yaml.SequenceNode) and index is not None:
+                if index < len(node.value):
+                    found = (None, node.value[index])
+
+            if found is None:
+                break
+
+            frames.append(found)
+
+        return frames
+
+    def _replace(self, key, node, value, flow):
+
+        start = node.start_mark.index
+        end = self._end(node)
+
+        if flow or not self._block(value):
+            if key is not None and self._block_node(node):
+                # the value moves to the line of its key
+                self._replace_entry(key, key.end_mark.index, end, ': ' + self._inline(value),
+                                    value)
+            else:
+                self._replace_inline(node, value, end=end)
+            return
+
+        column = node.start_mark.column
+
+        if key is None:
+            text = self._render_block(value, column)
+            self._splices.add(start, end, text,
+                              check=lambda: self._loads(' ' * column + text, column, value))
+            return
+
+        if self._block_node(node) and (column > key.start_mark.column or
+                                       isinstance(value, list)):
+            self._replace_entry(key, start, end, self._render_block(value, column), value)
+            return
+
+        # the value moves to its own lines, indented under its key. a comment
+        # following the key is kept in place.
+        line_end = _line_end(self._string, end)
+        trailing = self._string[end:line_end]
+        indentation = key.start_mark.column + 2
+
+        if not trailing.endswith('\n'):
+            trailing += '\n'
+
+        self._replace_entry(key, key.end_mark.index, line_end, ':{0}{1}{2}\n'.format(
+            trailing, ' ' * indentation, self._render_block(value, indentation)), value)
+
+    def _replace_inline(self, node, value, end=None):
+
+        text = self._inline(value)
+        end = node.end_mark.index if end is None else end
+
+        self._splices.add(node.start_mark.index, end, text,
+                          check=lambda: self._loads(text, 0, value))
+
+    def _replace_entry(self, key, start, end, text, value):
+
+        # the lines of the key and its value, as a mapping of their own. whatever precedes
+        # the key on its line (e.g the indicator of a sequence entry) is not part of it.
+        column = key.start_mark.column
+        entry = ' ' * column + self._string[key.start_mark.index:start] + text + \
+            self._string[end:_line_end(self._string, end - 1)]
+
+        self._splices.add(start, end, text,
+                          check=lambda: self._loads(entry, column, {key.value: value}))
+
+    def _loads(self, text, column, expected):
+
+        # whether lines indented (at least) by the given column result in the expected value
+        lines = []
+
+        for line in text.splitlines(True):
+            if line[:column].strip():
+                return False
+            lines.append(line[column:])
+
+        return _loads(''.join(lines), constants.YAML, expected)
+
+    def _mapped(self, value, column):
+
+        # the text following a key
+        if not self._block(value):
+            return ': ' + self._inline(value)
+
+        indentation = column + 2
+        return ':\n{0}{1}'.format(' ' * indentation, self._render_block(value, indentation))
+
+    def _end(self, node):
+
+        # the end of a block collection is the end of its last value, and not the
+        # start of whatever follows it.
+        if self._block_node(node):
+            last = node.value[-1]
+            return self._end(last[1] if isinstance(last, tuple) else last)
+
+        end = node.end_mark.index
+
+        if self._scalar(node) and node.style in ('|', '>'):
+            while self._string[end - 1] == '\n':
+                end -= 1
+
+        return end
+
+    def _inline(self, value):
+
+        self._unaliased(value)
+
+        text = self._yaml.dump([value], Dumper=backend.yaml_dumper(),
+                               default_flow_style=True, width=_UNLIMITED_WIDTH)
+        return text.strip()[1:-1]
+
+    def _render_block(self, value, column):
+
+        self._unaliased(value)
+
+        text = self._yaml.dump(value, Dumper=backend.yaml_dumper(), default_flow_style=False)
+        return text.rstrip('\n').replace('\n', '\n' + ' ' * column)
+
+    def _children(self, node):
+        if isinstance(node, self._yaml.MappingNode):
+            return [child for pair in node.value for child in pair]
+        return node.value if isinstance(node, self._yaml.SequenceNode) else []
+
+    @staticmethod
+    def _unaliased(value):
+
+        # a value that contains the same object twice is dumped with anchors, which
+        # cannot be defined more than once in the document.
+        def collections(item):
+            items = item.values() if isinstance(item, dict) else item
+            return [child for child in items if isinstance(child, (dict, list))]
+
+        if isinstance(value, (dict, list)) and _repeated(value, collections):
+            raise _CannotEdit()
+
+    def _scalar(self, node):
+        return isinstance(node, self._yaml.ScalarNode)
+
+    def _block_node(self, node):
+        return not self._scalar(node) and not node.flow_style and node.value
+
+    @staticmethod
+    def _block(value):
+        return isinstance(value, (dict, list)) and len(value) > 0
+
+
+class _IniEditor(object):
+
+    def __init__(self, string, obj):
+
+        import configparser
+
+        self._string = string
+        self._obj = obj
+        self._splices = _Splices(string)
+        self._lines = string.splitlines(True)
+        self._sections = []
+
+        # the position of every line in the text, and of its end
+        self._offsets = [0]
+        for line in self._lines:
+            self._offsets.append(self._offsets[-1] + len(line))
+
+        # lines that are terminated with a line break, before something is inserted after them
+        self._terminated = set()
+        self._appended = False
+
+        section_pattern = configparser.ConfigParser.SECTCRE
+        option_pattern = configparser.ConfigParser.OPTCRE
+
+        # the option the previous line belongs to (if any)
+        option = {}
+
+        for number, line in enumerate(self._lines):
+
+            stripped = line.strip()
+            indentation = len(line) - len(line.lstrip())
+
+            if not stripped or stripped[0] in '#;':
+                continue
+
+            if option and indentation > option['indentation']:
+                # a continuation of a multi-line value
+                option['end'] = number + 1
+                self._sections[-1]['end'] = number + 1
+                continue
+
+            option = {}
+            match = section_pattern.match(stripped)
+
+            if match:
+                self._sections.append({'name': match.group('header'), 'start': number,
+                                       'end': number + 1, 'options': []})
+                continue
+
+            match = option_pattern.match(stripped)
+
+            if not match or not self._sections:
+                raise _CannotEdit()
+
+            option = {'name': match.group('option').rstrip().lower(),
+                      'start': number,
+                      'end': number + 1,
+                      'indentation': indentation,
+                      'delimiter': indentation + match.end('option'),
+                      'value': indentation + match.start('value')}
+
+            self._sections[-1]['options'].append(option)
+            self._sections[-1]['end'] = number + 1
+
+    def text(self):
+        return self._splices.text()
+
+    def set(self, steps):
+
+        if len(steps) == 1:
+            section = self._section(steps[0][0])
+            if section is not None:
+                raise _CannotEdit()
+            self._append(steps[0][0], _value(self._obj, steps))
+            return 1
+
+        if len(steps) != 2:
+            raise _CannotEdit()
+
+        name, key = steps[0][0], steps[1][0]
+        section = self._section(name)
+
+        if section is None:
+            self._append(name, _value(self._obj, steps[:1]))
+            return 1
+
+        value = self._render(_value(self._obj, steps))
+        option = self._option(section, key)
+
+        if option is not None:
+            line = self._lines[option['start']]
+            text = '{0}{1}\n'.format(line[:option['value']], value)
+            self._splices.add(self._offsets[option['start']], self._offsets[option['end']],
+                              text, check=lambda: self._loads(name, text, {option['name']: value}))
+            return 2
+
+        delimiter = '='
+
+        if section['options']:
+            # aligned with the delimiter of the other options
+            last = section['options'][-1]
+            delimiter = self._lines[last['start']][last['delimiter']:last['value']]
+
+        text = '{0}{1}{2}\n'.format(key, delimiter, value)
+        self._insert(section['end'], text, check=lambda: self._loads(name, text,
+                                                                       {key.lower(): value}))
+        return 2
+
+    def delete(self, steps):
+
+        if len(steps) == 1:
+            section = self._section(steps[0][0])
+            if section is not None:
+                following = [other['start'] for other in self._sections
+                             if other['start'] > section['start']]
+                end = following[0] if following else len(self._lines)
+                self._splices.add(self._offsets[section['start']], self._offsets[end], '')
+            return
+
+        if len(steps) != 2:
+            raise _CannotEdit()
+
+        section = self._section(steps[0][0])
+        option = None if section is None else self._option(section, steps[1][0])
+
+        if option is not None:
+            self._splices.add(self._offsets[option['start']], self._offsets[option['end']], '')
+
+    def _append(self, name, options):
+
+        if not isinstance(options, dict):
+            raise _CannotEdit()
+
+        options = dict((key, self._render(value)) for key, value in options.items())
+        text = '[{0}]\n{1}'.format(name, ''.join('{0}={1}\n'.format(key, value)
+                                                 for key, value in options.items()))
+        expected = dict((key.lower(), value) for key, value in options.items())
+
+        if self._appended or (self._lines and self._lines[-1].strip()):
+            # separated from the section preceding it
+            text = '\n' + text
+
+        self._appended = True
+
+        # sections are appended after the options inserted into the last section
+        self._insert(len(self._lines), text, check=lambda: self._loads(name, text, expected),
+                     order=1)
+
+    def _insert(self, number, text, check, order=0):
+
+        if number > 0 and not self._lines[number - 1].endswith('\n') and \
+                number not in self._terminated:
+            self._terminated.add(number)
+            self._splices.add(self._offsets[number], self._offsets[number], '\n', order=-1)
+
+        self._splices.add(self._offsets[number], self._offsets[number], text, check=check,
+                          order=order)
+
+    def _section(self, name):
+
+        if name == 'DEFAULT':
+            # its options are shared by all sections
+            raise _CannotEdit()
+
+        for section in self._sections:
+            if section['name'] == name:
+                return section
+
+        return None
+
+    @staticmethod
+    def _option(section, key):
+
+        found = None
+
+        for option in section['options']:
+            if option['name'] == key.lower():
+                found = option
+
+        return found
+
+    @staticmethod
+    def _loads(name, text, options):
+
+        if not text.lstrip().startswith('['):
+            text = '[{0}]\n{1}'.format(name, text)
+
+        return _loads(text, constants.INI, {name: options})
+
+    @staticmethod
+    def _render(value):
+
+        if value is None or isinstance(value, (dict, list, set)):
+            raise _CannotEdit()
+
+        value = str(value)
+
+        if '\n' in value:
+            raise _CannotEdit()
+
+        return value
+
+
+class _PropertiesEditor(object):
+
+    def __init__(self, string, obj):
+
+        import javaproperties
+
+        self._javaproperties = javaproperties
+        self._obj = obj
+        self._splices = _Splices(string)
+        self._entries = []
+        self._terminated = False
+
+        position = 0
+
+        for key, _, source in javaproperties.parse(six.StringIO(six.u(string))):
+            self._entries.append((key, position, position + len(source), source))
+            position += len(source)
+
+        self._length = position
+
+    def text(self):
+        return self._splices.text()
+
+    def set(self, steps):
+
+        if len(steps) != 1:
+            raise _CannotEdit()
+
+        key = steps[0][0]
+        value = _value(self._obj, steps)
+
+        if isinstance(value, (dict, list, set)):
+            raise _CannotEdit()
+
+        value = str(value)
+        line = self._javaproperties.join_key_value(key, value)
+        found = None
+
+        for entry in self._entries:
+            if entry[0] == key:
+                found = entry
+
+        if found is None:
+            text = line + '\n'
+            if self._entries and not self._terminated:
+                last, _, _, source = self._entries[-1]
+                if not source.endswith('\n'):
+                    text = '\n' + text
+                if last is not None and self._continued(source):
+                    # an empty line ends the continuation, which would otherwise swallow
+                    # the appended entry.
+                    text = '\n' + text
+                self._terminated = True
+            self._splices.add(self._length, self._length, text,
+                              check=lambda: _loads(text, constants.PROPERTIES, {key: value}))
+        else:
+            _, start, end, source = found
+            # the line break of the replaced line is kept
+            text = line + source[len(source.rstrip('\r\n')):]
+            self._splices.add(start, end, text,
+                              check=lambda: _loads(text, constants.PROPERTIES, {key: value}))
+
+        return 1
+
+    def delete(self, steps):
+
+        if len(steps) != 1:
+            raise _CannotEdit()
+
+        # every occurrence of the key is removed
+        for key, start, end, _ in self._entries:
+            if key == steps[0][0]:
+                self._splices.add(start, end, '')
+
+    @staticmethod
+    def _continued(source):
+
+        # whether the last line of an entry ends with a line continuation, that is,
+        # an odd number of backslashes.
+        for line_break in ['\r\n', '\n', '\r']:
+            if source.endswith(line_break):
+                source = source[:-len(line_break)]
+                break
+
+        return (len(source) - len(source.rstrip('\\'))) % 2 == 1
@@ -149,7 +149,8 @@ class IllegalAliasException(ApiException):
         super(IllegalAliasException, self).__init__(self.__str__())
 
     def __str__(self):
-        return 'Alias is illegal (Must not contain spaces nor path separators)'
+        return 'Alias is illegal (Must not contain spaces nor path separators, ' \
+               'and must not start with a dot)'
 
 
 class InvalidArgumentsException(ApiException):
@@ -160,3 +161,28 @@ class InvalidArgumentsException(ApiException):
 
     def __str__(self):
         return self.message
+
+
+class LockTimeoutException(ApiException):
+
+    def __init__(self, file_path, timeout):
+        self.file_path = file_path
+        self.timeout = timeout
+        super(LockTimeoutException, self).__init__(self.__str__())
+
+    def __str__(self):
+        return 'Timed out waiting for lock: {0} (after {1} seconds)'.format(self.file_path,
+                                                                            self.timeout)
+
+
+class ConcurrentModificationException(ApiException):
+
+    def __init__(self, alias, expected, actual):
+        self.alias = alias
+        self.expected = expected
+        self.actual = actual
+        super(ConcurrentModificationException, self).__init__(self.__str__())
+
+    def __str__(self):
+        return 'Alias {0} was modified concurrently (expected latest version {1}, found {2})' \
+            .format(self.alias, self.expected, self.actual)
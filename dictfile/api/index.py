@@ -0,0 +1,161 @@
+#############################################################################
+# Copyright (c) 2018 Eli Polonsky. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#   * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   * See the License for the specific language governing permissions and
+#   * limitations under the License.
+#
+#############################################################################
+
+import json
+import os
+
+from dictfile.api import atomic
+from dictfile.api import utils
+
+
+class Index(object):
+
+    """
+    An append-only index of all revisions of a single alias.
+
+    Each revision is stored as a single json line, containing the revision metadata
+    (version, timestamp, message, content hash and size). The index is read once and
+    kept in memory, it is only re-read if the file was modified by someone else.
+
+    A final line that is not terminated (i.e an append that was interrupted by a crash) is
+    ignored, and truncated by the next append.
+
+    Args:
+        file_path (str): Path to the index file.
+    """
+
+    _file_path = None
+    _entries = None
+    _fingerprint = None
+    _length = None
+
+    def __init__(self, file_path):
+        self._file_path = file_path
+
+    @property
+    def file_path(self):
+        return self._file_path
+
+    def exists(self):
+        return os.path.exists(self._file_path)
+
+    def entries(self):
+
+        """
+        All the index entries, ordered by version.
+
+        Returns:
+            list: A list of dictionaries, one for each revision.
+        """
+
+        if not self.exists():
+            return []
+
+        fingerprint = utils.fingerprint(self._file_path)
+
+        if self._entries is None or fingerprint != self._fingerprint:
+            with open(self._file_path, 'rb') as stream:
+                lines = stream.read().split(b'\n')
+            # whatever follows the last line break is an incomplete line
+            self._entries = [json.loads(line.decode('utf-8')) for line in lines[:-1]
+                             if line.strip()]
+            self._length = sum(len(line) + 1 for line in lines[:-1])
+            self._fingerprint = fingerprint
+
+        return self._entries
+
+    def get(self, version):
+
+        """
+        Retrieve the entry of a specific version.
+
+        Args:
+            version (int): The version number.
+
+        Returns:
+            dict: The entry, or None if no such version exists.
+        """
+
+        entries = self.entries()
+
+        # versions are consecutive, so this is a direct lookup
+        # in the common case. if for some reason they are not, fall back
+        # to a linear search.
+        if 0 <= version < len(entries) and entries[version]['version'] == version:
+            return entries[version]
+
+        for entry in entries:
+            if entry['version'] == version:
+                return entry
+
+        return None
+
+    def latest(self):
+
+        """
+        Retrieve the entry of the latest version.
+
+        Returns:
+            dict: The entry, or None if the index is empty.
+        """
+
+        entries = self.entries()
+        return entries[-1] if entries else None
+
+    def append(self, entry):
+
+        """
+        Append an entry to the index.
+
+        Args:
+            entry (dict): The revision metadata.
+        """
+
+        entries = self.entries()
+        line = (json.dumps(entry, sort_keys=True) + '\n').encode('utf-8')
+        length = self._length if self.exists() else 0
+
+        if length < (os.path.getsize(self._file_path) if self.exists() else 0):
+            # the incomplete line left by an interrupted append
+            with open(self._file_path, 'rb+') as stream:
+                stream.truncate(length)
+
+        with open(self._file_path, 'ab') as stream:
+            stream.write(line)
+
+        atomic.sync(self._file_path)
+
+        self._entries = entries + [entry]
+        self._length = length + len(line)
+        self._fingerprint = utils.fingerprint(self._file_path)
+
+    def rewrite(self, entries):
+
+        """
+        Replace the entire index with the given entries.
+
+        Args:
+            entries (list): The revisions metadata.
+        """
+
+        contents = ''.join(json.dumps(entry, sort_keys=True) + '\n' for entry in entries)
+
+        atomic.write(self._file_path, contents)
+
+        self._entries = list(entries)
+        self._length = os.path.getsize(self._file_path)
+        self._fingerprint = utils.fingerprint(self._file_path)
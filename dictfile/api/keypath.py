@@ -0,0 +1,168 @@
+#############################################################################
+# Copyright (c) 2018 Eli Polonsky. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#   * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   * See the License for the specific language governing permissions and
+#   * limitations under the License.
+#
+#############################################################################
+
+import collections
+
+from dictfile.api import exceptions
+
+# separates the levels of a nested key, e.g 'key1:key2'
+DELIMITER = ':'
+
+# maximum number of compiled keys kept by 'parse'
+MAX_CACHED_KEYS = 1024
+
+_cache = collections.OrderedDict()
+
+
+def parse(key):
+
+    """
+    Compile a key, re-using a previously compiled one if possible.
+
+    Args:
+        key (str, KeyPath): The key to compile.
+
+    Returns:
+        KeyPath: The compiled key.
+    """
+
+    if isinstance(key, KeyPath):
+        return key
+
+    key = str(key)
+
+    path = _cache.pop(key, None)
+
+    if path is None:
+        path = KeyPath(key)
+
+    # most recently used keys are kept at the end
+    _cache[key] = path
+
+    if len(_cache) > MAX_CACHED_KEYS:
+        _cache.popitem(last=False)
+
+    return path
+
+
+class KeyPath(object):
+
+    """A key, split to its levels once, that can be resolved against a document.
+
+    Each level of the key is either a dictionary key, or (if the level is a number
+    and the value it is resolved against is a list) a list index. For example, given the
+    document {'servers': [{'host': 'localhost'}]}, the key 'servers:0:host' resolves to
+    'localhost'.
+
+    Args:
+        key (str): The key, levels are separated with ':'.
+
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.steps = [(part, int(part) if part.isdigit() else None)
+                      for part in key.split(DELIMITER)]
+
+    def get(self, document):
+
+        """
+        Retrieve the value of the key.
+
+        Raises:
+            KeyNotFoundException: If any level of the key does not exist.
+        """
+
+        container = self._container(document)
+        return self._child(container, self.steps[-1])
+
+    def set(self, document, value):
+
+        """
+        Set the value of the key, creating missing dictionaries along the way.
+
+        Raises:
+            InvalidKeyTypeException: If an intermediate level is neither a dictionary nor a list.
+            KeyNotFoundException: If a list index does not exist.
+        """
+
+        container = self._container(document, create=True)
+        part, index = self.steps[-1]
+
+        if isinstance(container, dict):
+            container[part] = value
+        else:
+            self._child(container, self.steps[-1])
+            container[index] = value
+
+    def delete(self, document):
+
+        """
+        Delete the key.
+
+        Raises:
+            KeyNotFoundException: If the key does not exist.
+        """
+
+        container = self._container(document)
+        part, index = self.steps[-1]
+
+        self._child(container, self.steps[-1])
+        del container[part if isinstance(container, dict) else index]
+
+    def _container(self, document, create=False):
+
+        # resolve the value holding the last level of the key,
+        # if 'create' is set, missing dictionaries are added.
+        container = document
+
+        for position, step in enumerate(self.steps[:-1]):
+
+            part, _ = step
+
+            if create and isinstance(container, dict) and part not in container:
+                container[part] = {}
+
+            container = self._child(container, step)
+
+            if create and not isinstance(container, (dict, list)):
+                raise exceptions.InvalidKeyTypeException(
+                    key=DELIMITER.join(name for name, _ in self.steps[:position + 1]),
+                    expected_types=[dict, list],
+                    actual_type=type(container))
+
+        return container
+
+    def _child(self, container, step):
+
+        part, index = step
+
+        try:
+            if isinstance(container, dict):
+                return container[part]
+            if isinstance(container, list) and index is not None:
+                return container[index]
+        except (KeyError, IndexError):
+            pass
+
+        raise exceptions.KeyNotFoundException(key=self.key)
+
+    def __str__(self):
+        return self.key
+
+    def __repr__(self):
+        return 'KeyPath({0!r})'.format(self.key)
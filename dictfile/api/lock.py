@@ -0,0 +1,157 @@
+#############################################################################
+# Copyright (c) 2018 Eli Polonsky. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#   * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   * See the License for the specific language governing permissions and
+#   * limitations under the License.
+#
+#############################################################################
+
+import os
+import threading
+import time
+
+from dictfile.api import exceptions
+
+try:
+    import fcntl
+except ImportError:
+    # windows
+    fcntl = None
+    import msvcrt
+
+# seconds to wait for a lock before giving up
+DEFAULT_TIMEOUT = 60
+
+# seconds between attempts to acquire a lock held by someone else (doubled up to the maximum)
+_MIN_INTERVAL = 0.001
+_MAX_INTERVAL = 0.05
+
+# the locks held by the current thread: path -> [file descriptor, shared, count]
+_local = threading.local()
+
+
+class FileLock(object):
+
+    """An exclusive (or shared) lock on a file, held across processes.
+
+    The lock is re-entrant within a thread, acquiring a lock that is already held just
+    counts the acquisition, and it is only released once released as many times. An exclusive
+    lock may be re-acquired as shared, but not the other way around.
+
+    Locks are advisory (fcntl.flock on posix, msvcrt.locking on windows, where shared locks
+    are exclusive), they only exclude others that lock the same file.
+
+    Can be used as a context manager:
+
+        with FileLock('/path/to/file.lock'):
+            ...
+
+    Args:
+        file_path (str): The lock file, created if it does not exist.
+        shared (bool): Whether to acquire a shared (read) lock.
+        timeout (float): Seconds to wait for the lock before raising a LockTimeoutException.
+
+    """
+
+    def __init__(self, file_path, shared=False, timeout=DEFAULT_TIMEOUT):
+        self.file_path = os.path.abspath(file_path)
+        self.shared = shared
+        self.timeout = timeout
+
+    def acquire(self):
+
+        held = _held().get(self.file_path)
+
+        if held is not None:
+            if held[1] and not self.shared:
+                raise exceptions.InvalidArgumentsException(
+                    'Cannot upgrade a shared lock to exclusive: {0}'.format(self.file_path))
+            held[2] += 1
+            return
+
+        fd = os.open(self.file_path, os.O_RDWR | os.O_CREAT, 0o666)
+
+        try:
+            self._lock(fd)
+        except BaseException:
+            os.close(fd)
+            raise
+
+        _held()[self.file_path] = [fd, self.shared, 1]
+
+    def release(self):
+
+        held = _held()[self.file_path]
+        held[2] -= 1
+
+        if held[2] > 0:
+            return
+
+        del _held()[self.file_path]
+
+        # closing the file releases the lock
+        try:
+            _unlock(held[0])
+        finally:
+            os.close(held[0])
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *_):
+        self.release()
+
+    def _lock(self, fd):
+
+        deadline = time.time() + self.timeout
+        interval = _MIN_INTERVAL
+
+        while not _try_lock(fd, self.shared):
+
+            if time.time() >= deadline:
+                raise exceptions.LockTimeoutException(file_path=self.file_path,
+                                                      timeout=self.timeout)
+
+            time.sleep(interval)
+            interval = min(interval * 2, _MAX_INTERVAL)
+
+
+def _held():
+
+    held = getattr(_local, 'held', None)
+
+    if held is None:
+        held = _local.held = {}
+
+    return held
+
+
+def _try_lock(fd, shared):
+
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        return True
+    except (IOError, OSError):
+        return False
+
+
+def _unlock(fd):
+
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
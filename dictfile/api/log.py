@@ -25,6 +25,20 @@ DEFAULT_LOG_LEVEL = logging.INFO
 DEFAULT_LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 
 
+class _StdoutHandler(logging.StreamHandler):
+
+    # writes to whatever sys.stdout is when the record is emitted, rather than when the
+    # handler was created. e.g the server replaces it to forward a command's output.
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, _):
+        pass
+
+
 class Logger(object):
 
     """
@@ -55,7 +69,7 @@ class Logger(object):
         return self._logger
 
     def add_console_handler(self, level):
-        ch = logging.StreamHandler(stream=sys.stdout)
+        ch = _StdoutHandler()
         ch.setLevel(level)
         formatter = logging.Formatter(DEFAULT_LOG_FORMAT)
         ch.setFormatter(formatter)
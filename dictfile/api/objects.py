@@ -0,0 +1,173 @@
+#############################################################################
+# Copyright (c) 2018 Eli Polonsky. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#   * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   * See the License for the specific language governing permissions and
+#   * limitations under the License.
+#
+#############################################################################
+
+import hashlib
+import os
+
+from dictfile.api import atomic
+from dictfile.api import compression
+from dictfile.api import utils
+
+# number of bytes read at a time when hashing a file
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class ObjectStore(object):
+
+    """
+    A content addressed store of blobs.
+
+    Every blob is stored once, under a name derived from the hash of its contents. This means
+    that identical contents, for example, the same revision committed twice, or the same file
+    tracked by multiple aliases, are only stored once.
+
+    Blobs may be compressed on disk, each blob records the codec it was compressed with,
+    so blobs compressed with different codecs can live side by side.
+
+    Args:
+        directory (str): The directory to store the blobs in.
+    """
+
+    _directory = None
+
+    def __init__(self, directory):
+        self._directory = directory
+        utils.smkdir(self._directory)
+
+    @property
+    def directory(self):
+        return self._directory
+
+    @staticmethod
+    def hash(contents):
+
+        """
+        Compute the key a blob will be stored under.
+
+        Args:
+            contents (bytes): The blob.
+
+        Returns:
+            str: The hex digest of the blob.
+        """
+
+        return hashlib.sha256(contents).hexdigest()
+
+    @staticmethod
+    def hash_file(file_path):
+
+        """
+        Compute the key a file would be stored under, without reading it entirely to memory.
+
+        Args:
+            file_path (str): The file.
+
+        Returns:
+            str: The hex digest of the file contents.
+        """
+
+        digest = hashlib.sha256()
+
+        with open(file_path, 'rb') as stream:
+            for chunk in iter(lambda: stream.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+
+        return digest.hexdigest()
+
+    def path(self, key):
+
+        # fan out to sub directories to avoid having a huge amount
+        # of files in a single directory.
+        return os.path.join(self._directory, key[:2], key[2:])
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def put(self, contents, codec=compression.NONE):
+
+        """
+        Store a blob. Does nothing if the blob is already stored.
+
+        Args:
+            contents (bytes): The blob.
+            codec (str): The compression codec to store the blob with.
+
+        Returns:
+            str: The key of the blob.
+        """
+
+        key = self.hash(contents)
+
+        if self.exists(key):
+            return key
+
+        object_path = self.path(key)
+        utils.smkdir(os.path.dirname(object_path))
+
+        # a partially written blob is never visible under its final name.
+        blob = codec.encode('utf-8') + b'\n' + compression.compress(contents, codec=codec)
+
+        try:
+            atomic.write(object_path, blob, binary=True)
+        except OSError:
+            # on windows, replacing fails if someone else is
+            # storing the same blob in the meantime.
+            if not self.exists(key):
+                raise
+
+        return key
+
+    def get(self, key):
+
+        """
+        Retrieve a blob.
+
+        Args:
+            key (str): The key of the blob.
+
+        Returns:
+            bytes: The blob, or None if no such blob exists.
+        """
+
+        try:
+            with open(self.path(key), 'rb') as stream:
+                codec = stream.readline().rstrip(b'\n').decode('utf-8')
+                return compression.decompress(stream.read(), codec=codec)
+        except (IOError, OSError):
+            return None
+
+    def delete(self, key):
+
+        object_path = self.path(key)
+
+        if os.path.exists(object_path):
+            os.remove(object_path)
+
+    def keys(self):
+
+        """
+        Keys of all stored blobs.
+
+        Returns:
+            set: The keys.
+        """
+
+        keys = set()
+        for prefix in utils.lsd(self._directory):
+            for name in utils.lsf(os.path.join(self._directory, prefix)):
+                keys.add(prefix + name)
+        return keys
@@ -15,50 +15,114 @@
 #
 #############################################################################
 
-import configparser
+import json
+import locale
+import platform
+import re
 
 import six
 
-import javaproperties
-import yaml
-from yaml.scanner import ScannerError
-
+from dictfile.api import backend
 from dictfile.api import exceptions
 from dictfile.api import constants
+from dictfile.api import profiler
+from dictfile.api import utils
+
+# a single line plain yaml scalar, that cannot be mistaken for any other yaml construct.
+# that is, it does not start with an indicator, and does not contain flow indicators,
+# comments, quotes, tabs or a mapping value indicator (': ').
+_PLAIN_SCALAR = re.compile(r'^(?!---|\.\.\.|- )'
+                           r'[a-zA-Z0-9_.+~/-]'
+                           r'([a-zA-Z0-9_.+~/:@ -]*[a-zA-Z0-9_.+~/@-])?$')
+
+# bump whenever a change to this module changes the documents it produces,
+# so that documents parsed (and cached) by previous versions are not used.
+VERSION = 1
+
+_yaml_constructor = None
+
+
+def version(fmt):
+
+    """
+    The version of the parser of a format.
+
+    That is, the version of this module, of the library that parses the format, and the
+    encoding contents are decoded with. The same contents may be parsed to a different
+    document if any of these change.
+
+    Args:
+        fmt (str): The format.
+
+    Returns:
+        str: The version.
+    """
+
+    if fmt == constants.YAML:
+        import yaml
+        library = '{0}.{1}'.format(yaml.__version__, backend.yaml_backend())
+    elif fmt == constants.PROPERTIES:
+        import javaproperties
+        library = javaproperties.__version__
+    else:
+        # parsed by the standard library
+        library = platform.python_version()
+
+    return '{0}-{1}-{2}'.format(VERSION, library, locale.getpreferredencoding(False))
 
 
 def load(file_path, fmt):
 
-    with open(file_path) as stream:
-        try:
-            return loads(stream.read(), fmt=fmt)
-        except (ScannerError, configparser.ParsingError) as e:
-            raise exceptions.CorruptFileException(file_path=file_path, message=str(e))
+    with open(file_path, 'rb') as stream:
+        return load_contents(stream.read(), file_path=file_path, fmt=fmt)
+
+
+def load_contents(contents, file_path, fmt):
+
+    """
+    Parse the contents of a file that were already read, exactly like 'load' parses the file.
+
+    Args:
+        contents (bytes): The raw contents of the file.
+        file_path (str): The file the contents were read from.
+        fmt (str): The format of the file.
+
+    Returns:
+        The parsed document.
 
+    Raises:
+        CorruptFileException: If the contents are invalid.
+    """
 
+    try:
+        return loads(utils.decode(contents), fmt=fmt)
+    except _parse_errors() as e:
+        raise exceptions.CorruptFileException(file_path=file_path, message=str(e))
+
+
+@profiler.profiled(profiler.PARSE)
 def loads(string, fmt):
 
     if fmt == constants.JSON:
 
-        # we are using 'yaml' here instead of 'json' because json
-        # parses the keys as unicode objects (instead of string,
-        # see https://stackoverflow.com/questions/956867/how-to-get-string-objects-
-        # instead-of-unicode-from-json),
-        # which causes a problem with flatdict in identifying complex keys. (see flatdict.py#_
-        # has_delimiter (json is a sub-set of yaml so it works)
-
-        return yaml.safe_load(string)
+        return _loads_json(string)
 
     elif fmt == constants.YAML:
 
-        return yaml.safe_load(string)
+        import yaml
+
+        return yaml.load(string, Loader=backend.yaml_loader())
 
     elif fmt == constants.PROPERTIES:
 
+        import javaproperties
+
         return javaproperties.loads(string)
 
     elif fmt == constants.INI:
 
+        import configparser
+
         dictionary = {}
         ini_parser = configparser.ConfigParser()
         ini_parser.read_string(six.u(string))
@@ -75,3 +139,73 @@ def loads(string, fmt):
     else:
 
         raise exceptions.UnsupportedFormatException(fmt=fmt)
+
+
+def loads_value(string):
+
+    """
+    Parse a single value, with the semantics of loading it as a yaml document.
+
+    Plain scalars (e.g '5', 'true', 'hostname') are resolved and constructed directly
+    using the yaml resolvers and constructors, skipping the (rather expensive) yaml
+    scanner and parser. Anything else (e.g flow collections) is loaded as a yaml document.
+
+    Args:
+        string (str): The value.
+
+    Returns:
+        The parsed value.
+    """
+
+    if not _PLAIN_SCALAR.match(string) or ': ' in string or string == '-':
+        return loads(string, fmt=constants.YAML)
+
+    import yaml
+
+    global _yaml_constructor  # pylint: disable=global-statement
+
+    if _yaml_constructor is None:
+        _yaml_constructor = yaml.constructor.SafeConstructor()
+
+    # this is exactly how the yaml resolver resolves a plain scalar.
+    tag = yaml.resolver.Resolver.DEFAULT_SCALAR_TAG
+    for candidate, regexp in yaml.resolver.Resolver.yaml_implicit_resolvers.get(string[0], []):
+        if regexp.match(string):
+            tag = candidate
+            break
+
+    node = yaml.ScalarNode(tag=tag, value=string)
+
+    return _yaml_constructor.yaml_constructors[tag](_yaml_constructor, node)
+
+
+def _parse_errors():
+
+    # format backends are imported only once a format that needs them is used,
+    # this keeps the command line startup fast. note that an 'except' clause is
+    # only evaluated when an exception is actually raised.
+    import configparser
+    from yaml.scanner import ScannerError
+
+    return ScannerError, configparser.ParsingError, ValueError
+
+
+def _loads_json(string):
+
+    if not string.strip():
+        # an empty document, this is what yaml (which we
+        # used to parse json with) returns in this case.
+        return None
+
+    if six.PY2:
+        # on python 2, json parses strings as unicode objects, while
+        # yaml (and the rest of the formats) returns native string keys.
+        return json.loads(string, object_hook=_encode_keys)
+
+    return json.loads(string)
+
+
+def _encode_keys(dictionary):
+
+    return {(key.encode('utf-8') if isinstance(key, six.text_type) else key): value
+            for key, value in dictionary.items()}
@@ -15,14 +15,43 @@
 #
 #############################################################################
 
+import copy
+
 import six
-import flatdict
 
 from dictfile.api import exceptions
 from dictfile.api import parser
 from dictfile.api import writer
 from dictfile.api import constants
+from dictfile.api import keypath
 from dictfile.api import log
+from dictfile.api import profiler
+
+
+OPERATIONS = ['put', 'add', 'remove', 'delete']
+
+
+def serialize(value, fmt):
+
+    """
+    Serialize a value the same way the Patcher returns it.
+
+    Args:
+        value: The value.
+        fmt (str): The format of the file the value was taken from.
+
+    Returns:
+        str: The serialized value.
+    """
+
+    if isinstance(value, (dict, list, set)):
+        if fmt == constants.INI:
+            # an ini dictionary is actually
+            # a properties file, not an ini
+            fmt = constants.PROPERTIES
+        value = writer.dumps(value, fmt=fmt)
+
+    return str(value)
 
 
 class Patcher(object):
@@ -58,6 +87,28 @@ class Patcher(object):
 
         (value will be '{"key2": "value2"}')
 
+    Nested keys are resolved by walking the dictionary itself, level by level, and mutations
+    are applied in place. That is, the dictionary returned by 'finish' is the one given to the
+    patcher (unless 'apply' was used, see its documentation).
+
+    Lists elements can be accessed by their index:
+
+        patcher = Patcher({'servers': [{'host': 'localhost'}]})
+        value = patcher.get('servers:0:host')
+
+        (value will be 'localhost')
+
+    Keys are compiled once and cached (see keypath.parse), a compiled key can also be
+    passed instead of a string:
+
+        key = Patcher.compile('servers:0:host')
+        value = patcher.get(key)
+
+    The operations that modified the dictionary are available with the 'changes' property,
+    this allows writing just the modified parts of a document (see editor.dump). Operations
+    that leave the dictionary as is (for example, setting a key to its current value) are not
+    recorded, so 'dirty' tells whether there is anything to write at all.
+
     Values are also restricted to strings. The patcher will take care of any type conversion
     necessary. That is:
 
@@ -69,7 +120,8 @@ class Patcher(object):
 
     """
 
-    _fdict = {}
+    _dictionary = {}
+    _changes = None
     _logger = None
 
     def __init__(self, dictionary, logger=None):
@@ -83,17 +135,37 @@ class Patcher(object):
 
         """
 
-        self._fdict = flatdict.FlatDict(dictionary)
+        # an empty file is parsed as None
+        self._dictionary = {} if dictionary is None else dictionary
+        self._changes = []
         self._logger = logger or log.Logger('{0}.api.patcher.Patcher'.format(
             constants.PROGRAM_NAME))
 
+    @staticmethod
+    def compile(key):
+
+        """Compile a key, to be used with any of the patcher methods.
+
+        Args:
+
+            key (str): The key to compile.
+
+        Returns:
+
+            KeyPath: The compiled key.
+
+        """
+
+        return keypath.parse(key)
+
+    @profiler.profiled(profiler.PATCH)
     def set(self, key, value):
 
         """Add/Modify a key with the given value.
 
         Args:
 
-            key (str): The key to operate on.
+            key (str, KeyPath): The key to operate on.
             value (str, unicode): The value of the key.
 
         Returns:
@@ -102,63 +174,125 @@ class Patcher(object):
 
         """
 
-        self._fdict[str(key)] = self._deserialize(value)
+        path = keypath.parse(key)
+        value = self._deserialize(value)
+
+        try:
+            unchanged = _same(path.get(self._dictionary), value)
+        except exceptions.KeyNotFoundException:
+            unchanged = False
+
+        if unchanged:
+            self._logger.debug('Key {0} already has the value {1}'.format(key, value))
+            return self
+
+        path.set(self._dictionary, value)
+        self._changes.append(('put', key))
         return self
 
+    @profiler.profiled(profiler.PATCH)
     def add(self, key, value):
 
-        self._validate_list(key)
-        current_value = self._fdict[key]
+        current_value = self._list(key)
 
         current_value.append(self._deserialize(value))
+        self._changes.append(('add', key))
 
         return self
 
+    @profiler.profiled(profiler.PATCH)
     def remove(self, key, value):
 
-        self._validate_list(key)
-        current_value = self._fdict[key]
+        current_value = self._list(key)
 
         current_value.remove(self._deserialize(value))
+        self._changes.append(('remove', key))
 
         return self
 
+    @profiler.profiled(profiler.PATCH)
     def delete(self, key):
 
-        try:
-            del self._fdict[str(key)]
-        except KeyError:
-            raise exceptions.KeyNotFoundException(key=key)
+        keypath.parse(key).delete(self._dictionary)
+        self._changes.append(('delete', key))
 
         return self
 
     def get(self, key, fmt=constants.JSON):
 
-        try:
-            self._logger.debug('Fetching value for key {0}'.format(key))
-            value = self._fdict[key]
-            return self._serialize(value, fmt)
-        except KeyError:
-            raise exceptions.KeyNotFoundException(key=key)
+        self._logger.debug('Fetching value for key {0}'.format(key))
+        value = keypath.parse(key).get(self._dictionary)
+        return self._serialize(value, fmt)
+
+    @profiler.profiled(profiler.PATCH)
+    def apply(self, operations):
+
+        """Apply multiple operations, all or nothing.
+
+        The operations are applied to a copy of the dictionary, which replaces
+        the patched dictionary only if all of them succeeded. In which case, 'finish'
+        returns the copy, and not the dictionary given to the patcher.
+
+        Args:
+
+            operations (list): A list of dictionaries, each with an 'operation' (one of 'put',
+                'add', 'remove', 'delete'), a 'key' and (except for 'delete') a 'value'.
+
+        Returns:
+
+            The patcher instance itself, for fluent api support.
+
+        """
+
+        patcher = Patcher(copy.deepcopy(self.finish()), logger=self._logger)
+
+        for index, operation in enumerate(operations):
+
+            self._logger.debug('Applying operation {0}: {1}'.format(index, operation))
+
+            name, key, value = self._unpack(operation)
+
+            if name == 'put':
+                patcher.set(key=key, value=value)
+            elif name == 'add':
+                patcher.add(key=key, value=value)
+            elif name == 'remove':
+                patcher.remove(key=key, value=value)
+            else:
+                patcher.delete(key=key)
+
+        patched = patcher.finish()
+
+        # operations may also revert each other.
+        if patcher.dirty and not _same(self._dictionary, patched):
+            self._changes.extend(patcher.changes)
+
+        self._dictionary = patched
+
+        return self
 
     def finish(self):
-        return self._fdict.as_dict()
+        return self._dictionary
 
-    def _serialize(self, value, fmt):
+    @property
+    def changes(self):
 
-        self._logger.debug('Serializing value ({0}): {1}'.format(type(value), value))
+        """The (operation, key) pairs that modified the dictionary, in order."""
 
-        if isinstance(value, flatdict.FlatDict):
-            value = value.as_dict()
+        return list(self._changes)
 
-        if isinstance(value, (dict, list, set)):
-            if fmt == constants.INI:
-                # an ini dictionary is actually
-                # a properties file, not an ini
-                fmt = constants.PROPERTIES
-            value = writer.dumps(value, fmt=fmt)
+    @property
+    def dirty(self):
 
-        return str(value)
+        """Whether any operation modified the dictionary."""
+
+        return bool(self._changes)
+
+    def _serialize(self, value, fmt):
+
+        self._logger.debug('Serializing value ({0}): {1}'.format(type(value), value))
+
+        return serialize(value, fmt)
 
     def _deserialize(self, value):
 
@@ -170,14 +304,54 @@ class Patcher(object):
         # this way. note that if the value is a primitive, yaml
         # will return the correct type as well.
         self._logger.debug('De-serializing value: {0}'.format(value))
-        parsed = parser.loads(string=value, fmt=constants.YAML)
+        parsed = parser.loads_value(value)
         return parsed
 
-    def _validate_list(self, key):
+    @staticmethod
+    def _unpack(operation):
+
+        if not isinstance(operation, dict):
+            raise exceptions.InvalidArgumentsException(
+                'Operation must be a dictionary: {0}'.format(operation))
+
+        name = operation.get('operation')
+
+        if name not in OPERATIONS:
+            raise exceptions.InvalidArgumentsException(
+                "Operation must be one of {0}: {1}".format(', '.join(OPERATIONS), operation))
+
+        if 'key' not in operation:
+            raise exceptions.InvalidArgumentsException(
+                "Operation is missing a 'key': {0}".format(operation))
 
-        value = self._fdict[key]
+        if name != 'delete' and 'value' not in operation:
+            raise exceptions.InvalidArgumentsException(
+                "Operation is missing a 'value': {0}".format(operation))
+
+        return name, operation['key'], operation.get('value')
+
+    def _list(self, key):
+
+        value = keypath.parse(key).get(self._dictionary)
         if not isinstance(value, list):
             raise exceptions.InvalidKeyTypeException(
                 key=key,
                 expected_types=[list],
                 actual_type=type(value))
+        return value
+
+
+def _same(value, other):
+
+    # 1 == 1.0 == True, but they are different values in a document.
+    if isinstance(value, dict) and isinstance(other, dict):
+        return (len(value) == len(other) and
+                all(key in other and _same(value[key], other[key]) for key in value))
+
+    if isinstance(value, list) and isinstance(other, list):
+        return len(value) == len(other) and all(_same(a, b) for a, b in zip(value, other))
+
+    if isinstance(value, six.string_types) and isinstance(other, six.string_types):
+        return value == other
+
+    return type(value) is type(other) and value == other
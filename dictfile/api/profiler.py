@@ -0,0 +1,278 @@
+#############################################################################
+# Copyright (c) 2018 Eli Polonsky. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#   * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   * See the License for the specific language governing permissions and
+#   * limitations under the License.
+#
+#############################################################################
+
+import json
+import sys
+import threading
+import time
+import timeit
+from functools import wraps
+
+# the phases recorded while executing a command
+IMPORT = 'import'
+REPO_INIT = 'repo init'
+STATE_LOAD = 'state load'
+PARSE = 'parse'
+DIRTY_CHECK = 'dirty check'
+PATCH = 'patch'
+SERIALIZE = 'serialize'
+WRITE = 'write'
+COMMIT = 'commit'
+
+# separates the names of nested spans in a span path, e.g 'commit/write'
+SEPARATOR = '/'
+
+_wall_time = timeit.default_timer
+
+# 'time.clock' is the closest python 2 has
+_cpu_time = getattr(time, 'process_time', None) or getattr(time, 'clock')
+
+# the number of memory blocks currently allocated by the interpreter (python 3 only)
+_allocated_blocks = getattr(sys, 'getallocatedblocks', None)
+
+_local = threading.local()
+
+
+def start():
+
+    """
+    Start recording spans, in the current thread.
+
+    Returns:
+        Profile: The profile recording the spans.
+    """
+
+    _local.profile = Profile()
+    return _local.profile
+
+
+def stop():
+
+    """
+    Stop recording spans.
+
+    Returns:
+        Profile: The profile that recorded the spans, None if none was started.
+    """
+
+    profile = active()
+    _local.profile = None
+    return profile
+
+
+def active():
+
+    """The profile recording spans in the current thread, or None."""
+
+    return getattr(_local, 'profile', None)
+
+
+def span(name):
+
+    """
+    Record the time spent in a phase, while a profile is active:
+
+        with profiler.span(profiler.PARSE):
+            ...
+
+    When no profile is active, this does (almost) nothing, so spans can be placed on hot paths.
+
+    Args:
+        name (str): The name of the phase.
+
+    Returns:
+        A context manager.
+    """
+
+    profile = getattr(_local, 'profile', None)
+
+    if profile is None:
+        return _NO_SPAN
+
+    return _Span(profile, name)
+
+
+def profiled(name):
+
+    """
+    Record every call of the decorated function as a span:
+
+        @profiler.profiled(profiler.COMMIT)
+        def commit(self, alias, message=None):
+            ...
+
+    Args:
+        name (str): The name of the phase.
+    """
+
+    def decorator(func):
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class Profile(object):
+
+    """The spans recorded while a profile was active.
+
+    Each span holds its name, its path (the names of the spans enclosing it, and its own), and
+    the wall time, cpu time and (net) number of memory blocks allocated while it was open.
+    Times include the time spent in nested spans.
+
+    """
+
+    def __init__(self):
+        self.spans = []
+        self._stack = []
+
+    def record(self, name, wall, cpu=None, allocations=None):
+
+        """Record a span that was measured elsewhere, e.g before the profile started."""
+
+        self.spans.append(self._span(name, wall, cpu, allocations))
+
+    def summary(self):
+
+        """
+        The spans, aggregated by their path.
+
+        Returns:
+            list: A dictionary per path, in the order the paths were first recorded. Holding
+                the 'path', 'name', 'depth', 'calls', 'wall', 'cpu' and 'allocations'.
+        """
+
+        rows = {}
+        ordered = []
+
+        for recorded in self.spans:
+
+            row = rows.get(recorded['path'])
+
+            if row is None:
+                row = dict(recorded, calls=0, wall=0.0, cpu=None, allocations=None)
+                rows[recorded['path']] = row
+                ordered.append(row)
+
+            row['calls'] += 1
+            row['wall'] += recorded['wall']
+            row['cpu'] = _add(row['cpu'], recorded['cpu'])
+            row['allocations'] = _add(row['allocations'], recorded['allocations'])
+
+        return ordered
+
+    def table(self):
+
+        """The summary, formatted as a table."""
+
+        header = ('phase', 'calls', 'wall (ms)', 'cpu (ms)', 'allocations')
+        rows = [header]
+
+        for row in self.summary():
+            rows.append(('  ' * row['depth'] + row['name'],
+                         str(row['calls']),
+                         '{0:.3f}'.format(row['wall'] * 1000),
+                         '-' if row['cpu'] is None else '{0:.3f}'.format(row['cpu'] * 1000),
+                         '-' if row['allocations'] is None else str(row['allocations'])))
+
+        widths = [max(len(row[column]) for row in rows) for column in range(len(header))]
+
+        lines = []
+        for row in rows:
+            lines.append('  '.join([row[0].ljust(widths[0])] +
+                                   [value.rjust(width)
+                                    for value, width in zip(row[1:], widths[1:])]))
+
+        return '\n'.join(lines)
+
+    def to_json(self):
+
+        """The summary, serialized to json."""
+
+        return json.dumps(self.summary(), indent=2, sort_keys=True)
+
+    def _span(self, name, wall, cpu, allocations):
+
+        path = SEPARATOR.join([opened.name for opened in self._stack] + [name])
+
+        return {
+            'name': name,
+            'path': path,
+            'depth': len(self._stack),
+            'wall': wall,
+            'cpu': cpu,
+            'allocations': allocations
+        }
+
+
+def _add(total, value):
+    if value is None:
+        return total
+    return value if total is None else total + value
+
+
+class _Span(object):
+
+    # pylint: disable=protected-access
+
+    def __init__(self, profile, name):
+        self.name = name
+        self._profile = profile
+        self._recorded = None
+        self._wall = None
+        self._cpu = None
+        self._blocks = None
+
+    def __enter__(self):
+
+        # the span is recorded when it is opened, so spans are ordered by their start.
+        self._recorded = self._profile._span(self.name, 0.0, None, None)
+        self._profile.spans.append(self._recorded)
+        self._profile._stack.append(self)
+
+        self._blocks = _allocated_blocks() if _allocated_blocks else None
+        self._cpu = _cpu_time()
+        self._wall = _wall_time()
+
+        return self
+
+    def __exit__(self, *_):
+
+        self._recorded['wall'] = _wall_time() - self._wall
+        self._recorded['cpu'] = _cpu_time() - self._cpu
+
+        if self._blocks is not None:
+            self._recorded['allocations'] = _allocated_blocks() - self._blocks
+
+        self._profile._stack.pop()
+
+
+class _NoSpan(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        pass
+
+
+_NO_SPAN = _NoSpan()
@@ -16,49 +16,274 @@
 #############################################################################
 
 
+import contextlib
 import shutil
+import time
 import os
+from functools import wraps
 
+from six.moves.urllib.parse import quote
+
+from dictfile.api import atomic
+from dictfile.api import compression
+from dictfile.api import delta
 from dictfile.api import utils
 from dictfile.api import exceptions
 from dictfile.api import parser
 from dictfile.api import writer
 from dictfile.api import constants
+from dictfile.api import lock
 from dictfile.api import log
+from dictfile.api import profiler
+from dictfile.api import storage
+from dictfile.api.cache import ParseCache
+from dictfile.api.objects import ObjectStore
 
 
 ADD_COMMIT_MESSAGE = 'original version committed automatically upon adding the file'
 
+# the coarsest modification time resolution of common file systems (in seconds)
+MTIME_RESOLUTION = 2
+
+# every revision is stored in full
+FULL_STORAGE = 'full'
+
+# only every 'keyframe_interval' revisions are stored in full,
+# the rest are stored as deltas from their previous revision.
+DELTA_STORAGE = 'delta'
+
+# every commit creates a new revision, even if the file did not change.
+SKIP_NEVER = 'never'
+
+# commits of a file identical (byte for byte) to its latest revision are skipped.
+SKIP_IDENTICAL = 'identical'
+
+# commits of a file that parses to the same contents as its latest revision are skipped,
+# even if the formatting differs.
+SKIP_EQUIVALENT = 'equivalent'
+
+SKIP_MODES = [SKIP_NEVER, SKIP_IDENTICAL, SKIP_EQUIVALENT]
+
+
+# acquire the state lock in shared mode, allowing others to do the same.
+SHARED = 'shared'
+
+# acquire the state lock exclusively.
+EXCLUSIVE = 'exclusive'
+
+
+def _locked(state=None):
+
+    # operations on an alias (the first argument) hold its lock, and optionally the state lock.
+    # locks are always acquired in this order (alias, then state), so they never deadlock.
+    def decorator(func):
+
+        @wraps(func)
+        def wrapper(self, alias, *args, **kwargs):
+            with self.lock(alias):
+                if state is None:
+                    return func(self, alias, *args, **kwargs)
+                with self._state_lock(shared=state == SHARED):  # pylint: disable=protected-access
+                    return func(self, alias, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _durable(func):
+
+    # all the writes of an operation become durable together (and are a single transaction,
+    # if the storage supports them). the locks of the operation are acquired before, since
+    # the transaction of some storages (e.g sqlite) excludes others until it ends.
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        with self._transaction():  # pylint: disable=protected-access
+            return func(self, *args, **kwargs)
+
+    return wrapper
+
+
+def _one_of(name, choices):
+
+    # the choices are a function, codecs (for example) may be registered at any time.
+    def validate(value):
+        if value not in choices():
+            raise exceptions.InvalidArgumentsException(
+                '{0} must be one of: {1}'.format(name, ', '.join(choices())))
+        return value
+
+    return validate
+
+
+def _positive_integer(name):
+
+    def validate(value):
+        try:
+            value = int(value)
+        except ValueError:
+            value = 0
+        if value < 1:
+            raise exceptions.InvalidArgumentsException(
+                '{0} must be a positive integer'.format(name))
+        return value
+
+    return validate
+
+
+def _durability(value):
+    atomic.validate(value)
+    return value
+
+
+# setting name -> (validator, applier). the validator returns the value to store. the applier
+# (the name of a repository method) replaces simply storing the value, for settings that
+# change the repository itself.
+_SETTINGS = {
+    'storage': (_one_of('storage', lambda: [FULL_STORAGE, DELTA_STORAGE]), None),
+    'keyframe_interval': (_positive_integer('keyframe_interval'), None),
+    'compression': (_one_of('compression', compression.names), None),
+    'durability': (_durability, None),
+    'skip_unchanged': (_one_of('skip_unchanged', lambda: SKIP_MODES), None),
+    'engine': (_one_of('engine', lambda: storage.ENGINES), '_configure_engine')
+}
+
 
 class Repository(object):
 
-    BLANK_STATE = {
-        'files': {}
+    DEFAULT_SETTINGS = {
+        'storage': FULL_STORAGE,
+        'keyframe_interval': 10,
+        'compression': compression.NONE,
+        'durability': atomic.DEFAULT_DURABILITY,
+        'engine': storage.FILES,
+        'skip_unchanged': SKIP_IDENTICAL
     }
 
     _repo_dir = None
     _state_file = None
+    _storage = None
+    _indexes = None
+    _settings_file = None
+    _settings = None
+    _locks_dir = None
+    _parse_cache = None
     _logger = None
 
     def __init__(self, config_dir, logger=None):
 
         self._repo_dir = os.path.join(config_dir, 'repo')
         self._state_file = os.path.join(self._repo_dir, 'repo.json')
+        self._indexes = {}
+        self._settings_file = os.path.join(self._repo_dir, 'settings.json')
+        self._parse_cache = ParseCache(os.path.join(self._repo_dir, '.cache'))
+        self._locks_dir = os.path.join(self._repo_dir, '.locks')
         self._logger = logger or log.Logger('{0}.api.repository.Repository'
                                             .format(constants.PROGRAM_NAME))
 
         utils.smkdir(self._repo_dir)
+        utils.smkdir(self._locks_dir)
 
-        if not os.path.exists(self._state_file):
-            writer.dump(obj=self.BLANK_STATE, file_path=self._state_file, fmt=constants.JSON)
+        self._storage = storage.create(engine=self.settings['engine'], directory=self._repo_dir)
+
+        if os.path.exists(self._state_file):
+            with self._state_lock():
+                self._migrate_state()
 
     @property
     def root(self):
         return self._repo_dir
 
+    @property
+    def settings(self):
+
+        # the settings are parsed only once per instance, and re-parsed only if
+        # another process (or instance) has modified the settings file since.
+        try:
+            fingerprint = utils.fingerprint(self._settings_file)
+        except OSError:
+            fingerprint = None
+
+        if self._settings is None or self._settings[0] != fingerprint:
+            settings = dict(self.DEFAULT_SETTINGS)
+            if fingerprint is not None:
+                settings.update(parser.load(file_path=self._settings_file, fmt=constants.JSON))
+            self._settings = (fingerprint, settings)
+
+        # a copy, callers are free to modify it.
+        return dict(self._settings[1])
+
+    def barrier(self):
+
+        """
+        Group the writes of multiple operations into a single durability barrier.
+
+        For example, a command that modifies a file and commits it:
+
+            with repo.barrier():
+                writer.dump(obj=patched, file_path=repo.path(alias), fmt=repo.fmt(alias))
+                repo.commit(alias)
+
+        Returns:
+            A context manager, see atomic.barrier.
+        """
+
+        return atomic.barrier(durability=self.settings['durability'])
+
+    def lock(self, alias, shared=False):
+
+        """
+        The lock of an alias, held by every operation that modifies it.
+
+        Holding it (across processes) guarantees no one else commits to the alias. For example,
+        to modify a file and commit it without losing concurrent modifications:
+
+            with repo.lock(alias):
+                version = repo.latest_version(alias)
+                writer.dump(obj=patched, file_path=repo.path(alias), fmt=repo.fmt(alias))
+                repo.commit(alias, parent=version)
+
+        Args:
+            alias (str): The alias.
+            shared (bool): Whether to acquire a shared lock.
+
+        Returns:
+            lock.FileLock: The (not yet acquired) lock.
+        """
+
+        # quoted, so that any alias (even an illegal one) maps to a file in the locks directory.
+        name = '{0}.lock'.format(quote(alias, safe=''))
+        return lock.FileLock(os.path.join(self._locks_dir, name), shared=shared)
+
+    def configure(self, name, value):
+
+        """
+        Change a repository setting. Settings only affect future commits.
+
+        Args:
+            name (str): The setting name.
+            value (str): The setting value.
+        """
+
+        if name not in _SETTINGS:
+            raise exceptions.InvalidArgumentsException('Unknown setting: {0}'.format(name))
+
+        validate, applier = _SETTINGS[name]
+
+        value = validate(value)
+
+        if applier is not None:
+            getattr(self, applier)(value)
+            return
+
+        with self._state_lock(), self._transaction():
+            self._save_setting(name, value)
+
+    @_locked(state=SHARED)
+    @_durable
     def add(self, alias, file_path, fmt):
 
-        if ' ' in alias or os.sep in alias:
+        if ' ' in alias or os.sep in alias or alias.startswith('.'):
             raise exceptions.IllegalAliasException(alias=alias)
 
         file_path = os.path.abspath(file_path)
@@ -76,116 +301,306 @@ class Repository(object):
         self._logger.debug('Verifying the file can be parsed to {0}'.format(fmt))
         parser.load(file_path=file_path, fmt=fmt)
 
-        state = self._load_state()
-        state['files'][alias] = {'file_path': file_path, 'fmt': fmt}
-
-        self._save_state(state)
+        self._storage.save_file(alias, {'file_path': file_path, 'fmt': fmt})
 
         self._logger.debug('Committing this file ({0}) to retain its original version'
                            .format(file_path))
         self.commit(alias, message=ADD_COMMIT_MESSAGE)
 
+    @_locked(state=SHARED)
+    @_durable
     def remove(self, alias):
 
+        """
+        Stop tracking a file, and delete its revisions.
+
+        The contents of the revisions are kept, since other aliases may share them.
+        They are deleted by 'gc' once no alias references them.
+
+        Args:
+            alias (str): The alias of the file.
+        """
+
         if not self._exists(alias):
             raise exceptions.AliasNotFoundException(alias=alias)
 
-        state = self._load_state()
-        del state['files'][alias]
+        self._indexes.pop(alias, None)
 
-        self._save_state(state)
+        self._logger.debug('Deleting revisions of alias: {0}'.format(alias))
+        self._storage.remove(alias)
 
-        alias_dir = os.path.join(self._repo_dir, alias)
-        self._logger.debug('Deleting directory: {0}'.format(alias_dir))
-        shutil.rmtree(alias_dir)
+    def gc(self):
 
-    def path(self, alias):
+        """
+        Delete the stored contents that no revision references (e.g of removed aliases).
 
-        if not self._exists(alias):
-            raise exceptions.AliasNotFoundException(alias=alias)
+        This reads the index of every alias, and blocks commits while it runs.
+
+        Returns:
+            list: The keys of the deleted objects.
+        """
+
+        with self._state_lock(), self._transaction():
+
+            # an alias without an index (created by an older version) does not
+            # reference any object yet.
+            referenced = set()
+            for alias in self._aliases():
+                index = self._indexes.get(alias) or self._storage.index(alias)
+                referenced.update(self._object_key(entry) for entry in index.entries())
 
-        state = self._load_state()
+            deleted = [key for key in self._storage.objects.keys() if key not in referenced]
 
-        return state['files'][alias]['file_path']
+            for key in deleted:
+                self._logger.debug('Deleting object: {0}'.format(key))
+                self._storage.objects.delete(key)
+
+        return deleted
+
+    def path(self, alias):
+        return self._file(alias)['file_path']
 
     def fmt(self, alias):
+        return self._file(alias)['fmt']
 
-        if not self._exists(alias):
-            raise exceptions.AliasNotFoundException(alias=alias)
+    @profiler.profiled(profiler.COMMIT)
+    @_locked(state=SHARED)
+    @_durable
+    def commit(self, alias, message=None, parent=None):
+
+        """
+        Commit the current contents of the file as a new revision.
 
-        state = self._load_state()
+        If the file did not change since the latest revision (see the 'skip_unchanged'
+        setting), no revision is created.
 
-        return state['files'][alias]['fmt']
+        Args:
+            alias (str): The alias of the file.
+            message (str): The commit message.
+            parent (int): The version the new revision is expected to follow. If given, and the
+                latest version is a different one (that is, someone else committed in the
+                meantime), the commit is rejected.
 
-    def commit(self, alias, message=None):
+        Returns:
+            int: The version of the new revision, or of the latest one if nothing changed.
+
+        Raises:
+            ConcurrentModificationException: If the latest version is not the parent.
+        """
 
         if not self._exists(alias):
             raise exceptions.AliasNotFoundException(alias=alias)
 
-        utils.smkdir(os.path.join(self._repo_dir, alias))
+        current = self._find_current_version(alias)
+
+        if parent is not None and parent != current:
+            raise exceptions.ConcurrentModificationException(alias=alias, expected=parent,
+                                                             actual=current)
 
-        version = self._find_current_version(alias) + 1
+        version = current + 1
 
         src = self.path(alias)
-        revision_dir = os.path.join(self._repo_dir, alias, str(version))
-        utils.smkdir(revision_dir)
-        dst = os.path.join(revision_dir, 'contents')
 
-        self._logger.debug('Copying {0} --> {1}'.format(src, dst))
-        shutil.copy(src=src, dst=dst)
+        # stat before reading, so that if the file is modified while we read it,
+        # the recorded modification time is stale and 'is_dirty' looks at the contents.
+        mtime = os.stat(src).st_mtime
 
-        commit_message_file = os.path.join(revision_dir, 'commit-message')
+        with open(src, 'rb') as stream:
+            contents = stream.read()
 
-        self._logger.debug('Creating a commit message file: {0}'.format(commit_message_file))
-        with open(commit_message_file, 'w') as stream:
-            stream.write(message or '')
+        entry = {
+            'version': version,
+            'timestamp': time.time(),
+            'message': message or '',
+            'hash': ObjectStore.hash(contents),
+            'size': len(contents),
+            'mtime': mtime
+        }
 
-    def revisions(self, alias):
+        if self._unchanged(alias, entry):
+            self._logger.debug('File {0} did not change since version {1}, skipping commit'
+                               .format(src, current))
+            return current
+
+        entry.update(self._store(alias, contents, key=entry['hash']))
+
+        self._logger.debug('Adding version {0} to the index of alias {1}'.format(version, alias))
+        self._index(alias).append(entry)
+
+        return version
+
+    @profiler.profiled(profiler.DIRTY_CHECK)
+    def is_dirty(self, alias):
+
+        """
+        Check if the file was modified since its latest revision was committed.
+
+        This only stats the file if its size and modification time match the ones recorded
+        when the revision was committed (or when its contents were last found to be identical).
+        Otherwise, the file contents are hashed and compared to the latest revision. Only if the
+        contents differ, are both parsed and compared, because a change in formatting alone
+        does not make the file dirty.
+
+        Args:
+            alias (str): The alias of the file.
+
+        Returns:
+            bool: True if the file differs from its latest revision, False otherwise.
+        """
+
+        file_path = self.path(alias)
+
+        latest = self._index(alias).latest()
+
+        stat_result = os.stat(file_path)
+
+        # a file modified right after it was committed may still have the same modification
+        # time (depending on the file system resolution), so it is only trusted if it was
+        # old enough when the revision was committed, or when its contents were verified.
+        if stat_result.st_size == latest['size'] and (
+                (stat_result.st_mtime == latest.get('mtime') and
+                 latest['timestamp'] - stat_result.st_mtime > MTIME_RESOLUTION) or
+                {'version': latest['version'], 'mtime': stat_result.st_mtime} ==
+                self._file(alias).get('verified')):
+            return False
+
+        if ObjectStore.hash_file(file_path) == latest['hash']:
+            # files written by dictfile are committed right away, so their modification time is
+            # never old enough at commit time. once it is, any later modification changes it.
+            if time.time() - stat_result.st_mtime > MTIME_RESOLUTION:
+                self._verified(alias, latest['version'], stat_result.st_mtime)
+            return False
+
+        self._logger.debug('File {0} differs from version {1}, comparing parsed contents'
+                           .format(file_path, latest['version']))
+
+        return self.parse(alias) != self.parse(alias, version=latest['version'])
+
+    def latest_version(self, alias):
+
+        """
+        The version of the latest revision of an alias.
+
+        Args:
+            alias (str): The alias.
+
+        Returns:
+            int: The version.
+        """
 
         if not self._exists(alias):
             raise exceptions.AliasNotFoundException(alias=alias)
 
-        revisions = []
+        return self._find_current_version(alias)
 
-        for version in utils.lsd(os.path.join(self._repo_dir, alias)):
-            self._logger.debug('Found revision {0} for alias {1}'.format(version, alias))
-            timestamp = os.path.getmtime(os.path.join(self._repo_dir, alias, version))
-            revisions.append(Revision(alias=alias,
-                                      file_path=self.path(alias),
-                                      timestamp=timestamp,
-                                      version=int(version),
-                                      commit_message=self.message(alias, version)))
+    def revisions(self, alias):
 
-        return revisions
+        if not self._exists(alias):
+            raise exceptions.AliasNotFoundException(alias=alias)
 
-    def files(self):
+        file_path = self.path(alias)
 
-        state = self._load_state()
+        return [Revision(alias=alias,
+                         file_path=file_path,
+                         timestamp=entry['timestamp'],
+                         version=entry['version'],
+                         commit_message=entry['message'],
+                         content_hash=entry['hash'],
+                         size=entry['size'])
+                for entry in self._index(alias).entries()]
+
+    def files(self):
 
         result = []
-        for alias in state['files']:
+        for alias in self._aliases():
+            entry = self._file(alias)
             self._logger.debug('Found alias: {0}'.format(alias))
             result.append(File(alias=alias,
-                               file_path=self.path(alias),
-                               fmt=self.fmt(alias)))
+                               file_path=entry['file_path'],
+                               fmt=entry['fmt']))
 
         return result
 
-    def contents(self, alias, version):
+    def contents(self, alias, version, binary=False):
+
+        """
+        The contents of a version of the file.
+
+        Args:
+            alias (str): The alias of the file.
+            version (str): The version.
+            binary (bool): Whether to return the raw contents, rather than decoding them the
+                same way reading the file in text mode does.
+
+        Returns:
+            str, bytes: The contents.
+        """
 
         if not self._exists(alias):
             raise exceptions.AliasNotFoundException(alias=alias)
 
         version = self._convert_version(alias, version)
 
-        file_path = os.path.join(self._repo_dir, alias, str(version), 'contents')
+        entry = self._index(alias).get(version)
 
-        if not os.path.exists(file_path):
+        if entry is None:
             raise exceptions.VersionNotFoundException(alias=alias, version=version)
 
-        with open(file_path) as f:
-            self._logger.debug('Returning contents of file {0}'.format(file_path))
-            return f.read()
+        contents = self._load(alias, entry)
+
+        if contents is None:
+            raise exceptions.VersionNotFoundException(alias=alias, version=version)
+
+        return contents if binary else utils.decode(contents)
+
+    def parse(self, alias, version='current'):
+
+        """
+        Parse a version of the file. Parsed versions are cached, so parsing
+        a version that was already parsed does not require parsing it again.
+
+        Args:
+            alias (str): The alias of the file.
+            version (str): The version to parse. 'current' refers to the file itself.
+
+        Returns:
+            dict: The parsed file.
+        """
+
+        fmt = self.fmt(alias)
+
+        if version == 'current':
+            return self._parse_cache.load(file_path=self.path(alias), fmt=fmt)
+
+        version = self._convert_version(alias, version)
+
+        entry = self._index(alias).get(version)
+
+        if entry is None:
+            raise exceptions.VersionNotFoundException(alias=alias, version=version)
+
+        # the index already tells us the hash of the contents, so
+        # on a cache hit, the contents don't even need to be read.
+        parsed = self._parse_cache.get(key=entry['hash'], fmt=fmt)
+
+        if parsed is None:
+            parsed = parser.loads(string=self.contents(alias, version), fmt=fmt)
+            self._parse_cache.put(key=entry['hash'], fmt=fmt, parsed=parsed)
+
+        return parsed
+
+    def remember(self, alias, parsed):
+
+        """
+        Remember the parsed document of the file, so that parsing it does not require
+        parsing it again. Useful right after writing the file.
+
+        Args:
+            alias (str): The alias of the file.
+            parsed (dict): The document that parsing the file (as it is now) results in.
+        """
+
+        self._parse_cache.store(file_path=self.path(alias), fmt=self.fmt(alias), parsed=parsed)
 
     def message(self, alias, version):
 
@@ -194,41 +609,295 @@ class Repository(object):
 
         version = self._convert_version(alias, version)
 
-        file_path = os.path.join(self._repo_dir, alias, str(version), 'commit-message')
+        entry = self._index(alias).get(version)
 
-        if not os.path.exists(file_path):
+        if entry is None:
             raise exceptions.VersionNotFoundException(alias=alias, version=version)
 
-        with open(file_path) as f:
-            self._logger.debug('Returning contents of file {0}'.format(file_path))
-            return f.read()
+        return entry['message']
 
     def _convert_version(self, alias, version):
+
         if version == 'latest':
-            version = max([revision.version for revision in self.revisions(alias)])
+            version = self._find_current_version(alias)
             self._logger.debug("Converted version 'latest' to last version: {0}".format(version))
-        return version
+
+        try:
+            return int(version)
+        except ValueError:
+            raise exceptions.VersionNotFoundException(alias=alias, version=version)
 
     def _exists(self, alias):
+        return self._storage.load_file(alias) is not None
+
+    @_locked(state=SHARED)
+    @_durable
+    def _verified(self, alias, version, mtime):
+
+        # the file (with this modification time) is identical to this version
+        if not self._exists(alias):
+            return
+
+        entry = dict(self._file(alias))
+        entry['verified'] = {'version': version, 'mtime': mtime}
+
+        self._storage.save_file(alias, entry)
+
+    def _aliases(self):
+        return self._storage.aliases()
+
+    def _file(self, alias):
+
+        entry = self._storage.load_file(alias)
+
+        if entry is None:
+            raise exceptions.AliasNotFoundException(alias=alias)
+
+        return entry
+
+    def _unchanged(self, alias, entry):
+
+        latest = self._index(alias).latest()
+        mode = self.settings['skip_unchanged']
+
+        if latest is None or mode == SKIP_NEVER:
+            return False
+
+        if entry['hash'] == latest['hash']:
+            return True
+
+        if mode != SKIP_EQUIVALENT:
+            return False
+
+        try:
+            return self.parse(alias) == self.parse(alias, version=latest['version'])
+        except exceptions.CorruptFileException:
+            return False
+
+    def _store(self, alias, contents, key):
+
+        # identical contents are already stored in full,
+        # so there is no point in storing a delta.
+        if self._storage.objects.exists(key):
+            self._logger.debug('Contents already stored as object {0}'.format(key))
+            return {}
+
+        settings = self.settings
+        latest = self._index(alias).latest()
+
+        if settings['storage'] == DELTA_STORAGE and latest is not None:
+
+            depth = latest.get('depth', 0) + 1
+
+            if depth < settings['keyframe_interval']:
+
+                base = self._load(alias, latest)
+                patch = delta.diff(base=base, target=contents)
+
+                # deltas of completely different contents
+                # may be larger than the contents themselves.
+                if len(patch) < len(contents):
+                    delta_key = self._storage.objects.put(patch, codec=settings['compression'])
+                    self._logger.debug('Stored delta from version {0} as object {1}'
+                                       .format(latest['version'], delta_key))
+                    return {'object': delta_key, 'base': latest['version'], 'depth': depth}
 
-        state = self._load_state()
+        self._storage.objects.put(contents, codec=settings['compression'])
+        self._logger.debug('Stored contents as object {0}'.format(key))
+        return {}
 
-        return alias in state['files']
+    def _load(self, alias, entry):
+
+        # walk back to the closest revision that is stored in full,
+        # and apply the deltas from there.
+        chain = []
+        while 'base' in entry:
+            chain.append(entry)
+            entry = self._index(alias).get(entry['base'])
+
+        contents = self._storage.objects.get(entry['hash'])
+
+        for link in reversed(chain):
+            if contents is None:
+                break
+            patch = self._storage.objects.get(link['object'])
+            contents = delta.patch(base=contents, delta=patch) if patch is not None else None
+
+        return contents
+
+    @staticmethod
+    def _object_key(entry):
+
+        # revisions stored as deltas point to the delta object,
+        # revisions stored in full are stored under their own hash.
+        return entry.get('object', entry['hash'])
 
     def _find_current_version(self, alias):
 
-        versions = utils.lsd(os.path.join(self._repo_dir, alias))
+        latest = self._index(alias).latest()
 
-        if not versions:
+        if latest is None:
             return -1
 
-        return max([int(version) for version in versions])
+        return latest['version']
+
+    def _index(self, alias):
+
+        index = self._indexes.get(alias)
+
+        if index is None:
+            index = self._storage.index(alias)
+            if not index.exists():
+                with self.lock(alias):
+                    if not index.exists():
+                        self._rebuild_index(alias, index)
+            self._indexes[alias] = index
+
+        return index
+
+    def _rebuild_index(self, alias, index):
+
+        # repositories created by older versions don't have an index, and keep
+        # the contents of each revision in its own directory. the index is built once
+        # from these directories, and their contents is moved to the object store.
+        alias_dir = os.path.join(self._repo_dir, alias)
+
+        if not os.path.isdir(alias_dir):
+            return
+
+        entries = []
+        codec = self.settings['compression']
+
+        for version in sorted(int(version) for version in utils.lsd(alias_dir)):
+
+            revision_dir = os.path.join(alias_dir, str(version))
+
+            with open(os.path.join(revision_dir, 'contents'), 'rb') as stream:
+                contents = stream.read()
+
+            message = ''
+            commit_message_file = os.path.join(revision_dir, 'commit-message')
+            if os.path.exists(commit_message_file):
+                with open(commit_message_file) as stream:
+                    message = stream.read()
+
+            entries.append({
+                'version': version,
+                'timestamp': os.path.getmtime(revision_dir),
+                'message': message,
+                'hash': self._storage.objects.put(contents, codec=codec),
+                'size': len(contents)
+            })
+
+        self._logger.debug('Building index for alias {0} ({1} revisions)'
+                           .format(alias, len(entries)))
+        index.rewrite(entries)
+
+        for entry in entries:
+            shutil.rmtree(os.path.join(alias_dir, str(entry['version'])))
+
+    def _save_setting(self, name, value):
+
+        settings = self.settings
+        settings[name] = value
+
+        self._logger.debug('Setting {0} to {1}'.format(name, value))
+        writer.dump(obj=settings, file_path=self._settings_file, fmt=constants.JSON)
+        self._settings = (utils.fingerprint(self._settings_file), settings)
+
+    def _configure_engine(self, engine):
+
+        # migrating the storage copies every alias, so it holds their locks. they are
+        # acquired before the state lock, like every other operation does.
+        aliases = sorted(self._aliases()) if engine != self.settings['engine'] else []
+        locks = [self.lock(alias) for alias in aliases]
+
+        for alias_lock in locks:
+            alias_lock.acquire()
+
+        try:
+
+            # indexes of aliases created by older versions are built (under the lock of
+            # their alias) before the state lock is held.
+            with self._transaction():
+                for alias in aliases:
+                    self._index(alias)
+
+            with self._state_lock(), self._transaction():
+
+                source = self._storage
+                target = None
+
+                if engine != self.settings['engine']:
+                    target = self._migrate_storage(engine=engine)
+
+                self._save_setting('engine', engine)
+
+                # only once the repository uses the new engine, is the old one emptied.
+                if target is not None:
+                    self._storage = target
+                    self._indexes = {}
+                    source.clear()
+
+        finally:
+            for alias_lock in reversed(locks):
+                alias_lock.release()
+
+    @contextlib.contextmanager
+    def _transaction(self):
+
+        durability = self.settings['durability']
+        with atomic.barrier(durability=durability), \
+                self._storage.transaction(durability=durability):
+            yield
+
+    def _state_lock(self, shared=False):
+
+        # shared by operations that store objects, and held exclusively while deleting
+        # the objects no alias references (see gc) and while modifying settings. the locks of
+        # aliases all end with '.lock', so it never collides with one of them.
+        return lock.FileLock(os.path.join(self._locks_dir, '.state'), shared=shared)
+
+    def _migrate_state(self):
+
+        # repositories used to keep the state of all aliases in a single file.
+        if not os.path.exists(self._state_file):
+            return
+
+        self._logger.debug('Migrating state file: {0}'.format(self._state_file))
+
+        state = parser.load(file_path=self._state_file, fmt=constants.JSON)
+
+        with self.barrier():
+            for alias, entry in state['files'].items():
+                self._storage.save_file(alias, entry)
+
+        # only once all aliases are migrated, an interrupted
+        # migration is simply repeated by the next instance.
+        os.remove(self._state_file)
+
+    def _migrate_storage(self, engine):
+
+        # copy everything to the new engine, anything it stored before (from an earlier
+        # migration back and forth) is stale.
+        target = storage.create(engine=engine, directory=self._repo_dir)
+        target.clear()
+
+        self._logger.debug('Migrating repository storage to: {0}'.format(engine))
+
+        settings = self.settings
+
+        with target.transaction(durability=settings['durability']):
+
+            for alias in self._aliases():
+                target.save_file(alias, self._file(alias))
+                target.index(alias).rewrite(self._index(alias).entries())
 
-    def _load_state(self):
-        return parser.load(file_path=self._state_file, fmt=constants.JSON)
+            objects = self._storage.objects
+            for key in objects.keys():
+                target.objects.put(objects.get(key), codec=settings['compression'])
 
-    def _save_state(self, state):
-        writer.dump(obj=state, file_path=self._state_file, fmt=constants.JSON)
+        return target
 
 
 # pylint: disable=too-few-public-methods
@@ -244,8 +913,11 @@ class File(object):
 # pylint: disable=too-few-public-methods,too-many-arguments
 class Revision(object):
 
-    def __init__(self, alias, file_path, timestamp, version, commit_message):
+    def __init__(self, alias, file_path, timestamp, version, commit_message,
+                 content_hash=None, size=None):
         self.commit_message = commit_message
+        self.content_hash = content_hash
+        self.size = size
         self.alias = alias
         self.timestamp = timestamp
         self.file_path = file_path
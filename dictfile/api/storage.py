@@ -0,0 +1,483 @@
+#############################################################################
+# Copyright (c) 2018 Eli Polonsky. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#   * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   * See the License for the specific language governing permissions and
+#   * limitations under the License.
+#
+#############################################################################
+
+import contextlib
+import json
+import os
+import shutil
+import sqlite3
+
+from dictfile.api import atomic
+from dictfile.api import compression
+from dictfile.api import constants
+from dictfile.api import exceptions
+from dictfile.api import parser
+from dictfile.api import profiler
+from dictfile.api import utils
+from dictfile.api import writer
+from dictfile.api.index import Index
+from dictfile.api.objects import ObjectStore
+
+# every alias, revision and object is stored in its own file.
+FILES = 'files'
+
+# everything is stored in a single sqlite database.
+SQLITE = 'sqlite'
+
+ENGINES = [FILES, SQLITE]
+
+
+def create(engine, directory):
+
+    """
+    Open the storage of a repository.
+
+    Args:
+        engine (str): One of ENGINES.
+        directory (str): The repository directory.
+
+    Returns:
+        Storage: The storage.
+    """
+
+    if engine == FILES:
+        return FileStorage(directory)
+
+    if engine == SQLITE:
+        return SQLiteStorage(os.path.join(directory, 'repo.sqlite'))
+
+    raise exceptions.InvalidArgumentsException(
+        'engine must be one of: {0}'.format(', '.join(ENGINES)))
+
+
+class Storage(object):
+
+    """
+    Where a repository keeps the state of its aliases, their revisions and the stored objects.
+
+    The revisions of each alias are accessed through an index (see index.Index), and the
+    objects through an object store (see objects.ObjectStore), every engine provides
+    objects with the same interface.
+
+    """
+
+    @property
+    def objects(self):
+
+        """
+        The store of revision contents.
+
+        Returns:
+            objects.ObjectStore: The object store (or an object with the same interface).
+        """
+
+        raise NotImplementedError()
+
+    def index(self, alias):
+
+        """
+        The index of the revisions of an alias.
+
+        Args:
+            alias (str): The alias.
+
+        Returns:
+            index.Index: The index (or an object with the same interface).
+        """
+
+        raise NotImplementedError()
+
+    def aliases(self):
+
+        """
+        All tracked aliases.
+
+        Returns:
+            list: The aliases, sorted.
+        """
+
+        raise NotImplementedError()
+
+    def load_file(self, alias):
+
+        """
+        Retrieve the state of an alias.
+
+        Args:
+            alias (str): The alias.
+
+        Returns:
+            dict: The path and format of the tracked file (and when its contents were last
+                verified, see Repository.is_dirty), or None if the alias does not exist.
+        """
+
+        raise NotImplementedError()
+
+    def save_file(self, alias, entry):
+
+        """
+        Store the state of an alias.
+
+        Args:
+            alias (str): The alias.
+            entry (dict): The path and format of the tracked file (and when its contents were
+                last verified, see Repository.is_dirty).
+        """
+
+        raise NotImplementedError()
+
+    def remove(self, alias):
+
+        """
+        Delete the state and revisions of an alias. Its objects are kept.
+
+        Args:
+            alias (str): The alias.
+        """
+
+        raise NotImplementedError()
+
+    def clear(self):
+
+        """
+        Delete everything stored.
+        """
+
+        raise NotImplementedError()
+
+    def transaction(self, durability=atomic.DEFAULT_DURABILITY):
+
+        """
+        Group the modifications of a single operation, nested transactions join the outermost.
+
+        Args:
+            durability (str): One of atomic.DURABILITY_MODES.
+
+        Returns:
+            A context manager.
+        """
+
+        raise NotImplementedError()
+
+
+class FileStorage(Storage):
+
+    """
+    Keeps the state and index of every alias in its own directory, and the objects in a
+    content addressed store of files. Writes are flushed by the durability barrier
+    (see atomic.barrier) instead of by transactions.
+
+    Args:
+        directory (str): The repository directory.
+
+    """
+
+    _directory = None
+    _objects = None
+    _files = None
+
+    def __init__(self, directory):
+        self._directory = directory
+        self._objects = ObjectStore(os.path.join(directory, '.objects'))
+        self._files = {}
+
+    @property
+    def objects(self):
+        return self._objects
+
+    def index(self, alias):
+        return Index(os.path.join(self._directory, alias, 'index'))
+
+    def aliases(self):
+        return sorted(alias for alias in utils.lsd(self._directory)
+                      if os.path.exists(self._file_path(alias)))
+
+    def load_file(self, alias):
+
+        # the state is parsed only once per instance, and re-parsed only if
+        # another process (or instance) has modified the state file since.
+        try:
+            fingerprint = utils.fingerprint(self._file_path(alias))
+        except OSError:
+            return None
+
+        cached = self._files.get(alias)
+
+        if cached is None or cached[0] != fingerprint:
+            with profiler.span(profiler.STATE_LOAD):
+                entry = parser.load(file_path=self._file_path(alias), fmt=constants.JSON)
+            cached = self._files[alias] = (fingerprint, entry)
+
+        return cached[1]
+
+    def save_file(self, alias, entry):
+
+        utils.smkdir(os.path.join(self._directory, alias))
+        writer.dump(obj=entry, file_path=self._file_path(alias), fmt=constants.JSON)
+        self._files[alias] = (utils.fingerprint(self._file_path(alias)), entry)
+
+    def remove(self, alias):
+
+        # the alias is gone as soon as its state is, even if deleting its revisions fails.
+        os.remove(self._file_path(alias))
+        self._files.pop(alias, None)
+
+        shutil.rmtree(os.path.join(self._directory, alias))
+
+    def clear(self):
+
+        for alias in self.aliases():
+            self.remove(alias)
+
+        utils.rmf(self._objects.directory)
+        utils.smkdir(self._objects.directory)
+
+    @contextlib.contextmanager
+    def transaction(self, durability=atomic.DEFAULT_DURABILITY):
+        yield
+
+    def _file_path(self, alias):
+
+        # the state of each alias is kept in its own directory, so adding and removing
+        # aliases never rewrites (or contends on) the state of the others.
+        return os.path.join(self._directory, alias, 'file.json')
+
+
+class SQLiteStorage(Storage):
+
+    """
+    Keeps everything in a single sqlite database (in WAL mode), so every operation is
+    a single transaction, and history queries on aliases with many revisions are indexed
+    lookups. Backing up the repository is copying the database file.
+
+    Args:
+        file_path (str): Path to the database file, created if it does not exist.
+
+    """
+
+    _SCHEMA = [
+        'CREATE TABLE IF NOT EXISTS files ('
+        'alias TEXT PRIMARY KEY, file_path TEXT NOT NULL, fmt TEXT NOT NULL, verified TEXT)',
+        'CREATE TABLE IF NOT EXISTS revisions ('
+        'alias TEXT NOT NULL, version INTEGER NOT NULL, timestamp REAL NOT NULL, '
+        'entry TEXT NOT NULL, PRIMARY KEY (alias, version))',
+        'CREATE INDEX IF NOT EXISTS revisions_timestamp ON revisions (alias, timestamp)',
+        'CREATE TABLE IF NOT EXISTS objects ('
+        'key TEXT PRIMARY KEY, codec TEXT NOT NULL, contents BLOB NOT NULL)'
+    ]
+
+    # how sqlite flushes transactions for every durability mode.
+    _SYNCHRONOUS = {
+        atomic.NONE: 'OFF',
+        atomic.FILE: 'NORMAL',
+        atomic.FULL: 'FULL'
+    }
+
+    _file_path = None
+    _connection = None
+    _objects = None
+    _depth = 0
+
+    def __init__(self, file_path):
+
+        self._file_path = file_path
+
+        # transactions are started explicitly (see transaction), reads outside
+        # of them don't hold any lock on the database.
+        self._connection = sqlite3.connect(file_path, isolation_level=None,
+                                           timeout=60, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+
+        with self.transaction():
+            for statement in self._SCHEMA:
+                self._connection.execute(statement)
+
+        self._objects = _SQLiteObjectStore(self)
+
+    @property
+    def file_path(self):
+        return self._file_path
+
+    @property
+    def objects(self):
+        return self._objects
+
+    def index(self, alias):
+        return _SQLiteIndex(self, alias)
+
+    def aliases(self):
+        return [row[0] for row in self.execute('SELECT alias FROM files ORDER BY alias')]
+
+    def load_file(self, alias):
+
+        with profiler.span(profiler.STATE_LOAD):
+            row = self.execute('SELECT file_path, fmt, verified FROM files WHERE alias = ?',
+                               (alias,)).fetchone()
+
+        if row is None:
+            return None
+
+        entry = {'file_path': row[0], 'fmt': row[1]}
+
+        if row[2] is not None:
+            entry['verified'] = json.loads(row[2])
+
+        return entry
+
+    def save_file(self, alias, entry):
+
+        verified = entry.get('verified')
+
+        self.execute('INSERT OR REPLACE INTO files (alias, file_path, fmt, verified) '
+                     'VALUES (?, ?, ?, ?)',
+                     (alias, entry['file_path'], entry['fmt'],
+                      None if verified is None else json.dumps(verified)))
+
+    def remove(self, alias):
+        with self.transaction():
+            self.execute('DELETE FROM files WHERE alias = ?', (alias,))
+            self.execute('DELETE FROM revisions WHERE alias = ?', (alias,))
+
+    def clear(self):
+        with self.transaction():
+            for table in ['files', 'revisions', 'objects']:
+                self.execute('DELETE FROM {0}'.format(table))
+
+    @contextlib.contextmanager
+    def transaction(self, durability=atomic.DEFAULT_DURABILITY):
+
+        if self._depth > 0:
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+            return
+
+        atomic.validate(durability)
+
+        self._connection.execute('PRAGMA synchronous={0}'.format(self._SYNCHRONOUS[durability]))
+        self._connection.execute('BEGIN IMMEDIATE')
+        self._depth = 1
+
+        try:
+            yield
+        except BaseException:
+            self._depth = 0
+            self._connection.execute('ROLLBACK')
+            raise
+
+        self._depth = 0
+
+        with profiler.span(profiler.WRITE):
+            self._connection.execute('COMMIT')
+
+    def execute(self, statement, parameters=()):
+        return self._connection.execute(statement, parameters)
+
+    def close(self):
+        self._connection.close()
+
+
+class _SQLiteIndex(object):
+
+    """
+    The revisions of an alias in an sqlite database, see index.Index.
+
+    """
+
+    def __init__(self, storage, alias):
+        self._storage = storage
+        self._alias = alias
+
+    @staticmethod
+    def exists():
+        return True
+
+    def entries(self):
+        return [json.loads(row[0]) for row in self._storage.execute(
+            'SELECT entry FROM revisions WHERE alias = ? ORDER BY version', (self._alias,))]
+
+    def get(self, version):
+
+        row = self._storage.execute('SELECT entry FROM revisions WHERE alias = ? AND version = ?',
+                                    (self._alias, version)).fetchone()
+
+        return json.loads(row[0]) if row is not None else None
+
+    def latest(self):
+
+        row = self._storage.execute(
+            'SELECT entry FROM revisions WHERE alias = ? ORDER BY version DESC LIMIT 1',
+            (self._alias,)).fetchone()
+
+        return json.loads(row[0]) if row is not None else None
+
+    def append(self, entry):
+        self._storage.execute(
+            'INSERT INTO revisions (alias, version, timestamp, entry) VALUES (?, ?, ?, ?)',
+            (self._alias, entry['version'], entry['timestamp'], json.dumps(entry, sort_keys=True)))
+
+    def rewrite(self, entries):
+        with self._storage.transaction():
+            self._storage.execute('DELETE FROM revisions WHERE alias = ?', (self._alias,))
+            for entry in entries:
+                self.append(entry)
+
+
+class _SQLiteObjectStore(object):
+
+    """
+    A content addressed store of blobs in an sqlite database, see objects.ObjectStore.
+
+    """
+
+    hash = staticmethod(ObjectStore.hash)
+    hash_file = staticmethod(ObjectStore.hash_file)
+
+    def __init__(self, storage):
+        self._storage = storage
+
+    def exists(self, key):
+        return self._storage.execute('SELECT 1 FROM objects WHERE key = ?',
+                                     (key,)).fetchone() is not None
+
+    def put(self, contents, codec=compression.NONE):
+
+        key = self.hash(contents)
+
+        self._storage.execute(
+            'INSERT OR IGNORE INTO objects (key, codec, contents) VALUES (?, ?, ?)',
+            (key, codec, sqlite3.Binary(compression.compress(contents, codec=codec))))
+
+        return key
+
+    def get(self, key):
+
+        row = self._storage.execute('SELECT codec, contents FROM objects WHERE key = ?',
+                                    (key,)).fetchone()
+
+        if row is None:
+            return None
+
+        return compression.decompress(bytes(row[1]), codec=row[0])
+
+    def delete(self, key):
+        self._storage.execute('DELETE FROM objects WHERE key = ?', (key,))
+
+    def keys(self):
+        return set(row[0] for row in self._storage.execute('SELECT key FROM objects'))
@@ -0,0 +1,667 @@
+#############################################################################
+# Copyright (c) 2018 Eli Polonsky. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#   * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   * See the License for the specific language governing permissions and
+#   * limitations under the License.
+#
+#############################################################################
+
+import json
+import re
+
+import six
+
+from dictfile.api import backend
+from dictfile.api import constants
+from dictfile.api import exceptions
+from dictfile.api import keypath
+from dictfile.api import parser
+from dictfile.api import profiler
+
+# formats that support retrieving a key without loading the entire document
+STREAMING_FORMATS = [constants.JSON, constants.YAML]
+
+# minimal number of characters read from a json file at a time
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_STRING_END = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+# the next bracket, skipping complete strings
+_BRACKET = re.compile(r'[^"{}\[\]]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"{}\[\]]*)*([{}\[\]])',
+                      re.DOTALL)
+# an object key, including the name separator
+_KEY = re.compile(r'[ \t\n\r]*("[^"\\]*(?:\\.[^"\\]*)*")[ \t\n\r]*:', re.DOTALL)
+_SCALAR = re.compile(r'[^\s,\]}]*')
+# keys that are written the same way wherever they appear, unless escaped (see _repeated)
+_PLAIN_KEY = re.compile(r'^[a-zA-Z0-9_.-]+\Z')
+# an escape sequence of a character that may be part of a plain key, and a yaml alias.
+# either may spell a key without it appearing in the text as is.
+_ESCAPE = re.compile(r'\\(?:x|u00|U000000)[2-7]')
+_ALIAS = re.compile(r'[\s\[{,?:]\*[\w-]')
+
+_STR_TAG = 'tag:yaml.org,2002:str'
+_MERGE_TAG = 'tag:yaml.org,2002:merge'
+
+
+@profiler.profiled(profiler.PARSE)
+def get(file_path, fmt, key):
+
+    """
+    Retrieve the value of a key, without loading the entire document.
+
+    The document is read until the value of the key is fully read, and everything before it
+    is skipped without being materialized. That is, memory is bounded by the size of the
+    value rather than the size of the document. Note that skipped parts of the document are
+    not validated.
+
+    Loading a mapping that contains the same key more than once keeps its last occurrence.
+    The text of the document is searched (which is much faster than parsing it) for keys along
+    the way that may appear again. The rest of the mappings of those keys is skipped as well,
+    and if a key does appear again (or is not found in its first occurrence), the document
+    is loaded entirely.
+
+    Yaml documents that use aliases or merge keys along the way to (or inside of) the value,
+    are loaded entirely.
+
+    Args:
+        file_path (str): The file.
+        fmt (str): The format of the file, one of STREAMING_FORMATS.
+        key (str, KeyPath): The key to retrieve.
+
+    Returns:
+        The value of the key.
+
+    Raises:
+        KeyNotFoundException: If the key does not exist in the document.
+        CorruptFileException: If the document is invalid.
+    """
+
+    path = keypath.parse(key)
+
+    if fmt == constants.JSON:
+        get_value = _get_json
+    elif fmt == constants.YAML:
+        get_value = _get_yaml
+    else:
+        raise exceptions.UnsupportedFormatException(fmt=fmt)
+
+    def repeats(keys):
+        with open(file_path) as text:
+            return _repeated(text, keys)
+
+    with open(file_path) as stream:
+        try:
+            return get_value(stream, path, repeats)
+        except _Unsupported:
+            pass
+        except _stream_errors() as e:
+            raise exceptions.CorruptFileException(file_path=file_path, message=str(e))
+
+    return path.get(parser.load(file_path, fmt=fmt))
+
+
+def _stream_errors():
+
+    # the yaml backend is only imported when needed
+    import yaml
+
+    return yaml.YAMLError, ValueError
+
+
+class _Unsupported(Exception):
+    pass
+
+
+def _repeated(stream, keys):
+
+    # the keys that may appear in the text more times than they do along the way to the value.
+    # searching the text is much faster than skipping the rest of the document (especially
+    # yaml), and errs on the side of including a key.
+    repeated = set(key for key in keys if not _PLAIN_KEY.match(key))
+    counts = dict((key, 0) for key in keys if key not in repeated)
+
+    if not counts:
+        return repeated
+
+    # the last characters of every chunk are kept, to find a key cut by the end of the chunk.
+    margin = max(len(key) for key in counts) + len('\\U0000002')
+
+    text = ''
+    # occurrences that end before this position of the text were already counted
+    counted = 0
+
+    while counts:
+
+        chunk = stream.read(CHUNK_SIZE)
+
+        dropped = max(len(text) - margin, 0)
+        text = text[dropped:] + chunk
+        counted -= dropped
+
+        if ('\\' in text and _ESCAPE.search(text)) or ('*' in text and _ALIAS.search(text)):
+            return set(keys)
+
+        # an occurrence is counted once the character following it was read as well.
+        end = len(text) - 1 if chunk else len(text)
+
+        for key in list(counts):
+            counts[key] += _occurrences(text, key, counted, end)
+            if counts[key] > keys.count(key):
+                repeated.add(key)
+                del counts[key]
+
+        counted = end + 1
+
+        if not chunk:
+            break
+
+    return repeated
+
+
+def _occurrences(text, key, first, last):
+
+    # the number of times the key appears in the text (ending between the given positions) as
+    # an entire scalar, or a part of one separated by spaces or indicators, but not of a word.
+    count = 0
+
+    start = text.find(key, max(first - len(key), 0))
+
+    while 0 <= start <= last - len(key):
+        end = start + len(key)
+        if end >= first and not _in_word(text, start - 1) and not _in_word(text, end):
+            count += 1
+        start = text.find(key, end)
+
+    return count
+
+
+def _in_word(text, position):
+    return 0 <= position < len(text) and (text[position].isalnum() or text[position] in '_.-')
+
+
+def _outermost(keys, repeats):
+
+    # the level of the outermost mapping whose key may appear again, the rest of every
+    # container from that level inwards must be skipped to find out. keys of sequences are None.
+    repeated = repeats([key for key in keys if key is not None])
+    levels = [level for level, key in enumerate(keys) if key in repeated]
+
+    return levels[0] if levels else len(keys)
+
+
+def _not_found(path, keys, repeats):
+
+    # the key may be found in a later occurrence of one of the mappings along the way,
+    # which is the one loaded. keys of sequences are None.
+    if repeats([key for key in keys if key is not None]):
+        raise _Unsupported()
+
+    raise exceptions.KeyNotFoundException(key=path.key)
+
+
+def _get_json(stream, path, repeats):
+
+    reader = _JsonReader(stream)
+
+    # the closing bracket of every container along the way, and the key found in it.
+    containers = []
+
+    for part, index in path.steps:
+
+        enclosing = [key for _, key in containers]
+
+        char = reader.peek()
+
+        if char == '{':
+            reader.advance()
+            found = reader.find_key(part)
+            containers.append(('}', part))
+        elif char == '[' and index is not None:
+            reader.advance()
+            found = reader.find_index(index)
+            containers.append((']', None))
+        else:
+            found = False
+
+        if not found:
+            _not_found(path, enclosing, repeats)
+
+    value = reader.value()
+
+    start = _outermost([part for _, part in containers], repeats)
+
+    for closing, part in reversed(containers[start:]):
+        if reader.skip_rest(closing, key=part):
+            # the value of a later occurrence is the one loaded
+            raise _Unsupported()
+
+    return value
+
+
+class _JsonReader(object):
+
+    """Reads json tokens from a stream, holding (mostly) just the token being read in memory.
+
+    Args:
+        stream (file): The stream to read from.
+
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._buffer = ''
+        self._position = 0
+        # pylint: disable=protected-access
+        self._decoder = json.JSONDecoder(object_hook=parser._encode_keys if six.PY2 else None)
+
+    def peek(self):
+
+        """The next non whitespace character, or an empty string at the end of the stream."""
+
+        while True:
+            self._position = _WHITESPACE.match(self._buffer, self._position).end()
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if not self._fill():
+                return ''
+
+    def advance(self):
+        self._position += 1
+
+    def expect(self, char):
+
+        actual = self.peek()
+        if actual != char:
+            raise ValueError('Expecting {0!r}, found {1!r}'.format(char, actual))
+        self.advance()
+
+    def find_key(self, key):
+
+        """Position the reader at the value of a key of the object being read."""
+
+        if self.peek() == '}':
+            return False
+
+        while True:
+
+            name = self._key()
+
+            if name == key:
+                return True
+
+            self.skip()
+
+            separator = self.peek()
+            self.advance()
+
+            if separator == '}':
+                return False
+            if separator != ',':
+                raise ValueError("Expecting ',' or '}}', found {0!r}".format(separator))
+
+    def find_index(self, index):
+
+        """Position the reader at an element of the array being read."""
+
+        if self.peek() == ']':
+            return False
+
+        position = 0
+
+        while True:
+
+            if position == index:
+                return True
+
+            self.skip()
+            position += 1
+
+            separator = self.peek()
+            self.advance()
+
+            if separator == ']':
+                return False
+            if separator != ',':
+                raise ValueError("Expecting ',' or ']', found {0!r}".format(separator))
+
+    def skip_rest(self, closing, key=None):
+
+        """Skip the rest of the object (or array) being read, returns whether it contains
+        the key."""
+
+        while True:
+
+            separator = self.peek()
+            self.advance()
+
+            if separator == closing:
+                return False
+            if separator != ',':
+                raise ValueError('Expecting {0!r} or {1!r}, found {2!r}'.format(
+                    ',', closing, separator))
+
+            if closing == '}' and self._key() == key:
+                return True
+
+            self.skip()
+
+    def value(self, expected_type=None):
+
+        """Read (and materialize) the next value."""
+
+        char = self.peek()
+
+        if char not in '"{[':
+            # make sure the entire scalar is in the buffer, a number
+            # may otherwise be cut in the middle.
+            self._scan(_SCALAR, self._position)
+
+        while True:
+            try:
+                value, self._position = self._decoder.raw_decode(self._buffer, self._position)
+                break
+            except ValueError:
+                if not self._fill():
+                    raise
+
+        if expected_type is not None and not isinstance(value, expected_type):
+            raise ValueError('Expecting a string, found {0!r}'.format(value))
+
+        return value
+
+    def skip(self):
+
+        """Skip the next value, without materializing it."""
+
+        char = self.peek()
+
+        if char == '"':
+            self._position = self._scan(_STRING_END, self._position + 1)
+            return
+
+        if char not in '{[':
+            self._position = self._scan(_SCALAR, self._position)
+            return
+
+        try:
+            # decoding a value that is entirely in the buffer (that is, a bounded
+            # amount of memory) is considerably faster than scanning it.
+            _, self._position = self._decoder.raw_decode(self._buffer, self._position)
+            return
+        except ValueError:
+            pass
+
+        depth = 0
+        match = _BRACKET.match
+
+        while True:
+
+            found = match(self._buffer, self._position)
+
+            if found is None:
+                # the end of the buffer, possibly in the middle of a string
+                if not self._fill():
+                    raise ValueError('Unexpected end of document')
+                continue
+
+            self._position = found.end()
+
+            if found.group(1) in '{[':
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def _key(self):
+
+        match = _KEY.match(self._buffer, self._position)
+
+        if match is None:
+            # possibly cut by the end of the buffer
+            name = self.value(expected_type=six.string_types)
+            self.expect(':')
+            return name
+
+        self._position = match.end()
+        name = match.group(1)
+
+        return json.loads(name) if '\\' in name else name[1:-1]
+
+    def _scan(self, pattern, position):
+
+        # the end position of a match of the pattern, that is not cut by the end of the buffer.
+        while True:
+
+            offset = position - self._position
+            match = pattern.match(self._buffer, position)
+
+            if match is not None and match.end() < len(self._buffer):
+                return match.end()
+
+            if not self._fill():
+                if match is None:
+                    raise ValueError('Unexpected end of document')
+                return match.end()
+
+            position = self._position + offset
+
+    def _fill(self):
+
+        # drop what was already read, and read at least as much as is left
+        # in the buffer. this way, a long token is read in a linear time.
+        self._buffer = self._buffer[self._position:]
+        self._position = 0
+
+        chunk = self._stream.read(max(CHUNK_SIZE, len(self._buffer)))
+        self._buffer += chunk
+
+        return bool(chunk)
+
+
+def _get_yaml(stream, path, repeats):
+
+    from yaml import events
+
+    loader = backend.yaml_loader()(stream)
+
+    try:
+
+        loader.get_event()
+
+        if not loader.check_event(events.DocumentStartEvent):
+            # an empty document
+            raise exceptions.KeyNotFoundException(key=path.key)
+
+        loader.get_event()
+
+        # the key found in every mapping along the way (None for sequences)
+        containers = []
+
+        for part, index in path.steps:
+
+            enclosing = list(containers)
+
+            event = loader.get_event()
+
+            if _explicit_tag(event):
+                # the value may be constructed into something else than a mapping or a sequence
+                raise _Unsupported()
+
+            if isinstance(event, events.MappingStartEvent):
+                found = _find_yaml_key(loader, part)
+                containers.append(part)
+            elif isinstance(event, events.SequenceStartEvent) and index is not None:
+                found = _find_yaml_index(loader, index)
+                containers.append(None)
+            elif isinstance(event, events.AliasEvent):
+                raise _Unsupported()
+            else:
+                found = False
+
+            if not found:
+                _not_found(path, enclosing, repeats)
+
+        node = _compose(loader, loader.get_event())
+
+        start = _outermost(containers, repeats)
+
+        for part in reversed(containers[start:]):
+            if _skip_yaml_rest(loader, key=part):
+                # the value of a later occurrence is the one loaded
+                raise _Unsupported()
+
+        return loader.construct_document(node)
+
+    finally:
+        loader.dispose()
+
+
+def _find_yaml_key(loader, key):
+
+    from yaml import events
+
+    while not loader.check_event(events.MappingEndEvent):
+
+        event = loader.get_event()
+
+        if isinstance(event, events.AliasEvent):
+            raise _Unsupported()
+
+        if isinstance(event, events.ScalarEvent):
+            tag = _tag(loader, event)
+            if tag == _MERGE_TAG:
+                raise _Unsupported()
+            if tag == _STR_TAG and event.value == key:
+                return True
+        else:
+            _skip_yaml(loader, event)
+
+        _skip_yaml(loader, loader.get_event())
+
+    return False
+
+
+def _find_yaml_index(loader, index):
+
+    from yaml import events
+
+    position = 0
+
+    while not loader.check_event(events.SequenceEndEvent):
+
+        if position == index:
+            return True
+
+        _skip_yaml(loader, loader.get_event())
+        position += 1
+
+    return False
+
+
+def _skip_yaml_rest(loader, key=None):
+
+    # skip the rest of the mapping (or sequence, if there is no key) being read,
+    # returns whether it contains the key.
+    from yaml import events
+
+    end = events.SequenceEndEvent if key is None else events.MappingEndEvent
+
+    while not loader.check_event(end):
+
+        event = loader.get_event()
+
+        if key is not None:
+            if isinstance(event, events.AliasEvent):
+                # the key may be an alias of the same string
+                raise _Unsupported()
+            if isinstance(event, events.ScalarEvent) and _tag(loader, event) == _STR_TAG and \
+                    event.value == key:
+                return True
+            _skip_yaml(loader, event)
+            event = loader.get_event()
+
+        _skip_yaml(loader, event)
+
+    loader.get_event()
+
+    return False
+
+
+def _skip_yaml(loader, event):
+
+    from yaml import events
+
+    if not isinstance(event, events.CollectionStartEvent):
+        return
+
+    depth = 1
+
+    while depth:
+        event = loader.get_event()
+        if isinstance(event, events.CollectionStartEvent):
+            depth += 1
+        elif isinstance(event, events.CollectionEndEvent):
+            depth -= 1
+
+
+def _compose(loader, event):
+
+    # the same as the yaml composer, which is not available with the libyaml bindings.
+    from yaml import events
+    from yaml import nodes
+
+    if isinstance(event, events.AliasEvent):
+        raise _Unsupported()
+
+    if isinstance(event, events.ScalarEvent):
+        return nodes.ScalarNode(_tag(loader, event), event.value,
+                                event.start_mark, event.end_mark, style=event.style)
+
+    if isinstance(event, events.SequenceStartEvent):
+        node = nodes.SequenceNode(_tag(loader, event), [],
+                                  event.start_mark, None, flow_style=event.flow_style)
+        while not loader.check_event(events.SequenceEndEvent):
+            node.value.append(_compose(loader, loader.get_event()))
+    else:
+        node = nodes.MappingNode(_tag(loader, event), [],
+                                 event.start_mark, None, flow_style=event.flow_style)
+        while not loader.check_event(events.MappingEndEvent):
+            key_node = _compose(loader, loader.get_event())
+            if key_node.tag == _MERGE_TAG:
+                raise _Unsupported()
+            node.value.append((key_node, _compose(loader, loader.get_event())))
+
+    node.end_mark = loader.get_event().end_mark
+
+    return node
+
+
+def _tag(loader, event):
+
+    from yaml import events
+    from yaml import nodes
+
+    if _explicit_tag(event):
+        return event.tag
+
+    if isinstance(event, events.ScalarEvent):
+        return loader.resolve(nodes.ScalarNode, event.value, event.implicit)
+
+    if isinstance(event, events.SequenceStartEvent):
+        return loader.resolve(nodes.SequenceNode, None, event.implicit)
+
+    return loader.resolve(nodes.MappingNode, None, event.implicit)
+
+
+def _explicit_tag(event):
+    return getattr(event, 'tag', None) not in [None, '!']
@@ -15,10 +15,14 @@
 #
 #############################################################################
 
+import io
+import locale
 import stat
 import shutil
 import os
 
+import six
+
 
 def lsf(directory):
 
@@ -30,6 +34,48 @@ def lsd(directory):
     return [f for f in os.listdir(directory) if os.path.isdir(os.path.join(directory, f))]
 
 
+def fingerprint(file_path):
+
+    """
+    Cheaply identify the current version of a file, without reading it.
+
+    Args:
+        file_path (str): Path to the file.
+
+    Returns:
+        tuple: The inode, size and modification time of the file.
+    """
+
+    stat_result = os.stat(file_path)
+
+    # st_mtime_ns is not available on python 2
+    mtime = getattr(stat_result, 'st_mtime_ns', stat_result.st_mtime)
+
+    return stat_result.st_ino, stat_result.st_size, mtime
+
+
+def decode(contents):
+
+    """
+    Decode the contents of a file, the same way reading the file in text mode does.
+
+    That is, with the preferred encoding of the locale and universal newlines. On python 2,
+    where text mode reads bytes, the contents are returned as is.
+
+    Args:
+        contents (bytes): The raw contents of the file.
+
+    Returns:
+        str: The text.
+    """
+
+    if six.PY2:
+        return contents
+
+    stream = io.TextIOWrapper(io.BytesIO(contents), encoding=locale.getpreferredencoding(False))
+    return stream.read()
+
+
 def smkdir(directory):
 
     if not os.path.exists(directory):
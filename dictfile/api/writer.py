@@ -15,33 +15,38 @@
 #
 #############################################################################
 
-import configparser
 import json
 
 import six
 
-import javaproperties
-import yaml
-
+from dictfile.api import atomic
+from dictfile.api import backend
 from dictfile.api import constants
 from dictfile.api import exceptions
+from dictfile.api import profiler
 
 
-def dump(obj, file_path, fmt):
+def dump(obj, file_path, fmt, durability=atomic.DEFAULT_DURABILITY):
 
+    # the file is replaced atomically, a crash never leaves it partially written.
     string = dumps(obj=obj, fmt=fmt)
-    with open(file_path, 'w') as stream:
-        stream.write(string)
+    atomic.write(file_path, string, durability=durability)
 
 
+@profiler.profiled(profiler.SERIALIZE)
 def dumps(obj, fmt):
 
     if fmt == constants.JSON:
         return json.dumps(obj=obj, sort_keys=True, indent=2)
 
     elif fmt == constants.YAML:
+
+        # format backends are imported only when needed, to keep startup fast.
+        import yaml
+
         stream = six.StringIO()
-        yaml.safe_dump(data=obj, stream=stream, default_flow_style=False)
+        yaml.dump(data=obj, stream=stream, Dumper=backend.yaml_dumper(),
+                  default_flow_style=False)
         return stream.getvalue()
 
     elif fmt == constants.PROPERTIES:
@@ -57,10 +62,14 @@ def dumps(obj, fmt):
                                                            actual_type=type(value))
             obj[key] = str(value)
 
+        import javaproperties
+
         return javaproperties.dumps(props=obj, timestamp=False)
 
     elif fmt == constants.INI:
 
+        import configparser
+
         ini_parser = configparser.ConfigParser()
         string = six.StringIO()
         ini_parser.read_dict(dictionary=obj)
@@ -0,0 +1,161 @@
+#############################################################################
+# Copyright (c) 2018 Eli Polonsky. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#   * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   * See the License for the specific language governing permissions and
+#   * limitations under the License.
+#
+#############################################################################
+
+"""
+The command line entry point.
+
+If a server is running (see 'dictfile serve'), the command is forwarded to it before
+anything heavy (click, the commands, the format libraries) is imported. Only if the
+command has to be executed locally, the rest of the application is imported.
+
+Note that this module is imported before anything else, so it should only import
+the standard library.
+"""
+
+import json
+import os
+import socket
+import sys
+
+from dictfile.api.constants import PROGRAM_NAME
+
+# set this environment variable to always execute commands
+# locally, even if a server is running.
+NO_SERVER_ENV_VAR = 'DICTFILE_NO_SERVER'
+
+SOCKET_NAME = 'server.sock'
+
+# the options of the main command that take a value, see 'subcommand'.
+VALUE_OPTIONS = ['--profile-format', '--profile-output']
+
+
+def main():
+
+    forward_command(sys.argv[1:])
+
+    from dictfile.shell.main import app
+
+    # pylint: disable=no-value-for-parameter
+    return app()
+
+
+def forward_command(args):
+
+    """
+    Execute a command on a running server, exiting with its exit code.
+
+    Args:
+        args (list): The command line arguments.
+
+    Returns:
+        None: If the command should be executed locally (otherwise, this does not return).
+    """
+
+    forwarded = forward(args, path=socket_path(config_dir()))
+
+    if forwarded is None:
+        return
+
+    output, error, exit_code = forwarded
+
+    sys.stdout.write(output)
+    sys.stdout.flush()
+    sys.stderr.write(error)
+    sys.stderr.flush()
+
+    sys.exit(exit_code)
+
+
+def config_dir():
+    return os.path.join(os.path.expanduser('~'), '.{0}'.format(PROGRAM_NAME))
+
+
+def socket_path(directory):
+    return os.path.join(directory, SOCKET_NAME)
+
+
+def forward(args, path):
+
+    """
+    Execute a command on a running server.
+
+    Args:
+        args (list): The command line arguments.
+        path (str): Path to the server socket.
+
+    Returns:
+        tuple: The command output, error output and exit code, or None if the command should be
+            executed locally (no server is running, or the command cannot be forwarded).
+    """
+
+    if os.environ.get(NO_SERVER_ENV_VAR) or not hasattr(socket, 'AF_UNIX'):
+        return None
+
+    # 'serve' obviously cannot be forwarded, and reading from
+    # standard input ('-') is not supported by the server.
+    if subcommand(args) == 'serve' or '-' in args or not os.path.exists(path):
+        return None
+
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+    try:
+        client.connect(path)
+    except socket.error:
+        # a stale socket of a server that is no longer running
+        client.close()
+        return None
+
+    try:
+        request = {'args': args, 'cwd': os.getcwd()}
+        client.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        client.shutdown(socket.SHUT_WR)
+        response = json.loads(receive(client).decode('utf-8'))
+    finally:
+        client.close()
+
+    return response['output'], response['error'], response['exit_code']
+
+
+def subcommand(args):
+
+    """
+    The name of the command being executed, that is, the first argument that is not an option
+    of the main command.
+
+    Args:
+        args (list): The command line arguments.
+
+    Returns:
+        str: The name of the command, or None if there is none.
+    """
+
+    index = 0
+    while index < len(args) and args[index].startswith('-'):
+        index += 2 if args[index] in VALUE_OPTIONS else 1
+
+    return args[index] if index < len(args) else None
+
+
+def receive(connection):
+
+    chunks = []
+    while True:
+        chunk = connection.recv(65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    return b''.join(chunks)
@@ -15,14 +15,22 @@
 #
 #############################################################################
 
+import json
+import os
 from functools import wraps
 
 import click
+import six
 
-from dictfile.api import writer
+from dictfile.api import parser
 from dictfile.api import constants
 from dictfile.api import exceptions
-from dictfile.shell import handle_exceptions
+from dictfile.api import stream
+from dictfile.shell import solutions, handle_exceptions, causes
+from dictfile.shell import log
+
+# files at least this large are read with a streaming parser by 'get', instead of being loaded.
+STREAMING_GET_THRESHOLD = 1024 * 1024
 
 
 def commit(func):
@@ -44,9 +52,18 @@ def commit(func):
         message = kwargs['message']
         del kwargs['message']
 
-        func(*args, **kwargs)
+        repo = ctx.parent.parent.repo
+
+        # the modified file and the revision committed
+        # for it are flushed to disk together.
+        with repo.barrier():
+
+            func(*args, **kwargs)
 
-        ctx.parent.parent.repo.commit(alias, message)
+            # a command that did not change the file has nothing to commit.
+            patcher = ctx.parent.patcher
+            if patcher is not None and patcher.dirty:
+                repo.commit(alias, message, parent=ctx.parent.parent_version)
 
     return wrapper
 
@@ -69,19 +86,9 @@ def put(ctx, key, value):
 
     fmt = ctx.parent.parent.repo.fmt(alias)
 
-    if fmt not in constants.COMPOUND_FORMATS:
-        if ':' in key and fmt == constants.PROPERTIES:
-            raise exceptions.UnsupportedOperationException(fmt=fmt,
-                                                           operation='put with complex keys')
-        if value.startswith('{') and value.endswith('}'):
-            raise exceptions.UnsupportedOperationException(fmt=fmt,
-                                                           operation='put with complex values')
+    validate(fmt=fmt, operation='put', key=key, value=value)
 
-        if value.startswith('[') and value.endswith(']'):
-            raise exceptions.UnsupportedOperationException(fmt=fmt,
-                                                           operation='put with complex values')
-
-    patched = ctx.parent.patcher.set(key=key, value=value).finish()
+    patched = get_patcher(ctx).set(key=key, value=value).finish()
 
     write_result(patched, ctx)
 
@@ -104,14 +111,13 @@ def add(ctx, key, value):
 
     fmt = ctx.parent.parent.repo.fmt(alias)
 
-    if fmt not in constants.COMPOUND_FORMATS:
-        raise exceptions.UnsupportedOperationException(fmt=fmt, operation='add')
+    validate(fmt=fmt, operation='add', key=key, value=value)
 
-    patched = ctx.parent.patcher.add(key=key, value=value).finish()
+    patched = get_patcher(ctx).add(key=key, value=value).finish()
 
     write_result(patched, ctx)
 
-    click.echo(ctx.parent.patcher.get(key, fmt=fmt))
+    click.echo(get_patcher(ctx).get(key, fmt=fmt))
 
 
 @click.command()
@@ -131,13 +137,11 @@ def delete(ctx, key):
 
     fmt = ctx.parent.parent.repo.fmt(alias)
 
-    if fmt in [constants.PROPERTIES] and ':' in key:
-        raise exceptions.UnsupportedOperationException(fmt=fmt,
-                                                       operation='delete with complex keys')
+    validate(fmt=fmt, operation='delete', key=key)
 
-    value = ctx.parent.patcher.get(key=key, fmt=fmt)
+    value = get_patcher(ctx).get(key=key, fmt=fmt)
 
-    patched = ctx.parent.patcher.delete(key=key).finish()
+    patched = get_patcher(ctx).delete(key=key).finish()
 
     write_result(patched, ctx)
 
@@ -159,11 +163,22 @@ def get(ctx, key):
 
     fmt = ctx.parent.parent.repo.fmt(alias)
 
-    if fmt in [constants.PROPERTIES] and ':' in key:
-        raise exceptions.UnsupportedOperationException(fmt=fmt,
-                                                       operation='get with complex keys')
+    validate(fmt=fmt, operation='get', key=key)
 
-    value = ctx.parent.patcher.get(key, fmt=fmt)
+    file_path = ctx.parent.parent.repo.path(alias)
+
+    if fmt in stream.STREAMING_FORMATS and os.path.getsize(file_path) >= STREAMING_GET_THRESHOLD:
+
+        from dictfile.api import patcher
+
+        try:
+            value = patcher.serialize(stream.get(file_path, fmt=fmt, key=key), fmt=fmt)
+        except exceptions.CorruptFileException as e:
+            edited_manually(e, alias)
+            raise
+
+    else:
+        value = get_patcher(ctx).get(key, fmt=fmt)
 
     click.echo(value)
 
@@ -186,21 +201,168 @@ def remove(ctx, key, value):
 
     fmt = ctx.parent.parent.repo.fmt(alias)
 
-    if fmt not in constants.COMPOUND_FORMATS:
-        raise exceptions.UnsupportedOperationException(fmt=fmt, operation='remove')
+    validate(fmt=fmt, operation='remove', key=key, value=value)
 
-    patched = ctx.parent.patcher.remove(key=key, value=value).finish()
+    patched = get_patcher(ctx).remove(key=key, value=value).finish()
 
     write_result(patched, ctx)
 
-    click.echo(ctx.parent.patcher.get(key, fmt=fmt))
+    click.echo(get_patcher(ctx).get(key, fmt=fmt))
 
 
-def write_result(result, ctx):
+@click.command()
+@click.option('--operations', 'operations_file', type=click.File(), required=True,
+              help='A file containing the operations, either as json lines or as a yaml list. '
+                   "Use '-' to read from standard input.")
+@click.option('--message', required=False)
+@click.pass_context
+@handle_exceptions
+@commit
+def apply(ctx, operations_file):
+
+    """
+    Apply multiple operations at once.
+
+    Each operation is a dictionary with an 'operation' (put, add, remove or delete),
+    a 'key' and (except for delete) a 'value'. The file is only modified (and committed)
+    if all operations succeed.
+
+    """
 
     alias = ctx.parent.params['alias']
 
-    file_path = ctx.parent.parent.repo.path(alias)
     fmt = ctx.parent.parent.repo.fmt(alias)
 
-    writer.dump(obj=result, file_path=file_path, fmt=fmt)
+    operations = load_operations(operations_file.read())
+
+    for operation in operations:
+        validate(fmt=fmt,
+                 operation=operation.get('operation'),
+                 key=operation.get('key', ''),
+                 value=operation.get('value'))
+
+    patched = get_patcher(ctx).apply(operations).finish()
+
+    write_result(patched, ctx)
+
+
+def get_patcher(ctx):
+
+    """
+    The patcher of the file being configured, the file is parsed when first needed.
+
+    Args:
+        ctx (click.Context): The context of a 'configure' command.
+
+    Returns:
+        Patcher: The patcher.
+    """
+
+    configure_ctx = ctx.parent
+
+    if configure_ctx.patcher is None:
+
+        from dictfile.api.patcher import Patcher
+
+        alias = configure_ctx.params['alias']
+
+        try:
+            parsed = configure_ctx.parent.repo.parse(alias)
+        except exceptions.CorruptFileException as e:
+            edited_manually(e, alias)
+            raise
+
+        configure_ctx.patcher = Patcher(parsed, logger=log.get())
+
+    return configure_ctx.patcher
+
+
+def edited_manually(exception, alias):
+
+    exception.cause = causes.EDITED_MANUALLY
+    exception.possible_solutions = [solutions.edit_manually(), solutions.reset_to_latest(alias)]
+
+
+def validate(fmt, operation, key, value=None):
+
+    if fmt in [constants.PROPERTIES] and ':' in key and operation in ['put', 'delete', 'get']:
+        raise exceptions.UnsupportedOperationException(
+            fmt=fmt, operation='{0} with complex keys'.format(operation))
+
+    if fmt not in constants.COMPOUND_FORMATS:
+
+        if operation in ['add', 'remove']:
+            raise exceptions.UnsupportedOperationException(fmt=fmt, operation=operation)
+
+        if operation == 'put' and value is not None and _is_compound_value(value):
+            raise exceptions.UnsupportedOperationException(fmt=fmt,
+                                                           operation='put with complex values')
+
+
+def load_operations(string):
+
+    try:
+        # json lines, one operation per line
+        operations = [parser.loads(line, fmt=constants.JSON)
+                      for line in string.splitlines() if line.strip()]
+    except ValueError:
+
+        import yaml
+
+        try:
+            operations = parser.loads(string, fmt=constants.YAML) or []
+        except yaml.YAMLError as e:
+            raise exceptions.InvalidArgumentsException(
+                'Operations must be either json lines or a yaml list: {0}'.format(e))
+
+    if len(operations) == 1 and isinstance(operations[0], list):
+        # a json list in a single line
+        operations = operations[0]
+
+    if not isinstance(operations, list):
+        raise exceptions.InvalidArgumentsException(
+            'Operations must be either json lines or a yaml list')
+
+    for operation in operations:
+
+        if not isinstance(operation, dict):
+            raise exceptions.InvalidArgumentsException(
+                'Operation must be a dictionary: {0}'.format(operation))
+
+        if not isinstance(operation.get('key', ''), six.string_types):
+            raise exceptions.InvalidArgumentsException(
+                'Operation key must be a string: {0}'.format(operation))
+
+        # values are given to the patcher as strings, just like on the command line.
+        if 'value' in operation and not isinstance(operation['value'], six.string_types):
+            operation['value'] = json.dumps(operation['value'])
+
+    return operations
+
+
+def _is_compound_value(value):
+
+    return (value.startswith('{') and value.endswith('}')) or \
+           (value.startswith('[') and value.endswith(']'))
+
+
+def write_result(result, ctx):
+
+    # the editor (and the format libraries it needs) is only imported once a file is written,
+    # read-only commands start faster without it.
+    from dictfile.api import editor
+
+    alias = ctx.parent.params['alias']
+
+    if not get_patcher(ctx).dirty:
+        log.get().debug('Alias {0} did not change, not writing it'.format(alias))
+        return
+
+    repo = ctx.parent.parent.repo
+
+    # only the text of the modified keys is rewritten, the rest of the file is kept as is.
+    if editor.dump(obj=result, file_path=repo.path(alias), fmt=repo.fmt(alias),
+                   changes=get_patcher(ctx).changes):
+        # the next command on the file finds it already parsed, instead
+        # of parsing it again just because its contents changed.
+        repo.remember(alias, result)
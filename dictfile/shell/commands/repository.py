@@ -18,10 +18,9 @@
 import datetime
 
 import click
-from prettytable import PrettyTable
 
 from dictfile.shell import solutions, handle_exceptions, causes
-from dictfile.api import parser
+from dictfile.api import atomic
 from dictfile.api import exceptions
 
 
@@ -45,6 +44,18 @@ def remove(ctx, alias):
     ctx.parent.parent.repo.remove(alias=alias)
 
 
+@click.command()
+@click.pass_context
+@handle_exceptions
+def gc(ctx):
+
+    """
+    Delete the stored contents of removed aliases.
+    """
+
+    ctx.parent.parent.repo.gc()
+
+
 @click.command()
 @click.option('--alias', required=True)
 @click.option('--version', required=True)
@@ -70,6 +81,8 @@ def revisions(ctx, alias):
 
     repo = ctx.parent.parent.repo
 
+    from prettytable import PrettyTable
+
     table = PrettyTable(field_names=['alias', 'path', 'timestamp', 'version', 'message'])
 
     for revision in sorted(repo.revisions(alias), key=lambda rev: rev.version):
@@ -89,6 +102,8 @@ def files(ctx):
 
     repo = ctx.parent.parent.repo
 
+    from prettytable import PrettyTable
+
     table = PrettyTable(field_names=['alias', 'path', 'format'])
 
     for f in repo.files():
@@ -97,6 +112,36 @@ def files(ctx):
     click.echo(table.get_string())
 
 
+@click.command()
+@click.option('--name', required=False)
+@click.option('--value', required=False)
+@click.pass_context
+@handle_exceptions
+def settings(ctx, name, value):
+
+    """
+    Show or change the repository settings.
+
+    """
+
+    repo = ctx.parent.parent.repo
+
+    if (name is None) != (value is None):
+        raise exceptions.InvalidArgumentsException('--name and --value must be given together')
+
+    if name is not None:
+        repo.configure(name=name, value=value)
+
+    from prettytable import PrettyTable
+
+    table = PrettyTable(field_names=['name', 'value'])
+
+    for setting_name, setting_value in sorted(repo.settings.items()):
+        table.add_row([setting_name, setting_value])
+
+    click.echo(table.get_string())
+
+
 @click.command()
 @click.option('--alias', required=True)
 @click.option('--version', required=True)
@@ -107,10 +152,12 @@ def reset(ctx, alias, version, message):
 
     repo = ctx.parent.parent.repo
 
-    with open(repo.path(alias), 'w') as f:
-        f.write(repo.contents(alias, version))
+    with repo.lock(alias), repo.barrier():
 
-    repo.commit(alias, message)
+        # the exact contents of the version, whatever their encoding
+        atomic.write(repo.path(alias), repo.contents(alias, version, binary=True), binary=True)
+
+        repo.commit(alias, message)
 
 
 @click.command()
@@ -123,7 +170,7 @@ def commit(ctx, alias, message):
     repo = ctx.parent.parent.repo
 
     try:
-        parser.load(file_path=repo.path(alias), fmt=repo.fmt(alias))
+        repo.parse(alias)
     except exceptions.CorruptFileException as e:
         e.cause = causes.EDITED_MANUALLY
         e.possible_solutions = [solutions.edit_manually(), solutions.reset_to_latest(alias)]
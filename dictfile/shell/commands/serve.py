@@ -0,0 +1,93 @@
+#############################################################################
+# Copyright (c) 2018 Eli Polonsky. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#   * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   * See the License for the specific language governing permissions and
+#   * limitations under the License.
+#
+#############################################################################
+
+import signal
+import sys
+
+import click
+import six
+
+from dictfile.api import constants
+from dictfile.shell import handle_exceptions
+from dictfile.shell import log
+from dictfile.shell import server as dictfile_server
+
+logger = log.get()
+
+
+@click.command()
+@click.pass_context
+@handle_exceptions
+def serve(ctx):
+
+    """
+    Execute commands on behalf of the command line.
+
+    While running, every other command is forwarded to this process, which keeps
+    its state warm between commands. Stop it with Ctrl+C.
+
+    """
+
+    path = dictfile_server.socket_path(ctx.parent.config_dir)
+
+    server = dictfile_server.Server(path=path, execute=execute)
+    server.bind()
+
+    # make sure the socket is removed when the server is terminated.
+    signal.signal(signal.SIGTERM, lambda *_: server.close())
+
+    logger.info('Serving commands on {0}'.format(path))
+
+    try:
+        server.serve()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+def execute(args):
+
+    # imported here because the main module imports this one.
+    from dictfile.shell.main import app
+
+    # each is replayed by the client to its own stream.
+    output = six.StringIO()
+    error = six.StringIO()
+
+    stdout = sys.stdout
+    stderr = sys.stderr
+    sys.stdout = output
+    sys.stderr = error
+
+    exit_code = 0
+
+    try:
+        app.main(args=args, prog_name=constants.PROGRAM_NAME, standalone_mode=False)
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else 1
+    except click.exceptions.ClickException as e:
+        e.show()
+        exit_code = e.exit_code
+    except click.exceptions.Abort:
+        click.echo('Aborted!')
+        exit_code = 1
+    finally:
+        sys.stdout = stdout
+        sys.stderr = stderr
+
+    return output.getvalue(), error.getvalue(), exit_code
@@ -15,43 +15,70 @@
 #
 #############################################################################
 
+import timeit
+
+# when this module started importing, see the 'import' phase of --profile
+_IMPORT_START = timeit.default_timer()
+
+# pylint: disable=wrong-import-position
 import logging
 import sys
-import os
+
+from dictfile import client
+
+# the binary runs this module as its entry point, a command forwarded
+# to a running server does not import the rest of the application.
+if getattr(sys, 'frozen', False) and __name__ == '__main__':
+    client.forward_command(sys.argv[1:])
 
 import click
+import six
 
-from dictfile.api.patcher import Patcher
-from dictfile.api import parser
 from dictfile.api import exceptions
-from dictfile.api.repository import Repository
+from dictfile.api import profiler
 from dictfile.shell.commands import configure as configurer_group
 from dictfile.shell.commands import repository as repository_group
+from dictfile.shell.commands import serve as serve_command
 from dictfile.shell import solutions, handle_exceptions, causes
 from dictfile.shell import log as shell_log
-from dictfile.api.constants import PROGRAM_NAME
+from dictfile.api.log import DEFAULT_LOG_LEVEL
 
 logger = shell_log.get()
 
+_repositories = {}
+
+PROFILE_FORMATS = ['table', 'json', 'cprofile']
+
+# the time it took to import the application, reported (only) by the first profiled command.
+_import_time = None
+
 
 # pylint: disable=no-value-for-parameter
 @click.group()
 @click.option('--debug', is_flag=True)
 @click.option('--verbose', is_flag=True)
+@click.option('--profile', is_flag=True,
+              help='Report the time spent in each phase of the command (to stderr).')
+@click.option('--profile-format', type=click.Choice(PROFILE_FORMATS), default='table',
+              help='A summary table, the summary as json, or a cProfile of the entire command.')
+@click.option('--profile-output', required=False,
+              help='Write the profile to this file instead (cProfile writes pstats data).')
 @click.pass_context
 @handle_exceptions
-def app(ctx, verbose, debug):
+def app(ctx, verbose, debug, profile, profile_format, profile_output):
+
+    # when running as a server, the logger is shared
+    # between commands, so it must be reset every time.
+    logger.set_verbose(verbose)
+    logger.set_level(level=logging.DEBUG if debug else DEFAULT_LOG_LEVEL)
 
-    if verbose:
-        logger.set_verbose(True)
+    if profile:
+        _start_profile(ctx, profile_format, profile_output)
 
-    if debug:
-        logger.set_level(level=logging.DEBUG)
+    ctx.config_dir = config_dir()
 
     # initialize the repository object
-    repo = Repository(os.path.join(os.path.expanduser('~'), '.{0}'.format(PROGRAM_NAME)),
-                      logger=logger)
-    ctx.repo = repo
+    ctx.repo = _repository(ctx.config_dir)
 
 
 @click.group()
@@ -62,28 +89,37 @@ def configure(ctx, alias):
 
     repo = ctx.parent.repo
 
-    file_path = repo.path(alias)
+    if ctx.invoked_subcommand != 'get':
+
+        # hold the lock of the alias from reading the file, until its modification is
+        # committed, so that concurrent commands on the same alias do not lose each others changes.
+        lock = repo.lock(alias)
+        lock.acquire()
+        ctx.call_on_close(lock.release)
 
     try:
-        parsed = parser.load(file_path=file_path, fmt=repo.fmt(alias))
+
+        # detect if the file was manually edited since the last command.
+        # if so, warn because it means the current version of the file is not
+        # under version control and will be lost after the change
+        if repo.is_dirty(alias):
+            exception = click.ClickException(message='Cannot perform operation')
+            exception.cause = causes.DIFFER_FROM_LATEST
+            exception.possible_solutions = [solutions.reset_to_latest(alias),
+                                            solutions.commit(alias)]
+            raise exception
+
     except exceptions.CorruptFileException as e:
-        e.cause = causes.EDITED_MANUALLY
-        e.possible_solutions = [solutions.edit_manually(), solutions.reset_to_latest(alias)]
+        configurer_group.edited_manually(e, alias)
         raise
 
-    # detect if the file was manually edited since the last command.
-    # if so, warn because it means the current version of the file is not
-    # under version control and will be lost after the change
-    latest = parser.loads(repo.contents(alias=alias, version='latest'), fmt=repo.fmt(alias))
-    if latest != parsed:
-
-        exception = click.ClickException(message='Cannot perform operation')
-        exception.cause = causes.DIFFER_FROM_LATEST
-        exception.possible_solutions = [solutions.reset_to_latest(alias), solutions.commit(alias)]
-        raise exception
+    # the version the modification is based on, committing fails if another one was
+    # committed in the meantime.
+    ctx.parent_version = repo.latest_version(alias)
 
-    patcher = Patcher(parsed, logger=logger)
-    ctx.patcher = patcher
+    # the file is only parsed once a command needs it (see configure.get_patcher),
+    # a 'get' on a large file does not load it entirely.
+    ctx.patcher = None
 
 
 @click.group()
@@ -91,11 +127,87 @@ def repository():
     pass
 
 
+def config_dir():
+    return client.config_dir()
+
+
+def _repository(directory):
+
+    # the repository keeps its state cached (and re-reads it only when modified),
+    # so when running as a server, it is kept warm between commands.
+    repo = _repositories.get(directory)
+
+    if repo is None:
+
+        # imported lazily, commands forwarded to a running server never need it.
+        from dictfile.api.repository import Repository
+
+        with profiler.span(profiler.REPO_INIT):
+            repo = Repository(directory, logger=logger)
+        _repositories[directory] = repo
+
+    return repo
+
+
+def _start_profile(ctx, fmt, output):
+
+    global _import_time  # pylint: disable=global-statement
+
+    recording = profiler.start()
+
+    if _import_time is not None:
+        recording.record(profiler.IMPORT, _import_time)
+        _import_time = None
+
+    cprofile = None
+
+    if fmt == 'cprofile':
+        import cProfile
+        cprofile = cProfile.Profile()
+        cprofile.enable()
+
+    def report():
+
+        profiler.stop()
+
+        if cprofile is not None:
+            cprofile.disable()
+            if output:
+                cprofile.dump_stats(output)
+                return
+            import pstats
+            stream = six.StringIO()
+            pstats.Stats(cprofile, stream=stream).sort_stats('cumulative').print_stats(30)
+            text = stream.getvalue()
+        elif fmt == 'json':
+            text = recording.to_json()
+        else:
+            text = recording.table()
+
+        if output:
+            with open(output, 'w') as f:
+                f.write(text + '\n')
+        else:
+            click.echo(text, err=True)
+
+    # also called when the command fails
+    ctx.call_on_close(report)
+
+
+def main():
+
+    # if a server is running, let it execute the command.
+    client.forward_command(sys.argv[1:])
+
+    return app()
+
+
 configure.add_command(configurer_group.put)
 configure.add_command(configurer_group.add)
 configure.add_command(configurer_group.delete)
 configure.add_command(configurer_group.remove)
 configure.add_command(configurer_group.get)
+configure.add_command(configurer_group.apply)
 
 repository.add_command(repository_group.show)
 repository.add_command(repository_group.revisions)
@@ -103,12 +215,17 @@ repository.add_command(repository_group.files)
 repository.add_command(repository_group.reset)
 repository.add_command(repository_group.add)
 repository.add_command(repository_group.remove)
+repository.add_command(repository_group.gc)
 repository.add_command(repository_group.commit)
+repository.add_command(repository_group.settings)
 
 app.add_command(repository)
 app.add_command(configure)
+app.add_command(serve_command.serve)
+
+_import_time = timeit.default_timer() - _IMPORT_START
 
 # allows running the application as a single executable
 # created by pyinstaller
-if getattr(sys, 'frozen', False):
-    app(sys.argv[1:])
+if getattr(sys, 'frozen', False) and __name__ == '__main__':
+    app()
@@ -0,0 +1,146 @@
+#############################################################################
+# Copyright (c) 2018 Eli Polonsky. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#   * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   * See the License for the specific language governing permissions and
+#   * limitations under the License.
+#
+#############################################################################
+
+"""
+A long running process that executes commands on behalf of the command line.
+
+Every command line invocation pays for starting the interpreter, importing all dependencies,
+and loading the repository. When a server is running, the command line only forwards its
+arguments over a unix domain socket, and the server executes them using its already warm
+state (imported modules, repository state and indexes, parsed files).
+
+The client side (forwarding a command to the server) is in dictfile.client.
+"""
+
+import json
+import os
+import socket
+
+# the client side lives in the entry point module, which must not import anything heavy.
+# pylint: disable=unused-import
+from dictfile.client import NO_SERVER_ENV_VAR, SOCKET_NAME, socket_path, forward, receive
+
+
+class Server(object):
+
+    """
+    Serve commands over a unix domain socket, one at a time.
+
+    Args:
+        path (str): Path to the socket.
+        execute (function): Accepts the command line arguments, executes the command and
+            returns its output, error output and exit code.
+    """
+
+    _path = None
+    _execute = None
+    _socket = None
+
+    def __init__(self, path, execute):
+        self._path = path
+        self._execute = execute
+
+    @property
+    def path(self):
+        return self._path
+
+    def bind(self):
+
+        if os.path.exists(self._path):
+
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self._path)
+                raise RuntimeError('A server is already listening on {0}'.format(self._path))
+            except socket.error:
+                # a stale socket of a server that is no longer running
+                os.remove(self._path)
+            finally:
+                probe.close()
+
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        # the server executes commands with the permissions of the user that started it,
+        # make sure no other user can connect to it.
+        umask = os.umask(0o177)
+        try:
+            self._socket.bind(self._path)
+        finally:
+            os.umask(umask)
+
+        self._socket.listen(128)
+
+        # wake up periodically to notice the server was closed.
+        self._socket.settimeout(0.1)
+
+    def serve(self):
+
+        """
+        Serve commands until 'close' is called or the process is interrupted.
+        """
+
+        try:
+            while self._socket is not None:
+                try:
+                    connection, _ = self._socket.accept()
+                except socket.timeout:
+                    continue
+                except (socket.error, AttributeError):
+                    # the socket was closed
+                    break
+                try:
+                    connection.settimeout(None)
+                    self._handle(connection)
+                finally:
+                    connection.close()
+        finally:
+            self.close()
+
+    def close(self):
+
+        server_socket, self._socket = self._socket, None
+
+        if server_socket is not None:
+            server_socket.close()
+            if os.path.exists(self._path):
+                os.remove(self._path)
+
+    def _handle(self, connection):
+
+        try:
+            request = json.loads(receive(connection).decode('utf-8'))
+        except ValueError:
+            # not a client, probably someone checking if the server is running.
+            return
+        except socket.error:
+            # the client went away (e.g it was interrupted), the server keeps serving.
+            return
+
+        cwd = os.getcwd()
+        os.chdir(request['cwd'])
+        try:
+            output, error, exit_code = self._execute(request['args'])
+        finally:
+            os.chdir(cwd)
+
+        response = {'output': output, 'error': error, 'exit_code': exit_code}
+        try:
+            connection.sendall(json.dumps(response).encode('utf-8'))
+        except socket.error:
+            # the client went away before receiving the response, the command was executed
+            # nonetheless.
+            pass
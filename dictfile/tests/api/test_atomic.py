@@ -0,0 +1,200 @@
+#############################################################################
+# Copyright (c) 2018 Eli Polonsky. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#   * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   * See the License for the specific language governing permissions and
+#   * limitations under the License.
+#
+#############################################################################
+
+import os
+import stat
+
+import pytest
+
+from dictfile.api import atomic
+from dictfile.api import exceptions
+
+
+def _read(file_path):
+    with open(file_path) as stream:
+        return stream.read()
+
+
+def test_write(temp_dir):
+
+    file_path = os.path.join(temp_dir, 'file')
+
+    atomic.write(file_path, 'contents1')
+    atomic.write(file_path, 'contents2')
+
+    assert 'contents2' == _read(file_path)
+    assert ['file'] == os.listdir(temp_dir)
+
+
+def test_write_binary(temp_dir):
+
+    file_path = os.path.join(temp_dir, 'file')
+
+    atomic.write(file_path, b'contents', binary=True)
+
+    assert 'contents' == _read(file_path)
+
+
+@pytest.mark.skipif(os.name == 'nt', reason='File permissions are not supported on windows')
+def test_write_preserves_permissions(temp_dir):
+
+    file_path = os.path.join(temp_dir, 'file')
+    atomic.write(file_path, 'contents1')
+    os.chmod(file_path, 0o640)
+
+    atomic.write(file_path, 'contents2')
+
+    assert 0o640 == stat.S_IMODE(os.stat(file_path).st_mode)
+
+
+@pytest.mark.skipif(not hasattr(os, 'chown'), reason='File ownership is not supported')
+def test_write_preserves_ownership(temp_dir, mocker):
+
+    file_path = os.path.join(temp_dir, 'file')
+    atomic.write(file_path, 'contents1')
+
+    original = os.stat(file_path)
+    mocker.patch('os.stat', side_effect=lambda path: original if path == file_path else
+                 os.lstat(path).__class__((0, 0, 0, 0, original.st_uid + 1, original.st_gid,
+                                           0, 0, 0, 0)))
+    chown = mocker.patch('os.chown')
+
+    atomic.write(file_path, 'contents2')
+
+    chown.assert_called_once_with(mocker.ANY, original.st_uid, original.st_gid)
+    assert 'contents2' == _read(file_path)
+
+
+@pytest.mark.skipif(not hasattr(os, 'symlink'), reason='Symbolic links are not supported')
+def test_write_follows_symbolic_links(temp_dir):
+
+    file_path = os.path.join(temp_dir, 'file')
+    link_path = os.path.join(temp_dir, 'link')
+    atomic.write(file_path, 'contents1')
+    os.symlink(file_path, link_path)
+
+    atomic.write(link_path, 'contents2')
+
+    assert os.path.islink(link_path)
+    assert 'contents2' == _read(file_path)
+
+
+def test_write_failure_keeps_original(temp_dir, mocker):
+
+    file_path = os.path.join(temp_dir, 'file')
+    atomic.write(file_path, 'contents1')
+
+    mocker.patch('dictfile.api.atomic._replace', side_effect=OSError('failed'))
+
+    with pytest.raises(OSError):
+        atomic.write(file_path, 'contents2')
+
+    assert 'contents1' == _read(file_path)
+    assert ['file'] == os.listdir(temp_dir)
+
+
+@pytest.mark.parametrize("durability,expected", [
+    (atomic.NONE, 0),
+    (atomic.FILE, 1),
+    (atomic.FULL, 2)
+])
+def test_write_durability(temp_dir, mocker, durability, expected):
+
+    fsync = mocker.patch('os.fsync')
+
+    atomic.write(os.path.join(temp_dir, 'file'), 'contents', durability=durability)
+
+    assert expected == fsync.call_count
+
+
+def test_write_invalid_durability(temp_dir):
+
+    with pytest.raises(exceptions.InvalidArgumentsException):
+        atomic.write(os.path.join(temp_dir, 'file'), 'contents', durability='unknown')
+
+
+@pytest.mark.parametrize("durability,written,expected", [
+    (atomic.NONE, 0, 0),
+    (atomic.FILE, 3, 3),
+    (atomic.FULL, 3, 4)
+])
+def test_barrier(temp_dir, mocker, durability, written, expected):
+
+    fsync = mocker.patch('os.fsync')
+
+    with atomic.barrier(durability=durability):
+
+        # nested barriers join the outer one
+        with atomic.barrier(durability=atomic.NONE):
+            atomic.write(os.path.join(temp_dir, 'file1'), 'contents1')
+
+        atomic.write(os.path.join(temp_dir, 'file1'), 'contents2')
+        atomic.write(os.path.join(temp_dir, 'file2'), 'contents3')
+
+        assert written == fsync.call_count
+        assert 'contents2' == _read(os.path.join(temp_dir, 'file1'))
+
+    # each write, and their (shared) directory once.
+    assert expected == fsync.call_count
+
+
+def test_barrier_flushes_before_replacing(temp_dir, mocker):
+
+    calls = []
+    replace = atomic._replace
+
+    mocker.patch('os.fsync', side_effect=lambda fd: calls.append('fsync'))
+    mocker.patch('dictfile.api.atomic._replace',
+                 side_effect=lambda src, dst: calls.append('replace') or replace(src, dst))
+
+    with atomic.barrier(durability=atomic.FULL):
+        atomic.write(os.path.join(temp_dir, 'file'), 'contents')
+        assert ['fsync', 'replace'] == calls
+
+    # and the directory at the end of the barrier
+    assert ['fsync', 'replace', 'fsync'] == calls
+
+
+def test_barrier_flushes_on_error(temp_dir, mocker):
+
+    file_path = os.path.join(temp_dir, 'file')
+    atomic.write(file_path, 'contents')
+
+    fsync = mocker.patch('os.fsync')
+
+    with pytest.raises(RuntimeError):
+        with atomic.barrier():
+            atomic.sync(file_path)
+            raise RuntimeError('failed')
+
+    assert 1 == fsync.call_count
+
+
+def test_sync(temp_dir, mocker):
+
+    file_path = os.path.join(temp_dir, 'file')
+    atomic.write(file_path, 'contents')
+
+    fsync = mocker.patch('os.fsync')
+
+    atomic.sync(file_path)
+
+    with atomic.barrier():
+        atomic.sync(file_path)
+        atomic.sync(file_path)
+
+    assert 2 == fsync.call_count
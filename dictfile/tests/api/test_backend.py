@@ -0,0 +1,149 @@
+# Copyright (c) 2018 Eli Polonsky. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#   * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   * See the License for the specific language governing permissions and
+#   * limitations under the License.
+#
+#############################################################################
+
+import datetime
+
+import pytest
+import yaml
+
+from dictfile.api import backend
+from dictfile.api import constants
+from dictfile.api import exceptions
+from dictfile.api import parser
+from dictfile.api import writer
+from dictfile.tests.resources import get_resource
+
+requires_libyaml = pytest.mark.skipif(not yaml.__with_libyaml__,
+                                      reason='PyYAML is installed without libyaml bindings')
+
+DOCUMENTS = [
+    {},
+    {'key1': 'value1'},
+    {'key1': {'key2': {'key3': ['value1', 'value2', {'key4': None}]}}},
+    {'int': 5, 'float': 5.5, 'negative': -1, 'bool': True, 'none': None, 'empty': ''},
+    {'looks like bool': 'yes', 'looks like int': '123', 'looks like float': '1.5',
+     'looks like null': 'null', 'colon': 'a: b', 'hash': 'a #b', 'quote': "it's"},
+    {'multiline': 'line1\nline2\n', 'trailing spaces': 'value   ', 'tab': 'a\tb'},
+    {'long': ' '.join(['word'] * 100)},
+    {u'unicode': u'שלום', u'emoji': u'\U0001f600'},
+    {'date': datetime.date(2018, 6, 12)},
+    {'list of lists': [[1, 2], [3, [4, 5]]], 'empty list': [], 'empty dict': {}},
+    {'services': {'service{0}'.format(i): {'port': 8000 + i} for i in range(100)}}
+]
+
+STRINGS = [
+    'key1: value1',
+    'key1: {key2: value2}',
+    'key1: [1, 2.5, yes, no, on, off, ~, null, 0x1f, 0o17, 017, 1_000, 1:30, .inf, .nan]',
+    'key1: |\n  line1\n  line2\n',
+    'key1: >\n  folded\n  text\n',
+    'anchor: &a {key: value}\nalias: *a',
+    'key1: 2001-12-14t21:59:43.10-05:00',
+    '- value1\n- value2',
+    '"quoted": \'single\'',
+    'value'
+]
+
+
+@pytest.fixture(name='python_backend')
+def _python_backend():
+    backend.set_yaml_backend(backend.PYTHON)
+    try:
+        yield
+    finally:
+        backend.set_yaml_backend(None)
+
+
+def _with_backend(name, func, *args):
+    backend.set_yaml_backend(name)
+    try:
+        return func(*args)
+    finally:
+        backend.set_yaml_backend(None)
+
+
+@requires_libyaml
+@pytest.mark.parametrize("document", DOCUMENTS)
+def test_dumps_conformance(document):
+
+    python = _with_backend(backend.PYTHON, writer.dumps, document, constants.YAML)
+    c = _with_backend(backend.C, writer.dumps, document, constants.YAML)
+
+    assert python == c
+    assert document == _with_backend(backend.C, parser.loads, c, constants.YAML)
+
+
+def _read_resource(name):
+    with open(get_resource(name)) as stream:
+        return stream.read()
+
+
+@requires_libyaml
+@pytest.mark.parametrize("string", STRINGS + [_read_resource('test_load_yaml.yaml')])
+def test_loads_conformance(string):
+
+    python = _with_backend(backend.PYTHON, parser.loads, string, constants.YAML)
+    c = _with_backend(backend.C, parser.loads, string, constants.YAML)
+
+    # nan is not equal to itself
+    assert repr(python) == repr(c)
+
+
+@requires_libyaml
+def test_corrupt_file_conformance():
+
+    with pytest.raises(exceptions.CorruptFileException):
+        _with_backend(backend.C, parser.load, get_resource('test_corrupt_file'), constants.YAML)
+
+
+@pytest.mark.usefixtures('python_backend')
+def test_set_yaml_backend():
+
+    assert backend.PYTHON == backend.yaml_backend()
+    assert yaml.SafeLoader == backend.yaml_loader()
+    assert yaml.SafeDumper == backend.yaml_dumper()
+
+
+def test_set_yaml_backend_invalid():
+
+    with pytest.raises(exceptions.InvalidArgumentsException):
+        backend.set_yaml_backend('unknown')
+
+
+def test_yaml_backend_env_var(monkeypatch):
+
+    monkeypatch.setenv(backend.YAML_BACKEND_ENV_VAR, backend.PYTHON)
+
+    assert backend.PYTHON == backend.yaml_backend()
+
+
+def test_yaml_backend_auto():
+
+    expected = backend.C if yaml.__with_libyaml__ else backend.PYTHON
+
+    assert expected == backend.yaml_backend()
+
+
+@pytest.mark.skipif(yaml.__with_libyaml__, reason='PyYAML is installed with libyaml bindings')
+def test_yaml_backend_c_not_available():
+
+    backend.set_yaml_backend(backend.C)
+
+    try:
+        with pytest.raises(exceptions.InvalidArgumentsException):
+            backend.yaml_backend()
+    finally:
+        backend.set_yaml_backend(None)
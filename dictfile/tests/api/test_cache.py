@@ -0,0 +1,162 @@
+# Copyright (c) 2018 Eli Polonsky. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#   * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   * See the License for the specific language governing permissions and
+#   * limitations under the License.
+#
+#############################################################################
+
+import os
+
+from dictfile.api import constants
+from dictfile.api import parser
+from dictfile.api import utils
+from dictfile.api.cache import ParseCache
+
+
+def test_loads(temp_dir, mocker):
+
+    loads = mocker.spy(parser, 'loads')
+
+    first = ParseCache(temp_dir).loads('key1: value1', fmt=constants.YAML)
+    second = ParseCache(temp_dir).loads('key1: value1', fmt=constants.YAML)
+
+    assert {'key1': 'value1'} == first == second
+    assert 1 == loads.call_count
+
+
+def test_loads_returns_copies(temp_dir):
+
+    cache = ParseCache(temp_dir)
+
+    cache.loads('key1: value1', fmt=constants.YAML)['key1'] = 'mutated'
+
+    assert {'key1': 'value1'} == cache.loads('key1: value1', fmt=constants.YAML)
+
+
+def test_loads_keyed_by_format(temp_dir):
+
+    cache = ParseCache(temp_dir)
+
+    assert {'key1': 'value1'} == cache.loads('key1=value1', fmt=constants.PROPERTIES)
+    assert 'key1=value1' == cache.loads('key1=value1', fmt=constants.YAML)
+
+
+def test_loads_keyed_by_parser_version(temp_dir, mocker):
+
+    loads = mocker.spy(parser, 'loads')
+
+    ParseCache(temp_dir).loads('key1: value1', fmt=constants.YAML)
+
+    # e.g the yaml library was upgraded
+    mocker.patch.object(parser, 'version', return_value='upgraded')
+
+    assert {'key1': 'value1'} == ParseCache(temp_dir).loads('key1: value1', fmt=constants.YAML)
+    assert 2 == loads.call_count
+
+
+def test_load(temp_file, temp_dir, mocker):
+
+    with open(temp_file, 'w') as stream:
+        stream.write('key1: value1')
+
+    cache = ParseCache(os.path.join(temp_dir, 'cache'))
+    cache.load(temp_file, fmt=constants.YAML)
+
+    load = mocker.spy(parser, 'load')
+
+    assert {'key1': 'value1'} == cache.load(temp_file, fmt=constants.YAML)
+    assert 0 == load.call_count
+
+
+def test_store(temp_file, temp_dir, mocker):
+
+    with open(temp_file, 'w') as stream:
+        stream.write('key1: value1')
+
+    ParseCache(temp_dir).store(temp_file, fmt=constants.YAML, parsed={'key1': 'value1'})
+
+    load_contents = mocker.spy(parser, 'load_contents')
+
+    assert {'key1': 'value1'} == ParseCache(temp_dir).load(temp_file, fmt=constants.YAML)
+    assert 0 == load_contents.call_count
+
+
+def test_get_corrupted_entry(temp_dir):
+
+    cache = ParseCache(temp_dir)
+
+    key = ParseCache.hash(b'key1: value1')
+    cache.put(key, constants.YAML, {'key1': 'value1'})
+
+    for name in os.listdir(temp_dir):
+        with open(os.path.join(temp_dir, name), 'wb') as stream:
+            stream.write(b'corrupted')
+
+    assert ParseCache(temp_dir).get(key, constants.YAML) is None
+
+
+def test_evict(temp_dir):
+
+    cache = ParseCache(temp_dir, max_entries=2)
+
+    for i in range(5):
+        cache.loads('key{0}: value'.format(i), fmt=constants.YAML)
+
+    assert 2 == len(os.listdir(temp_dir))
+
+
+def test_evict_below_limit(temp_dir):
+
+    cache = ParseCache(temp_dir, max_entries=8)
+
+    for i in range(9):
+        cache.loads('key{0}: value'.format(i), fmt=constants.YAML)
+
+    assert 6 == len(os.listdir(temp_dir))
+
+
+def test_put_lists_once(temp_dir, mocker):
+
+    cache = ParseCache(temp_dir, max_entries=100)
+
+    lsf = mocker.spy(utils, 'lsf')
+
+    for i in range(10):
+        cache.loads('key{0}: value'.format(i), fmt=constants.YAML)
+
+    assert 1 == lsf.call_count
+
+
+def test_load_reads_once(temp_file, temp_dir, mocker):
+
+    with open(temp_file, 'w') as stream:
+        stream.write('key1: value1')
+
+    cache = ParseCache(os.path.join(temp_dir, 'cache'))
+
+    load = mocker.spy(parser, 'load')
+
+    assert {'key1': 'value1'} == cache.load(temp_file, fmt=constants.YAML)
+    assert 0 == load.call_count
+
+
+def test_get_from_memory(temp_dir):
+
+    cache = ParseCache(temp_dir)
+
+    key = ParseCache.hash(b'key1: value1')
+    cache.put(key, constants.YAML, {'key1': 'value1'})
+
+    for name in os.listdir(temp_dir):
+        os.remove(os.path.join(temp_dir, name))
+
+    assert {'key1': 'value1'} == cache.get(key, constants.YAML)
@@ -0,0 +1,57 @@
+# Copyright (c) 2018 Eli Polonsky. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#   * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   * See the License for the specific language governing permissions and
+#   * limitations under the License.
+#
+#############################################################################
+
+import pytest
+
+from dictfile.api import delta
+
+
+@pytest.mark.parametrize("base,target", [
+    (b'', b''),
+    (b'', b'key1: value1\n'),
+    (b'key1: value1\n', b''),
+    (b'key1: value1\nkey2: value2\n', b'key1: value1\nkey2: changed\n'),
+    (b'key1: value1\nkey2: value2', b'key0: value0\nkey1: value1\nkey2: value2\nkey3: value3'),
+    (u'key1: שלום\n'.encode('utf-8'), b'key1: value1\n'),
+    (u'key1=caf\xe9\n'.encode('latin-1'), u'key1=caf\xe9\nkey2=na\xefve\n'.encode('latin-1')),
+    (b'key1: value1\r\nkey2: value2\r\n', b'key1: value1\r\nkey2: changed\r\n'),
+    (u'key1: a\x0cb\u2028c\n'.encode('utf-8'), u'key1: a\x0cb\u2028d\n'.encode('utf-8')),
+    (b'- a\n- b\n- a\n- b\n', b'- b\n- a\n- c\n- b\n- a\n'),
+    (b'key1: value1\nkey2: value2\nkey3: value3\n', b'key3: value3\nkey2: value2\nkey1: value1\n')
+])
+def test_diff_patch(base, target):
+
+    assert target == delta.patch(base=base, delta=delta.diff(base=base, target=target))
+
+
+def test_diff_copies_unchanged_lines():
+
+    base = b''.join([u'key{0}: value{0}\n'.format(i).encode('utf-8') for i in range(100)])
+    target = base.replace(b'key50: value50', b'key50: changed')
+
+    assert len(delta.diff(base=base, target=target)) < len(target) / 10
+
+
+
+def test_diff_repeated_lines():
+
+    base = b'items:\n' + b'  - item\n' * 20000
+    target = b'items:\n' + b'  - item\n' * 10000 + b'  - other\n' + b'  - item\n' * 9999
+
+    patch = delta.diff(base=base, target=target)
+
+    assert len(patch) < 100
+    assert target == delta.patch(base=base, delta=patch)
@@ -0,0 +1,322 @@
+#############################################################################
+# Copyright (c) 2018 Eli Polonsky. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#   * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   * See the License for the specific language governing permissions and
+#   * limitations under the License.
+#
+#############################################################################
+
+import json
+import os
+import random
+
+import pytest
+
+from dictfile.api import backend
+from dictfile.api import constants
+from dictfile.api import editor
+from dictfile.api import parser
+from dictfile.api import writer
+from dictfile.api.patcher import Patcher
+
+YAML = '''# services
+services:
+  elasticsearch:
+    cluster: avengers  # the name
+    addresses:
+      - 192.168.2.3:9200
+      - 192.158.2.4:9200
+  flow: {key1: 1, key2: [1, 2]}
+other: "quoted"
+'''
+
+JSON = '''{
+  "services": {
+    "elasticsearch": {
+      "cluster": "avengers",
+      "addresses": ["192.168.2.3:9200", "192.158.2.4:9200"]
+    }
+  },
+  "other": "value"
+}
+'''
+
+INI = '''# services
+[elasticsearch]
+cluster = avengers
+addresses: 192.168.2.3:9200,
+  192.158.2.4:9200
+
+[kibana]
+port=5601
+'''
+
+PROPERTIES = '''# services
+cluster = avengers
+addresses=192.168.2.3:9200,\\
+  192.158.2.4:9200
+
+port:5601
+'''
+
+CASES = [
+    (constants.YAML, YAML, [('set', 'services:elasticsearch:cluster', 'x-men')],
+     YAML.replace('cluster: avengers', 'cluster: x-men')),
+    (constants.YAML, YAML, [('add', 'services:elasticsearch:addresses', '192.168.2.5:9200')],
+     YAML.replace('      - 192.158.2.4:9200\n',
+                  '      - 192.158.2.4:9200\n      - 192.168.2.5:9200\n')),
+    (constants.YAML, YAML, [('remove', 'services:elasticsearch:addresses', '192.168.2.3:9200')],
+     YAML.replace('      - 192.168.2.3:9200\n', '')),
+    (constants.YAML, YAML, [('delete', 'services:elasticsearch:addresses:0')],
+     YAML.replace('      - 192.168.2.3:9200\n', '')),
+    (constants.YAML, YAML, [('delete', 'services:elasticsearch:cluster')],
+     YAML.replace('    cluster: avengers  # the name\n', '')),
+    (constants.YAML, YAML, [('set', 'services:kibana:port', '5601')],
+     YAML.replace('other:', '  kibana:\n    port: 5601\nother:')),
+    (constants.YAML, YAML, [('set', 'services:flow:key3', 'value')],
+     YAML.replace('key2: [1, 2]}', 'key2: [1, 2], key3: value}')),
+    (constants.YAML, YAML, [('set', 'services:elasticsearch:cluster', '{"name": "x-men"}')],
+     YAML.replace('cluster: avengers  # the name\n',
+                  'cluster:  # the name\n      name: x-men\n')),
+    (constants.YAML, YAML, [('set', 'services:elasticsearch:addresses', 'none')],
+     YAML.replace(':\n      - 192.168.2.3:9200\n      - 192.158.2.4:9200', ': none')),
+    (constants.YAML, 'key1:\n  key2: value\n', [('delete', 'key1:key2')], 'key1: {}\n'),
+    (constants.YAML, YAML, [('set', 'other', 'value'), ('set', 'services:kibana', '5601'),
+                            ('delete', 'services:elasticsearch:cluster')],
+     YAML.replace('    cluster: avengers  # the name\n', '')
+     .replace('other: "quoted"', '  kibana: 5601\nother: value')),
+    (constants.YAML, 'key1:\n  key2: value\n', [('set', 'key3', '1'), ('set', 'key1:key4', '2')],
+     'key1:\n  key2: value\n  key4: 2\nkey3: 1\n'),
+    (constants.JSON, JSON, [('set', 'services:elasticsearch:cluster', 'x-men')],
+     JSON.replace('"avengers"', '"x-men"')),
+    (constants.JSON, JSON, [('add', 'services:elasticsearch:addresses', '192.168.2.5:9200')],
+     JSON.replace('"192.158.2.4:9200"]', '"192.158.2.4:9200", "192.168.2.5:9200"]')),
+    (constants.JSON, JSON, [('delete', 'services:elasticsearch:cluster')],
+     JSON.replace('      "cluster": "avengers",\n', '')),
+    (constants.JSON, JSON, [('delete', 'other')],
+     JSON.replace(',\n  "other": "value"', '')),
+    (constants.JSON, JSON, [('set', 'services:kibana', '{"port": 5601}')],
+     JSON.replace('    }\n  },', '    },\n    "kibana": {\n      "port": 5601\n    }\n  },')),
+    (constants.JSON, '{"key1": {}}', [('set', 'key1:key2', 'value')],
+     '{"key1": {"key2": "value"}}'),
+    (constants.JSON, '{"key1": 1, "key2": 2, "key3": 3}', [('delete', 'key1'), ('delete', 'key3')],
+     '{"key2": 2}'),
+    (constants.JSON, '{"key1": 1, "key2": 2}', [('delete', 'key1'), ('delete', 'key2')], '{}'),
+    (constants.INI, INI, [('set', 'elasticsearch:cluster', 'x-men')],
+     INI.replace('cluster = avengers', 'cluster = x-men')),
+    (constants.INI, INI, [('set', 'elasticsearch:addresses', '192.168.2.5:9200')],
+     INI.replace('192.168.2.3:9200,\n  192.158.2.4:9200', '192.168.2.5:9200')),
+    (constants.INI, INI, [('set', 'kibana:host', 'localhost')],
+     INI + 'host=localhost\n'),
+    (constants.INI, INI, [('delete', 'elasticsearch:cluster')],
+     INI.replace('cluster = avengers\n', '')),
+    (constants.INI, INI, [('delete', 'elasticsearch')],
+     INI[INI.index('[kibana]'):].join(['# services\n', ''])),
+    (constants.INI, INI, [('set', 'logstash:port', '5044')],
+     INI + '\n[logstash]\nport=5044\n'),
+    (constants.INI, INI.rstrip('\n'),
+     [('set', 'logstash:port', '5044'), ('set', 'kibana:host', 'x')],
+     INI + 'host=x\n\n[logstash]\nport=5044\n'),
+    (constants.PROPERTIES, PROPERTIES, [('set', 'cluster', 'x-men')],
+     PROPERTIES.replace('cluster = avengers', 'cluster=x-men')),
+    (constants.PROPERTIES, PROPERTIES, [('set', 'host', 'localhost')],
+     PROPERTIES + 'host=localhost\n'),
+    (constants.PROPERTIES, PROPERTIES, [('delete', 'addresses')],
+     PROPERTIES.replace('addresses=192.168.2.3:9200,\\\n  192.158.2.4:9200\n', '')),
+    (constants.PROPERTIES, 'a=1\na=2\nb=3\n', [('delete', 'a')], 'b=3\n'),
+    (constants.PROPERTIES, 'a=1\\\n', [('set', 'b', '2')], 'a=1\\\n\nb=2\n'),
+    (constants.PROPERTIES, 'a=1\\', [('set', 'b', '2')], 'a=1\\\n\nb=2\n'),
+    (constants.PROPERTIES, 'a=1\\\\\n', [('set', 'b', '2')], 'a=1\\\\\nb=2\n'),
+    (constants.PROPERTIES, 'a=1\n# comment \\\n', [('set', 'b', '2')],
+     'a=1\n# comment \\\nb=2\n')
+]
+
+
+def patch(string, fmt, operations):
+
+    patcher = Patcher(parser.loads(string, fmt=fmt))
+
+    for operation in operations:
+        name, args = operation[0], operation[1:]
+        getattr(patcher, name)(*args)
+
+    return patcher
+
+
+@pytest.mark.parametrize("fmt,string,operations,expected", CASES)
+def test_edit(fmt, string, operations, expected):
+
+    patcher = patch(string, fmt, operations)
+
+    actual = editor.edit(string, fmt=fmt, obj=patcher.finish(), changes=patcher.changes)
+
+    assert expected == actual
+
+
+def test_edit_cannot_be_spliced():
+
+    # the first key of a compact sequence item cannot be removed line wise
+    string = 'key1:\n- key2: value1\n  key3: value2\n'
+
+    patcher = patch(string, constants.YAML, [('delete', 'key1:0:key2')])
+
+    assert editor.edit(string, fmt=constants.YAML, obj=patcher.finish(),
+                       changes=patcher.changes) is None
+
+
+def test_edit_composes_once(monkeypatch):
+
+    import yaml
+
+    composed = []
+    compose = yaml.compose
+
+    def spy(*args, **kwargs):
+        composed.append(args)
+        return compose(*args, **kwargs)
+
+    monkeypatch.setattr(yaml, 'compose', spy)
+
+    patcher = patch(YAML, constants.YAML, [('set', 'other', 'value'),
+                                           ('set', 'services:elasticsearch:cluster', 'x-men'),
+                                           ('delete', 'services:flow')])
+
+    edited = editor.edit(YAML, fmt=constants.YAML, obj=patcher.finish(),
+                         changes=patcher.changes)
+
+    assert patcher.finish() == parser.loads(edited, fmt=constants.YAML)
+    assert len(composed) == 1
+
+
+def test_edit_aliases_cannot_be_spliced():
+
+    # removing the key that defines an anchor breaks the alias referencing it
+    string = 'key1: &anchor\n  key2: value\nkey3: *anchor\n'
+
+    patcher = patch(string, constants.YAML, [('delete', 'key1')])
+
+    assert editor.edit(string, fmt=constants.YAML, obj=patcher.finish(),
+                       changes=patcher.changes) is None
+
+
+@pytest.mark.parametrize("fmt,string", [
+    (constants.JSON, '{"a": 1, "a": 2, "b": 3}'),
+    (constants.YAML, 'a: 1\nb: 2\na: 3\n')
+])
+def test_edit_repeated_keys_cannot_be_spliced(fmt, string):
+
+    # removing the last occurrence of a key would reveal the one before it
+    patcher = patch(string, fmt, [('delete', 'a')])
+
+    assert editor.edit(string, fmt=fmt, obj=patcher.finish(), changes=patcher.changes) is None
+
+
+def test_edit_python_yaml_size_limit(monkeypatch):
+
+    monkeypatch.setattr(editor, 'PYTHON_YAML_SPLICE_LIMIT', len(YAML) - 1)
+    monkeypatch.setenv(backend.YAML_BACKEND_ENV_VAR, backend.PYTHON)
+
+    patcher = patch(YAML, constants.YAML, [('set', 'other', 'value')])
+
+    assert editor.edit(YAML, fmt=constants.YAML, obj=patcher.finish(),
+                       changes=patcher.changes) is None
+
+
+def test_edit_random():
+
+    # the edited text must always result in the patched document, or not be spliced at all.
+    rand = random.Random(18)
+
+    values = [1, 2.5, True, None, 'value', 'key: value', '# not a comment', [], {}, [1, 'value'],
+              {'key1': 'value', 'key2': [1, 2]}]
+
+    def keys(value, prefix=''):
+        if isinstance(value, dict):
+            for key, child in value.items():
+                yield prefix + key
+                for nested in keys(child, prefix + key + ':'):
+                    yield nested
+        elif isinstance(value, list):
+            for index, child in enumerate(value):
+                yield prefix + str(index)
+                for nested in keys(child, prefix + str(index) + ':'):
+                    yield nested
+
+    spliced = 0
+
+    for _ in range(500):
+
+        fmt = rand.choice([constants.JSON, constants.YAML])
+        document = dict(('key{0}'.format(index), rand.choice(values)) for index in range(4))
+        string = writer.dumps(document, fmt=fmt)
+
+        patcher = Patcher(parser.loads(string, fmt=fmt))
+
+        for _ in range(rand.randint(1, 3)):
+            existing = list(keys(patcher.finish()))
+            key = rand.choice(existing + ['key5', 'key0:key6'])
+            try:
+                if rand.random() < 0.3:
+                    patcher.delete(key)
+                else:
+                    patcher.set(key, json.dumps(rand.choice(values)))
+            except BaseException:  # pylint: disable=broad-except
+                pass
+
+        edited = editor.edit(string, fmt=fmt, obj=patcher.finish(), changes=patcher.changes)
+
+        if edited is not None:
+            spliced += 1
+            assert patcher.finish() == parser.loads(edited, fmt=fmt)
+
+    assert spliced > 450
+
+
+def test_dump(temp_dir):
+
+    file_path = os.path.join(temp_dir, 'file')
+
+    with open(file_path, 'w') as stream:
+        stream.write(YAML)
+
+    patcher = patch(YAML, constants.YAML, [('set', 'other', 'value')])
+
+    editor.dump(obj=patcher.finish(), file_path=file_path, fmt=constants.YAML,
+                changes=patcher.changes)
+
+    with open(file_path) as stream:
+        assert YAML.replace('"quoted"', 'value') == stream.read()
+
+
+def test_dump_fallback(temp_dir):
+
+    file_path = os.path.join(temp_dir, 'file')
+    string = 'key1:\n- key2: value1\n  key3: value2\n'
+
+    with open(file_path, 'w') as stream:
+        stream.write(string)
+
+    patcher = patch(string, constants.YAML, [('delete', 'key1:0:key2')])
+
+    editor.dump(obj=patcher.finish(), file_path=file_path, fmt=constants.YAML,
+                changes=patcher.changes)
+
+    with open(file_path) as stream:
+        assert writer.dumps(patcher.finish(), fmt=constants.YAML) == stream.read()
+
+
+def test_edit_unsupported_format():
+
+    with pytest.raises(BaseException) as info:
+        editor.edit('', fmt='unsupported', obj={}, changes=[])
+
+    assert 'unsupported' in str(info.value)
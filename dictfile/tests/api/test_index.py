@@ -0,0 +1,70 @@
+# Copyright (c) 2018 Eli Polonsky. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#   * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   * See the License for the specific language governing permissions and
+#   * limitations under the License.
+#
+#############################################################################
+
+import os
+
+from dictfile.api.index import Index
+
+
+def test_entries_no_index(temp_dir):
+
+    index = Index(os.path.join(temp_dir, 'index'))
+
+    assert [] == index.entries()
+    assert index.latest() is None
+
+
+def test_append(temp_dir):
+
+    index = Index(os.path.join(temp_dir, 'index'))
+
+    index.append({'version': 0, 'message': 'first'})
+    index.append({'version': 1, 'message': 'second'})
+
+    assert {'version': 1, 'message': 'second'} == index.latest()
+    assert {'version': 0, 'message': 'first'} == index.get(0)
+    assert index.get(2) is None
+
+    # a fresh index should read the same entries from disk
+    assert index.entries() == Index(index.file_path).entries()
+
+
+def test_entries_reloaded_on_external_change(temp_dir):
+
+    index = Index(os.path.join(temp_dir, 'index'))
+    index.append({'version': 0, 'message': 'first'})
+
+    Index(index.file_path).append({'version': 1, 'message': 'second'})
+
+    assert 1 == index.latest()['version']
+
+
+def test_torn_final_line(temp_dir):
+
+    index = Index(os.path.join(temp_dir, 'index'))
+    index.append({'version': 0, 'message': 'first'})
+
+    # an append that was interrupted by a crash
+    with open(index.file_path, 'a') as stream:
+        stream.write('{"message": "sec')
+
+    index = Index(index.file_path)
+
+    assert [{'version': 0, 'message': 'first'}] == index.entries()
+
+    index.append({'version': 1, 'message': 'second'})
+
+    assert [0, 1] == [entry['version'] for entry in Index(index.file_path).entries()]
@@ -0,0 +1,155 @@
+#############################################################################
+# Copyright (c) 2018 Eli Polonsky. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#   * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   * See the License for the specific language governing permissions and
+#   * limitations under the License.
+#
+#############################################################################
+
+import pytest
+
+from dictfile.api import exceptions
+from dictfile.api import keypath
+from dictfile.api.keypath import KeyPath
+
+
+@pytest.fixture(name='document')
+def _document():
+    return {
+        'key1': {
+            'key2': 'value1'
+        },
+        'servers': [
+            {'host': 'host1'},
+            {'host': 'host2'}
+        ]
+    }
+
+
+def test_parse():
+
+    path = keypath.parse('key1:key2')
+
+    assert isinstance(path, KeyPath)
+    assert 'key1:key2' == str(path)
+    assert [('key1', None), ('key2', None)] == path.steps
+
+
+def test_parse_index():
+
+    assert [('servers', None), ('0', 0), ('host', None)] == \
+        keypath.parse('servers:0:host').steps
+
+
+def test_parse_cached():
+
+    assert keypath.parse('key1:key2') is keypath.parse('key1:key2')
+
+
+def test_parse_key_path():
+
+    path = KeyPath('key1')
+
+    assert path is keypath.parse(path)
+
+
+def test_parse_evicts_least_recently_used(monkeypatch):
+
+    monkeypatch.setattr(keypath, 'MAX_CACHED_KEYS', 2)
+    monkeypatch.setattr(keypath, '_cache', keypath.collections.OrderedDict())
+
+    path1 = keypath.parse('key1')
+    path2 = keypath.parse('key2')
+
+    # key1 is now the most recently used
+    keypath.parse('key1')
+    keypath.parse('key3')
+
+    assert path1 is keypath.parse('key1')
+    assert path2 is not keypath.parse('key2')
+
+
+def test_get(document):
+
+    assert 'value1' == KeyPath('key1:key2').get(document)
+
+
+def test_get_index(document):
+
+    assert 'host2' == KeyPath('servers:1:host').get(document)
+
+
+@pytest.mark.parametrize("key", [
+    'non-existing',
+    'key1:non-existing',
+    'key1:key2:key3',
+    'servers:2:host',
+    'servers:host'
+])
+def test_get_non_existing(document, key):
+
+    with pytest.raises(exceptions.KeyNotFoundException):
+        KeyPath(key).get(document)
+
+
+def test_set(document):
+
+    KeyPath('key1:key2').set(document, 'value2')
+
+    assert 'value2' == document['key1']['key2']
+
+
+def test_set_creates_dictionaries(document):
+
+    KeyPath('key3:key4:key5').set(document, 'value2')
+
+    assert {'key4': {'key5': 'value2'}} == document['key3']
+
+
+def test_set_index(document):
+
+    KeyPath('servers:0:host').set(document, 'host3')
+    KeyPath('servers:1').set(document, 'host4')
+
+    assert [{'host': 'host3'}, 'host4'] == document['servers']
+
+
+def test_set_non_existing_index(document):
+
+    with pytest.raises(exceptions.KeyNotFoundException):
+        KeyPath('servers:2').set(document, 'host3')
+
+
+def test_set_through_non_container(document):
+
+    with pytest.raises(exceptions.InvalidKeyTypeException):
+        KeyPath('key1:key2:key3').set(document, 'value2')
+
+
+def test_delete(document):
+
+    KeyPath('key1:key2').delete(document)
+
+    assert {} == document['key1']
+
+
+def test_delete_index(document):
+
+    KeyPath('servers:0').delete(document)
+
+    assert [{'host': 'host2'}] == document['servers']
+
+
+def test_delete_non_existing(document):
+
+    with pytest.raises(exceptions.KeyNotFoundException):
+        KeyPath('servers:2').delete(document)
@@ -0,0 +1,144 @@
+#############################################################################
+# Copyright (c) 2018 Eli Polonsky. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#   * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   * See the License for the specific language governing permissions and
+#   * limitations under the License.
+#
+#############################################################################
+
+import os
+import threading
+import time
+
+import pytest
+
+from dictfile.api import exceptions
+from dictfile.api import lock
+
+
+@pytest.fixture(name='lock_file')
+def _lock_file(temp_dir):
+    yield os.path.join(temp_dir, 'file.lock')
+
+
+def _acquire_in_thread(file_path, shared=False):
+
+    # flock locks are per open file, so a lock acquired by another thread
+    # (which opens the file on its own) is excluded just like another process.
+    result = {}
+
+    def _acquire():
+        try:
+            with lock.FileLock(file_path, shared=shared, timeout=0.1):
+                result['acquired'] = True
+        except exceptions.LockTimeoutException as e:
+            result['exception'] = e
+
+    thread = threading.Thread(target=_acquire)
+    thread.start()
+    thread.join()
+
+    return result
+
+
+def test_acquire_creates_file(lock_file):
+
+    with lock.FileLock(lock_file):
+        assert os.path.exists(lock_file)
+
+
+def test_exclusive_excludes_exclusive(lock_file):
+
+    with lock.FileLock(lock_file):
+        result = _acquire_in_thread(lock_file)
+
+    assert 'acquired' not in result
+    assert lock_file in str(result['exception'])
+
+
+def test_exclusive_excludes_shared(lock_file):
+
+    with lock.FileLock(lock_file):
+        result = _acquire_in_thread(lock_file, shared=True)
+
+    assert 'acquired' not in result
+
+
+def test_shared_allows_shared(lock_file):
+
+    with lock.FileLock(lock_file, shared=True):
+        result = _acquire_in_thread(lock_file, shared=True)
+
+    assert result == {'acquired': True}
+
+
+def test_shared_excludes_exclusive(lock_file):
+
+    with lock.FileLock(lock_file, shared=True):
+        result = _acquire_in_thread(lock_file)
+
+    assert 'acquired' not in result
+
+
+def test_release(lock_file):
+
+    with lock.FileLock(lock_file):
+        pass
+
+    assert _acquire_in_thread(lock_file) == {'acquired': True}
+
+
+def test_reentrant(lock_file):
+
+    with lock.FileLock(lock_file):
+        with lock.FileLock(lock_file, timeout=0):
+            pass
+
+        # still held after the inner release
+        assert 'acquired' not in _acquire_in_thread(lock_file)
+
+    assert _acquire_in_thread(lock_file) == {'acquired': True}
+
+
+def test_reentrant_exclusive_as_shared(lock_file):
+
+    with lock.FileLock(lock_file):
+        with lock.FileLock(lock_file, shared=True, timeout=0):
+            pass
+
+
+def test_upgrade_shared_to_exclusive(lock_file):
+
+    with lock.FileLock(lock_file, shared=True):
+        with pytest.raises(exceptions.InvalidArgumentsException):
+            lock.FileLock(lock_file).acquire()
+
+
+def test_wait_for_release(lock_file):
+
+    acquired = threading.Event()
+
+    def _hold():
+        with lock.FileLock(lock_file):
+            acquired.set()
+            time.sleep(0.05)
+
+    thread = threading.Thread(target=_hold)
+    thread.start()
+    acquired.wait()
+
+    try:
+        # released by the other thread while waiting
+        with lock.FileLock(lock_file, timeout=5):
+            pass
+    finally:
+        thread.join()
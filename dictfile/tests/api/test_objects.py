@@ -0,0 +1,80 @@
+# Copyright (c) 2018 Eli Polonsky. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#   * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   * See the License for the specific language governing permissions and
+#   * limitations under the License.
+#
+#############################################################################
+
+import os
+
+import pytest
+
+from dictfile.api import compression
+from dictfile.api.objects import ObjectStore
+
+
+def test_put_get(temp_dir):
+
+    store = ObjectStore(temp_dir)
+
+    key = store.put(b'contents')
+
+    assert store.exists(key)
+    assert b'contents' == store.get(key)
+
+
+def test_put_existing(temp_dir):
+
+    store = ObjectStore(temp_dir)
+
+    assert store.put(b'contents') == store.put(b'contents')
+    assert 1 == len(store.keys())
+
+
+def test_get_non_existing(temp_dir):
+
+    assert ObjectStore(temp_dir).get('0' * 64) is None
+
+
+def test_delete(temp_dir):
+
+    store = ObjectStore(temp_dir)
+
+    key = store.put(b'contents')
+    store.delete(key)
+
+    assert not store.exists(key)
+    assert not os.path.exists(store.path(key))
+
+
+@pytest.mark.parametrize("codec", compression.names())
+def test_put_get_compressed(temp_dir, codec):
+
+    store = ObjectStore(temp_dir)
+
+    contents = b'key1: value1\n' * 100
+
+    key = store.put(contents, codec=codec)
+
+    assert contents == store.get(key)
+    assert ObjectStore.hash(contents) == key
+
+
+def test_hash_file(temp_dir, monkeypatch):
+
+    monkeypatch.setattr('dictfile.api.objects.HASH_CHUNK_SIZE', 3)
+
+    file_path = os.path.join(temp_dir, 'file')
+    with open(file_path, 'wb') as stream:
+        stream.write(b'contents')
+
+    assert ObjectStore.hash(b'contents') == ObjectStore.hash_file(file_path)
@@ -14,6 +14,9 @@
 #
 #############################################################################
 
+import math
+import random
+
 import pytest
 
 from dictfile.api import parser
@@ -125,3 +128,83 @@ def test_loads_unsupported_format():
 
     with pytest.raises(exceptions.UnsupportedFormatException):
         parser.loads(string='dummy', fmt='unsupported')
+
+
+@pytest.mark.parametrize("string,expected", [
+    ('', None),
+    ('{}', {}),
+    ('{"key1": {"key2": [1, 2.5, true, null]}}', {'key1': {'key2': [1, 2.5, True, None]}}),
+    ('{"key1": 1e3}', {'key1': 1000.0}),
+    ('{"key1": 123456789012345678901234567890}', {'key1': 123456789012345678901234567890}),
+    (u'{"key1": "שלום"}', {'key1': u'שלום'})
+])
+def test_loads_json(string, expected):
+
+    assert expected == parser.loads(string=string, fmt=constants.JSON)
+
+
+def test_loads_json_keys_are_strings():
+
+    actual = parser.loads(string='{"key1": {"key2": "value"}}', fmt=constants.JSON)
+
+    assert all(isinstance(key, str) for key in actual)
+    assert all(isinstance(key, str) for key in actual['key1'])
+
+
+# pieces that exercise every yaml implicit resolver, and the constructs that must
+# not be mistaken for a plain scalar.
+VALUE_PIECES = ['true', 'False', 'yes', 'NO', 'on', 'Off', 'null', 'Null', '~', '0x', '0o', '0b',
+                '.inf', '-.Inf', '.nan', '.NaN', '2018-01-01', 'T10:20:30', '190:20:30', '1_000',
+                'e', 'E+', 'a', 'z', '0', '1', '7', '9', '_', ':', '.', '-', '+', '/', ' ', '@',
+                '#', ',', '[', ']', '{', '}', '\'', '"', '!', '&', '*', '|', '>', '%', '?', '=',
+                '<<', '\t', '---', '...', 'hostname', 'http://host:80/path']
+
+
+def _load(load, string):
+    try:
+        return load(string)
+    except Exception as e:  # pylint: disable=broad-except
+        return type(e)
+
+
+def _equivalent(actual, expected):
+    if isinstance(expected, float) and math.isnan(expected):
+        return isinstance(actual, float) and math.isnan(actual)
+    return expected == actual and type(expected) == type(actual)  # pylint: disable=unidiomatic-typecheck
+
+
+@pytest.mark.parametrize("string,expected", [
+    ('5', 5),
+    ('-5.5', -5.5),
+    ('0x1F', 31),
+    ('1_000', 1000),
+    ('true', True),
+    ('Off', False),
+    ('~', None),
+    ('hostname', 'hostname'),
+    ('http://host:80/path', 'http://host:80/path'),
+    ('value with spaces', 'value with spaces'),
+    ('[1, 2]', [1, 2]),
+    ('{"key": "value"}', {'key': 'value'}),
+    ('key: value', {'key': 'value'}),
+    ('- value', ['value']),
+    ('', None)
+])
+def test_loads_value(string, expected):
+
+    assert _equivalent(parser.loads_value(string), expected)
+
+
+def test_loads_value_equivalent_to_yaml():
+
+    # a randomized equivalence test against loading a full yaml document.
+    rand = random.Random(0)
+
+    for _ in range(20000):
+
+        string = ''.join(rand.choice(VALUE_PIECES) for _ in range(rand.randint(1, 4)))
+
+        expected = _load(lambda s: parser.loads(s, fmt=constants.YAML), string)
+        actual = _load(parser.loads_value, string)
+
+        assert _equivalent(actual, expected), string
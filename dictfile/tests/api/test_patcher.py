@@ -529,3 +529,196 @@ def test_remove():
     patcher.remove(key='key1', value='value2')
 
     assert expected_dictionary == dictionary
+
+
+def test_finish_returns_patched_dictionary():
+
+    dictionary = {'key1': {'key2': 'value1'}}
+
+    patcher = Patcher(dictionary)
+
+    assert patcher.set('key1:key2', 'value2').finish() is dictionary
+
+
+def test_finish_keeps_empty_dictionaries():
+
+    dictionary = {'key1': {}, 'key2': {'key3': 'value1'}}
+
+    expected_dictionary = {'key1': {}, 'key2': {}}
+
+    patcher = Patcher(dictionary)
+    dictionary = patcher.delete('key2:key3').finish()
+
+    assert expected_dictionary == dictionary
+
+
+def test_finish_empty_document():
+
+    assert {'key1': 'value1'} == Patcher(None).set('key1', 'value1').finish()
+
+
+def test_set_complex_key_through_non_dictionary():
+
+    patcher = Patcher({'key1': 'value1'})
+
+    with pytest.raises(exceptions.InvalidKeyTypeException):
+        patcher.set('key1:key2', 'value2')
+
+
+def test_get_complex_key_through_non_dictionary():
+
+    patcher = Patcher({'key1': ['value1'], 'key2': 'value2'})
+
+    with pytest.raises(exceptions.KeyNotFoundException):
+        patcher.get('key1:key2')
+
+    with pytest.raises(exceptions.KeyNotFoundException):
+        patcher.get('key2:key3')
+
+
+def test_delete_non_existing_complex_key():
+
+    patcher = Patcher({'key1': {'key2': 'value1'}})
+
+    with pytest.raises(exceptions.KeyNotFoundException):
+        patcher.delete('key1:key3')
+
+    with pytest.raises(exceptions.KeyNotFoundException):
+        patcher.delete('key2:key3')
+
+
+def test_add_to_non_existing_key():
+
+    patcher = Patcher({'key1': ['value1']})
+
+    with pytest.raises(exceptions.KeyNotFoundException):
+        patcher.add(key='key2', value='value2')
+
+
+def test_get_list_element():
+
+    dictionary = {'servers': [{'host': 'host1'}, {'host': 'host2'}]}
+
+    patcher = Patcher(dictionary)
+
+    assert 'host2' == patcher.get('servers:1:host')
+
+
+def test_set_compiled_key():
+
+    dictionary = {'servers': [{'host': 'host1'}]}
+
+    expected_dictionary = {'servers': [{'host': 'host2'}]}
+
+    key = Patcher.compile('servers:0:host')
+
+    patcher = Patcher(dictionary)
+    dictionary = patcher.set(key, 'host2').finish()
+
+    assert expected_dictionary == dictionary
+    assert 'host2' == patcher.get(key)
+
+
+def test_apply():
+
+    dictionary = {
+        'key1': {
+            'key2': ['value1']
+        },
+        'key3': 'value3'
+    }
+
+    expected_dictionary = {
+        'key1': {
+            'key2': ['value2'],
+            'key4': 5
+        }
+    }
+
+    patcher = Patcher(dictionary)
+    dictionary = patcher.apply([
+        {'operation': 'add', 'key': 'key1:key2', 'value': 'value2'},
+        {'operation': 'remove', 'key': 'key1:key2', 'value': 'value1'},
+        {'operation': 'put', 'key': 'key1:key4', 'value': '5'},
+        {'operation': 'delete', 'key': 'key3'}
+    ]).finish()
+
+    assert expected_dictionary == dictionary
+    assert [('add', 'key1:key2'), ('remove', 'key1:key2'),
+            ('put', 'key1:key4'), ('delete', 'key3')] == patcher.changes
+
+
+def test_changes():
+
+    patcher = Patcher({'key1': ['value1']})
+
+    key = Patcher.compile('key2')
+
+    patcher.set('key1', '["value2"]').add('key1', 'value3').remove('key1', 'value2')
+    patcher.set(key, 'value4').delete(key)
+    patcher.get('key1')
+
+    assert [('put', 'key1'), ('add', 'key1'), ('remove', 'key1'),
+            ('put', key), ('delete', key)] == patcher.changes
+
+
+def test_changes_unchanged():
+
+    patcher = Patcher({'key1': 'value1', 'key2': 1, 'key3': {'key4': ['value2']}})
+
+    patcher.set('key1', 'value1').set('key3', '{"key4": ["value2"]}')
+
+    assert [] == patcher.changes
+    assert not patcher.dirty
+
+    # same value, different type
+    patcher.set('key2', '1.0')
+
+    assert [('put', 'key2')] == patcher.changes
+    assert patcher.dirty
+
+
+def test_apply_unchanged():
+
+    patcher = Patcher({'key1': ['value1']})
+
+    patcher.apply([
+        {'operation': 'add', 'key': 'key1', 'value': 'value2'},
+        {'operation': 'remove', 'key': 'key1', 'value': 'value2'},
+        {'operation': 'put', 'key': 'key2', 'value': 'value3'},
+        {'operation': 'delete', 'key': 'key2'}
+    ])
+
+    assert {'key1': ['value1']} == patcher.finish()
+    assert not patcher.dirty
+
+
+def test_apply_all_or_nothing():
+
+    dictionary = {'key1': ['value1']}
+
+    patcher = Patcher(dictionary)
+
+    with pytest.raises(exceptions.KeyNotFoundException):
+        patcher.apply([
+            {'operation': 'add', 'key': 'key1', 'value': 'value2'},
+            {'operation': 'delete', 'key': 'non-existing'}
+        ])
+
+    assert {'key1': ['value1']} == patcher.finish()
+    assert {'key1': ['value1']} == dictionary
+    assert [] == patcher.changes
+
+
+@pytest.mark.parametrize("operation", [
+    'not a dictionary',
+    {'operation': 'unknown', 'key': 'key1'},
+    {'operation': 'put', 'value': 'value1'},
+    {'operation': 'put', 'key': 'key1'}
+])
+def test_apply_invalid_operation(operation):
+
+    patcher = Patcher({'key1': 'value1'})
+
+    with pytest.raises(exceptions.InvalidArgumentsException):
+        patcher.apply([operation])
@@ -0,0 +1,132 @@
+#############################################################################
+# Copyright (c) 2018 Eli Polonsky. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#   * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   * See the License for the specific language governing permissions and
+#   * limitations under the License.
+#
+#############################################################################
+
+import json
+
+import pytest
+
+from dictfile.api import profiler
+
+
+@pytest.fixture(name='profile')
+def _profile():
+
+    profile = profiler.start()
+
+    try:
+        yield profile
+    finally:
+        profiler.stop()
+
+
+def test_span_inactive():
+
+    assert profiler.active() is None
+
+    with profiler.span(profiler.PARSE):
+        pass
+
+    assert profiler.stop() is None
+
+
+def test_span(profile):
+
+    with profiler.span(profiler.COMMIT):
+        with profiler.span(profiler.WRITE):
+            pass
+        with profiler.span(profiler.WRITE):
+            pass
+
+    with profiler.span(profiler.PARSE):
+        pass
+
+    assert ['commit', 'commit/write', 'commit/write', 'parse'] == \
+        [span['path'] for span in profile.spans]
+    assert [0, 1, 1, 0] == [span['depth'] for span in profile.spans]
+
+    for span in profile.spans:
+        assert span['wall'] >= 0
+        assert span['cpu'] >= 0
+
+
+def test_span_error(profile):
+
+    with pytest.raises(ValueError):
+        with profiler.span(profiler.PARSE):
+            raise ValueError()
+
+    with profiler.span(profiler.WRITE):
+        pass
+
+    # the failed span is closed as well
+    assert ['parse', 'write'] == [span['path'] for span in profile.spans]
+
+
+def test_profiled(profile):
+
+    @profiler.profiled(profiler.PATCH)
+    def patch(value):
+        return value
+
+    assert 'value' == patch('value')
+    assert ['patch'] == [span['path'] for span in profile.spans]
+
+
+def test_summary(profile):
+
+    profile.record(profiler.IMPORT, 0.5)
+
+    with profiler.span(profiler.COMMIT):
+        for _ in range(3):
+            with profiler.span(profiler.WRITE):
+                pass
+
+    summary = profile.summary()
+
+    assert ['import', 'commit', 'commit/write'] == [row['path'] for row in summary]
+    assert [1, 1, 3] == [row['calls'] for row in summary]
+    assert 0.5 == summary[0]['wall']
+    assert summary[0]['cpu'] is None
+    assert summary[1]['wall'] >= summary[2]['wall']
+
+
+def test_table(profile):
+
+    profile.record(profiler.IMPORT, 0.5)
+
+    with profiler.span(profiler.COMMIT):
+        with profiler.span(profiler.WRITE):
+            pass
+
+    lines = profile.table().splitlines()
+
+    assert lines[0].split() == ['phase', 'calls', 'wall', '(ms)', 'cpu', '(ms)', 'allocations']
+    assert lines[1].split()[:3] == ['import', '1', '500.000']
+    assert lines[2].startswith('commit ')
+    assert lines[3].startswith('  write ')
+
+
+def test_to_json(profile):
+
+    with profiler.span(profiler.PARSE):
+        pass
+
+    summary = json.loads(profile.to_json())
+
+    assert 1 == len(summary)
+    assert 'parse' == summary[0]['name']
+    assert 1 == summary[0]['calls']
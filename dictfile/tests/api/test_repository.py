@@ -16,38 +16,63 @@
 #############################################################################
 
 import copy
+import multiprocessing
 import os
+import threading
+import time
 
 import pytest
 
+from dictfile.api import atomic
+from dictfile.api import compression
 from dictfile.api import constants
 from dictfile.api import exceptions
+from dictfile.api import lock
+from dictfile.api import parser
+from dictfile.api import storage
+from dictfile.api import utils
 from dictfile.api import writer
 from dictfile.api.repository import Repository
 from dictfile.api.repository import ADD_COMMIT_MESSAGE
+from dictfile.api.repository import SKIP_EQUIVALENT
+from dictfile.api.repository import SKIP_NEVER
+from dictfile.api.objects import ObjectStore
+from dictfile.api.patcher import Patcher
 
 
-@pytest.fixture(name='repo', params=constants.SUPPORTED_FORMATS)
+REPOS = [(fmt, engine) for engine in storage.ENGINES for fmt in constants.SUPPORTED_FORMATS]
+
+
+@pytest.fixture(name='repo', params=REPOS, ids=['{0}-{1}'.format(*param) for param in REPOS])
 def _repo(temp_file, temp_dir, request):
 
     alias = request.node.name
-    fmt = request.param
+    fmt, engine = request.param
 
     writer.dump(obj=get_test_dict(fmt),
                 file_path=temp_file,
                 fmt=fmt)
 
     repo = Repository(config_dir=temp_dir)
+    repo.configure(name='engine', value=engine)
     repo.add(alias=alias, file_path=temp_file, fmt=fmt)
 
-    # attach the format to the repo instance so that
-    # test functions will have it.
+    # attach the format and engine to the repo instance
+    # so that test functions will have it.
     repo.test_fmt = fmt
+    repo.test_engine = engine
     repo.tracked_file = temp_file
 
     yield repo
 
 
+def skip_unless_files(repo):
+
+    # tests of the way the files engine lays out (and flushes) the repository on disk
+    if repo.test_engine != storage.FILES:
+        pytest.skip('{0} engine does not store files'.format(repo.test_engine))
+
+
 def get_dict(base_dict, fmt):
 
     if fmt == constants.INI:
@@ -63,6 +88,13 @@ def get_test_dict(fmt):
     return get_dict(base_dict={'key1': 'value1'}, fmt=fmt)
 
 
+def modify(repo, value='modified'):
+
+    writer.dump(obj=get_dict(base_dict={'key1': value}, fmt=repo.test_fmt),
+                file_path=repo.tracked_file,
+                fmt=repo.test_fmt)
+
+
 def test_add_no_file(repo):
 
     with pytest.raises(exceptions.FileNotFoundException):
@@ -75,6 +107,12 @@ def test_add_alias_with_spaces(repo):
         repo.add(alias='alias with spaces', file_path='dummy', fmt=repo.test_fmt)
 
 
+def test_add_alias_with_leading_dot(repo):
+
+    with pytest.raises(exceptions.IllegalAliasException):
+        repo.add(alias='.objects', file_path='dummy', fmt=repo.test_fmt)
+
+
 def test_add_alias_with_sep(repo):
 
     with pytest.raises(exceptions.IllegalAliasException):
@@ -125,16 +163,42 @@ def test_fmt_unknown_alias(repo):
 
 def test_commit(repo, request):
 
+    skip_unless_files(repo)
+
     alias = request.node.name
 
+    modify(repo)
     repo.commit(alias, message='this is my message')
 
     # make sure the correct file was created
-    revision_path = os.path.join(repo.root, alias, '1')
+    assert os.path.isfile(os.path.join(repo.root, alias, 'index'))
+
+    latest = repo.revisions(alias)[-1]
+
+    assert 1 == latest.version
+    assert 'this is my message' == latest.commit_message
+    assert os.path.getsize(repo.tracked_file) == latest.size
+    assert os.path.isfile(os.path.join(repo.root, '.objects',
+                                       latest.content_hash[:2],
+                                       latest.content_hash[2:]))
+
+
+def test_commit_identical_contents_stored_once(repo, request, temp_dir):
+
+    skip_unless_files(repo)
+
+    alias = request.node.name
+
+    repo.configure(name='skip_unchanged', value=SKIP_NEVER)
+    repo.commit(alias, message='no changes')
+
+    # the same file tracked by a different alias
+    repo.add(alias='other', file_path=repo.tracked_file, fmt=repo.test_fmt)
 
-    assert os.path.isdir(revision_path)
-    assert os.path.isfile(os.path.join(revision_path, 'contents'))
-    assert os.path.isfile(os.path.join(revision_path, 'commit-message'))
+    revisions = repo.revisions(alias) + repo.revisions('other')
+
+    assert 1 == len(set(revision.content_hash for revision in revisions))
+    assert 1 == len(utils.lsd(os.path.join(temp_dir, 'repo', '.objects')))
 
 
 def test_commit_unknown_alias(repo):
@@ -145,6 +209,78 @@ def test_commit_unknown_alias(repo):
         repo.commit(alias)
 
 
+def test_commit_parent(repo, request):
+
+    alias = request.node.name
+
+    modify(repo)
+    repo.commit(alias, parent=repo.latest_version(alias))
+
+    assert 1 == repo.latest_version(alias)
+
+
+def test_commit_concurrent_modification(repo, request):
+
+    alias = request.node.name
+
+    parent = repo.latest_version(alias)
+
+    # someone else committed after the parent was read
+    modify(repo)
+    repo.commit(alias)
+
+    with pytest.raises(exceptions.ConcurrentModificationException):
+        repo.commit(alias, parent=parent)
+
+    assert 1 == repo.latest_version(alias)
+
+
+def test_latest_version_unknown_alias(repo):
+
+    with pytest.raises(exceptions.AliasNotFoundException):
+        repo.latest_version('unknown')
+
+
+def _put_and_commit(config_dir, alias, key):
+
+    repo = Repository(config_dir=config_dir)
+
+    with repo.lock(alias):
+        version = repo.latest_version(alias)
+        patcher = Patcher(parser.load(file_path=repo.path(alias), fmt=constants.JSON))
+        patcher.set(key, 'value')
+        writer.dump(obj=patcher.finish(), file_path=repo.path(alias), fmt=constants.JSON)
+        repo.commit(alias, parent=version)
+
+
+def test_commit_concurrent_processes(temp_file, temp_dir):
+
+    alias = 'concurrent'
+    keys = ['key{0}'.format(i) for i in range(8)]
+
+    writer.dump(obj={}, file_path=temp_file, fmt=constants.JSON)
+    Repository(config_dir=temp_dir).add(alias=alias, file_path=temp_file, fmt=constants.JSON)
+
+    processes = [multiprocessing.Process(target=_put_and_commit, args=(temp_dir, alias, key))
+                 for key in keys]
+
+    for process in processes:
+        process.start()
+
+    for process in processes:
+        process.join()
+        assert 0 == process.exitcode
+
+    repo = Repository(config_dir=temp_dir)
+
+    # no modification was lost, and each one got its own version
+    assert dict((key, 'value') for key in keys) == parser.load(file_path=temp_file,
+                                                               fmt=constants.JSON)
+    assert list(range(len(keys) + 1)) == [revision.version
+                                          for revision in repo.revisions(alias)]
+    assert not repo.is_dirty(alias)
+
+
 def test_revisions(repo, request):
 
     alias = request.node.name
@@ -186,6 +322,7 @@ def test_message(repo, request):
 
     expected_message = 'my message'
 
+    modify(repo)
     repo.commit(alias=alias, message=expected_message)
 
     assert expected_message == repo.message(alias, 1)
@@ -200,6 +337,19 @@ def test_contents(repo, request):
                         fmt=repo.test_fmt) == contents
 
 
+def test_contents_latest(repo, request):
+
+    alias = request.node.name
+
+    writer.dump(obj=get_dict({'key2': 'value2'}, fmt=repo.test_fmt),
+                file_path=repo.tracked_file,
+                fmt=repo.test_fmt)
+    repo.commit(alias=alias)
+
+    with open(repo.tracked_file) as stream:
+        assert stream.read() == repo.contents(alias=alias, version='latest')
+
+
 def test_contents_unknown_alias(repo):
 
     with pytest.raises(exceptions.AliasNotFoundException):
@@ -212,6 +362,25 @@ def test_contents_wrong_version(repo, request):
         repo.contents(alias=request.node.name, version=1)
 
 
+def test_contents_locale_encoding(repo, request, mocker):
+
+    alias = request.node.name
+
+    # e.g a .properties file, which is traditionally latin-1 encoded
+    mocker.patch('locale.getpreferredencoding', return_value='latin-1')
+
+    text = writer.dumps(get_dict({'key1': 'cafe'}, fmt=repo.test_fmt),
+                        fmt=repo.test_fmt).replace('cafe', u'caf\xe9')
+
+    with open(repo.tracked_file, 'wb') as stream:
+        stream.write(text.encode('latin-1'))
+    repo.commit(alias)
+
+    assert text == repo.contents(alias, 1)
+    assert text.encode('latin-1') == repo.contents(alias, 1, binary=True)
+    assert get_dict({'key1': u'caf\xe9'}, fmt=repo.test_fmt) == repo.parse(alias, version=1)
+
+
 def test_remove(repo, request):
 
     alias = request.node.name
@@ -233,3 +402,594 @@ def test_remove_unknown_alias(repo):
 
     with pytest.raises(exceptions.AliasNotFoundException):
         repo.remove(alias='unknown')
+
+
+def test_state_loaded_once(repo, request, mocker):
+
+    alias = request.node.name
+
+    load = mocker.spy(parser, 'load')
+
+    repo.path(alias)
+    repo.fmt(alias)
+    repo.files()
+    repo.revisions(alias)
+
+    assert 0 == load.call_count
+
+
+def test_state_reloaded_on_external_change(repo, request, temp_dir):
+
+    alias = request.node.name
+
+    other = Repository(config_dir=temp_dir)
+    other.remove(alias=alias)
+
+    with pytest.raises(exceptions.AliasNotFoundException):
+        repo.path(alias)
+
+
+def test_revisions_legacy_repository(repo, request, temp_dir):
+
+    skip_unless_files(repo)
+
+    alias = request.node.name
+
+    # repositories created by older versions don't have an index, and keep
+    # the contents and commit message of each revision in its own directory.
+    os.remove(os.path.join(repo.root, alias, 'index'))
+    for version, message in [(0, ADD_COMMIT_MESSAGE), (1, 'my message')]:
+        revision_dir = os.path.join(repo.root, alias, str(version))
+        os.makedirs(revision_dir)
+        writer.dump(obj=get_dict({'key': str(version)}, fmt=repo.test_fmt),
+                    file_path=os.path.join(revision_dir, 'contents'),
+                    fmt=repo.test_fmt)
+        with open(os.path.join(revision_dir, 'commit-message'), 'w') as stream:
+            stream.write(message)
+
+    legacy = Repository(config_dir=temp_dir)
+    revisions = legacy.revisions(alias)
+
+    assert [0, 1] == [revision.version for revision in revisions]
+    assert [ADD_COMMIT_MESSAGE, 'my message'] == [revision.commit_message
+                                                  for revision in revisions]
+    assert writer.dumps(get_dict({'key': '1'}, fmt=repo.test_fmt),
+                        fmt=repo.test_fmt) == legacy.contents(alias, 'latest')
+    assert not utils.lsd(os.path.join(repo.root, alias))
+
+
+def test_state_legacy_repository(repo, request, temp_dir):
+
+    skip_unless_files(repo)
+
+    alias = request.node.name
+
+    # repositories created by older versions keep the state of all aliases in one file.
+    os.remove(os.path.join(repo.root, alias, 'file.json'))
+    writer.dump(obj={'files': {alias: {'file_path': repo.tracked_file, 'fmt': repo.test_fmt}}},
+                file_path=os.path.join(repo.root, 'repo.json'),
+                fmt=constants.JSON)
+
+    legacy = Repository(config_dir=temp_dir)
+
+    assert not os.path.exists(os.path.join(repo.root, 'repo.json'))
+    assert [alias] == [f.alias for f in legacy.files()]
+    assert repo.tracked_file == legacy.path(alias)
+    assert repo.test_fmt == legacy.fmt(alias)
+    assert [0] == [revision.version for revision in legacy.revisions(alias)]
+
+
+def test_state_per_alias(repo, request, temp_file):
+
+    skip_unless_files(repo)
+
+    alias = request.node.name
+
+    state_file = os.path.join(repo.root, alias, 'file.json')
+    fingerprint = utils.fingerprint(state_file)
+
+    repo.add(alias='other', file_path=temp_file, fmt=repo.test_fmt)
+    repo.remove(alias='other')
+
+    # adding and removing other aliases does not touch the state of this one
+    assert fingerprint == utils.fingerprint(state_file)
+    assert ['file.json', 'index'] == sorted(os.listdir(os.path.join(repo.root, alias)))
+
+
+def test_remove_keeps_shared_objects(repo, request):
+
+    alias = request.node.name
+
+    repo.add(alias='other', file_path=repo.tracked_file, fmt=repo.test_fmt)
+    repo.remove(alias)
+
+    assert writer.dumps(get_test_dict(repo.test_fmt),
+                        fmt=repo.test_fmt) == repo.contents('other', 0)
+
+
+def test_remove_keeps_objects_until_gc(repo, request):
+
+    alias = request.node.name
+
+    modify(repo)
+    repo.commit(alias)
+
+    objects = repo._storage.objects  # pylint: disable=protected-access
+    keys = list(objects.keys())
+
+    repo.remove(alias)
+
+    assert keys == list(objects.keys())
+    assert sorted(keys) == sorted(repo.gc())
+    assert [] == list(objects.keys())
+
+
+def test_gc_keeps_shared_objects(repo, request):
+
+    alias = request.node.name
+
+    repo.add(alias='other', file_path=repo.tracked_file, fmt=repo.test_fmt)
+    repo.remove(alias)
+
+    assert [] == repo.gc()
+    assert writer.dumps(get_test_dict(repo.test_fmt),
+                        fmt=repo.test_fmt) == repo.contents('other', 0)
+
+
+@pytest.mark.parametrize("engine", storage.ENGINES)
+def test_gc_concurrent_commit(temp_file, temp_dir, engine):
+
+    alias = 'concurrent'
+
+    writer.dump(obj={'key': 'value'}, file_path=temp_file, fmt=constants.JSON)
+
+    repo = Repository(config_dir=temp_dir)
+    repo.configure(name='engine', value=engine)
+    repo.add(alias=alias, file_path=temp_file, fmt=constants.JSON)
+
+    committer = Repository(config_dir=temp_dir)
+
+    # the commit holds the state lock, and waits for gc to try and acquire it
+    # before starting its transaction.
+    locked = threading.Event()
+    transaction = committer._storage.transaction  # pylint: disable=protected-access
+
+    def delayed(*args, **kwargs):
+        if not locked.is_set():
+            locked.set()
+            time.sleep(0.5)
+        return transaction(*args, **kwargs)
+
+    committer._storage.transaction = delayed  # pylint: disable=protected-access
+
+    writer.dump(obj={'key': 'modified'}, file_path=temp_file, fmt=constants.JSON)
+
+    thread = threading.Thread(target=committer.commit, args=(alias,))
+    thread.start()
+
+    locked.wait()
+    start = time.time()
+    repo.gc()
+    thread.join()
+
+    assert time.time() - start < 10
+    assert [0, 1] == [revision.version for revision in repo.revisions(alias)]
+
+
+def test_remove_shares_the_state_lock(repo, request, mocker):
+
+    alias = request.node.name
+
+    # removing an alias does not block commits of other aliases
+    state_lock = mocker.spy(repo, '_state_lock')
+
+    repo.remove(alias)
+
+    assert state_lock.call_count > 0
+    assert all(kwargs.get('shared') for _, kwargs in state_lock.call_args_list)
+
+
+def test_configure_engine_lock_order(repo, request, mocker):
+
+    alias = request.node.name
+
+    repo.add(alias='other', file_path=repo.tracked_file, fmt=repo.test_fmt)
+
+    acquire = mocker.spy(lock.FileLock, 'acquire')
+
+    engine = [engine for engine in storage.ENGINES if engine != repo.settings['engine']][0]
+    repo.configure(name='engine', value=engine)
+
+    # the locks of all aliases are acquired before the state lock
+    acquired = [os.path.basename(call[0][0].file_path) for call in acquire.call_args_list]
+    state = acquired.index('.state')
+
+    expected = set(os.path.basename(repo.lock(name).file_path) for name in [alias, 'other'])
+    assert expected <= set(acquired[:state])
+    assert sorted([alias, 'other']) == sorted(tracked.alias for tracked in repo.files())
+
+
+def test_commit_delta_storage(repo, request):
+
+    alias = request.node.name
+
+    repo.configure(name='storage', value='delta')
+    repo.configure(name='keyframe_interval', value='3')
+
+    dictionary = {'key{0}'.format(i): 'value{0}'.format(i) for i in range(50)}
+
+    expected = []
+
+    for version in range(8):
+        dictionary['key{0}'.format(version)] = 'changed'
+        writer.dump(obj=get_dict(dictionary, fmt=repo.test_fmt),
+                    file_path=repo.tracked_file,
+                    fmt=repo.test_fmt)
+        repo.commit(alias)
+        expected.append(writer.dumps(get_dict(dictionary, fmt=repo.test_fmt),
+                                     fmt=repo.test_fmt))
+
+    entries = repo._index(alias).entries()[1:]  # pylint: disable=protected-access
+
+    assert [0, 1, 2, 0, 1, 2, 0, 1] == [entry.get('depth', 0) for entry in entries]
+    assert expected == [repo.contents(alias, version) for version in range(1, 9)]
+
+
+def test_commit_delta_storage_non_utf8(repo, request, mocker):
+
+    alias = request.node.name
+
+    repo.configure(name='storage', value='delta')
+    mocker.patch('locale.getpreferredencoding', return_value='latin-1')
+
+    expected = []
+
+    for version in range(3):
+        # e.g a .properties file, which is traditionally latin-1 encoded
+        contents = u''.join(u'key{0}=caf\xe9 {1}\n'.format(i, u'na\xefve' if i == version else i)
+                            for i in range(50))
+        with open(repo.tracked_file, 'wb') as stream:
+            stream.write(contents.encode('latin-1'))
+        repo.commit(alias)
+        expected.append(contents)
+
+    entries = repo._index(alias).entries()[1:]  # pylint: disable=protected-access
+
+    assert [0, 1, 2] == [entry.get('depth', 0) for entry in entries]
+    assert expected == [repo.contents(alias, version) for version in range(1, 4)]
+    assert [contents.encode('latin-1') for contents in expected] == \
+        [repo.contents(alias, version, binary=True) for version in range(1, 4)]
+
+
+def test_configure_invalid_storage(repo):
+
+    with pytest.raises(exceptions.InvalidArgumentsException):
+        repo.configure(name='storage', value='unknown')
+
+
+def test_configure_invalid_keyframe_interval(repo):
+
+    with pytest.raises(exceptions.InvalidArgumentsException):
+        repo.configure(name='keyframe_interval', value='0')
+
+
+@pytest.mark.parametrize("codec", compression.names())
+def test_commit_compressed(repo, request, codec):
+
+    alias = request.node.name
+
+    repo.configure(name='compression', value=codec)
+
+    writer.dump(obj=get_dict({'key2': 'value2'}, fmt=repo.test_fmt),
+                file_path=repo.tracked_file,
+                fmt=repo.test_fmt)
+    repo.commit(alias)
+
+    assert writer.dumps(get_test_dict(repo.test_fmt), fmt=repo.test_fmt) == repo.contents(alias, 0)
+    assert writer.dumps(get_dict({'key2': 'value2'}, fmt=repo.test_fmt),
+                        fmt=repo.test_fmt) == repo.contents(alias, 1)
+
+
+def test_configure_invalid_compression(repo):
+
+    with pytest.raises(exceptions.InvalidArgumentsException):
+        repo.configure(name='compression', value='unknown')
+
+
+def test_configure_invalid_durability(repo):
+
+    with pytest.raises(exceptions.InvalidArgumentsException):
+        repo.configure(name='durability', value='unknown')
+
+
+def test_configure_invalid_skip_unchanged(repo):
+
+    with pytest.raises(exceptions.InvalidArgumentsException):
+        repo.configure(name='skip_unchanged', value='unknown')
+
+
+def test_commit_unchanged(repo, request):
+
+    alias = request.node.name
+
+    assert 0 == repo.commit(alias, message='no changes')
+    assert [0] == [revision.version for revision in repo.revisions(alias)]
+
+
+def test_commit_unchanged_never(repo, request):
+
+    alias = request.node.name
+
+    repo.configure(name='skip_unchanged', value=SKIP_NEVER)
+
+    assert 1 == repo.commit(alias, message='no changes')
+    assert 'no changes' == repo.message(alias, 1)
+
+
+def test_commit_formatting_only(repo, request):
+
+    alias = request.node.name
+
+    with open(repo.tracked_file, 'a') as stream:
+        stream.write('\n')
+
+    assert 1 == repo.commit(alias)
+
+
+def test_commit_formatting_only_equivalent(repo, request):
+
+    alias = request.node.name
+
+    repo.configure(name='skip_unchanged', value=SKIP_EQUIVALENT)
+
+    with open(repo.tracked_file, 'a') as stream:
+        stream.write('\n')
+
+    assert 0 == repo.commit(alias)
+
+    modify(repo)
+
+    assert 1 == repo.commit(alias)
+
+
+def test_configure_invalid_engine(repo):
+
+    with pytest.raises(exceptions.InvalidArgumentsException):
+        repo.configure(name='engine', value='unknown')
+
+
+def test_settings_parsed_once(repo, request, mocker):
+
+    alias = request.node.name
+
+    repo.configure(name='storage', value='delta')
+
+    load = mocker.spy(parser, 'load')
+
+    writer.dump(obj=get_dict({'key': 'value'}, fmt=repo.test_fmt),
+                file_path=repo.tracked_file,
+                fmt=repo.test_fmt)
+    repo.commit(alias)
+
+    assert 'delta' == repo.settings['storage']
+    # a copy every time, so callers cannot modify the cached settings
+    first = repo.settings
+    assert first is not repo.settings
+    assert repo._settings_file not in [  # pylint: disable=protected-access
+        call[1]['file_path'] for call in load.call_args_list]
+
+
+def test_settings_modified_by_another_instance(repo, temp_dir):
+
+    assert 'full' == repo.settings['storage']
+
+    Repository(config_dir=temp_dir).configure(name='storage', value='delta')
+
+    assert 'delta' == repo.settings['storage']
+
+
+def test_commit_sqlite_engine(repo, request, temp_dir):
+
+    alias = request.node.name
+
+    repo.configure(name='engine', value=storage.SQLITE)
+
+    writer.dump(obj=get_dict({'key': 'value'}, fmt=repo.test_fmt),
+                file_path=repo.tracked_file,
+                fmt=repo.test_fmt)
+    repo.commit(alias, message='my message')
+
+    # everything is in the database
+    assert not os.path.exists(os.path.join(repo.root, alias))
+    assert not utils.lsd(os.path.join(repo.root, '.objects'))
+
+    # as seen by another instance
+    other = Repository(config_dir=temp_dir)
+
+    assert [alias] == [f.alias for f in other.files()]
+    assert [0, 1] == [revision.version for revision in other.revisions(alias)]
+    assert 'my message' == other.message(alias, 1)
+    assert not other.is_dirty(alias)
+
+    other.remove(alias)
+
+    assert [] == repo.files()
+
+
+@pytest.mark.parametrize("engine", storage.ENGINES)
+def test_configure_engine_migrates(repo, request, temp_dir, engine):
+
+    alias = request.node.name
+
+    repo.configure(name='storage', value='delta')
+    for version in range(3):
+        writer.dump(obj=get_dict({'key': str(version)}, fmt=repo.test_fmt),
+                    file_path=repo.tracked_file,
+                    fmt=repo.test_fmt)
+        repo.commit(alias, message=str(version))
+
+    expected = [(revision.version, revision.commit_message, repo.contents(alias, revision.version))
+                for revision in repo.revisions(alias)]
+
+    # back and forth, ending up in the given engine
+    repo.configure(name='engine', value=storage.SQLITE)
+    repo.configure(name='engine', value=engine)
+
+    other = Repository(config_dir=temp_dir)
+
+    assert engine == other.settings['engine']
+    assert [(revision.version, revision.commit_message, other.contents(alias, revision.version))
+            for revision in other.revisions(alias)] == expected
+    assert repo.tracked_file == other.path(alias)
+    assert repo.test_fmt == other.fmt(alias)
+
+
+@pytest.mark.parametrize("durability", atomic.DURABILITY_MODES)
+def test_commit_durability(repo, request, mocker, durability):
+
+    skip_unless_files(repo)
+
+    alias = request.node.name
+
+    repo.configure(name='durability', value=durability)
+
+    fsync = mocker.patch('os.fsync')
+
+    with repo.barrier():
+        writer.dump(obj=get_dict({'key2': 'value2'}, fmt=repo.test_fmt),
+                    file_path=repo.tracked_file,
+                    fmt=repo.test_fmt)
+        repo.commit(alias)
+
+    # the tracked file, the stored revision and the index, each flushed once,
+    # plus (for 'full') the directory of each of them.
+    expected = {atomic.NONE: 0, atomic.FILE: 3, atomic.FULL: 6}[durability]
+
+    assert expected == fsync.call_count
+    assert writer.dumps(get_dict({'key2': 'value2'}, fmt=repo.test_fmt),
+                        fmt=repo.test_fmt) == repo.contents(alias, 1)
+
+
+def test_parse(repo, request):
+
+    alias = request.node.name
+
+    assert get_test_dict(repo.test_fmt) == repo.parse(alias)
+    assert get_test_dict(repo.test_fmt) == repo.parse(alias, version='latest')
+
+
+def test_parse_cached(repo, request, mocker):
+
+    alias = request.node.name
+
+    repo.parse(alias, version=0)
+
+    loads = mocker.spy(parser, 'loads')
+
+    assert get_test_dict(repo.test_fmt) == repo.parse(alias, version=0)
+    assert get_test_dict(repo.test_fmt) == repo.parse(alias)
+    assert 0 == loads.call_count
+
+
+def test_parse_wrong_version(repo, request):
+
+    with pytest.raises(exceptions.VersionNotFoundException):
+        repo.parse(alias=request.node.name, version=1)
+
+
+def _commit_old_file(repo, alias):
+
+    # make the file look like it was last modified long before it was
+    # committed, so that its modification time can be trusted.
+    old = time.time() - 60
+    os.utime(repo.tracked_file, (old, old))
+
+    # the file did not change since it was added, but its modification time did.
+    repo.configure(name='skip_unchanged', value=SKIP_NEVER)
+    repo.commit(alias)
+
+
+def test_is_dirty_clean(repo, request, mocker):
+
+    alias = request.node.name
+
+    _commit_old_file(repo, alias)
+
+    hash_contents = mocker.spy(ObjectStore, 'hash_file')
+
+    assert not repo.is_dirty(alias)
+    assert 0 == hash_contents.call_count
+
+
+def test_is_dirty_verified(repo, request, mocker):
+
+    alias = request.node.name
+
+    # committed right after it was written, its modification time cannot be trusted yet.
+    repo.configure(name='skip_unchanged', value=SKIP_NEVER)
+    repo.commit(alias)
+
+    hash_contents = mocker.spy(ObjectStore, 'hash_file')
+
+    assert not repo.is_dirty(alias)
+    assert 1 == hash_contents.call_count
+
+    # once it is old enough, the contents are verified one last time
+    mocker.patch('time.time', return_value=os.stat(repo.tracked_file).st_mtime + 60)
+
+    assert not repo.is_dirty(alias)
+    assert not repo.is_dirty(alias)
+    assert 2 == hash_contents.call_count
+
+    # and modifying the file (with the same size) changes its modification time
+    with open(repo.tracked_file, 'r+') as stream:
+        contents = stream.read()
+        stream.seek(0)
+        stream.write(contents.replace('value1', 'value2'))
+    old = os.stat(repo.tracked_file).st_mtime + 1
+    os.utime(repo.tracked_file, (old, old))
+
+    assert repo.is_dirty(alias)
+
+
+def test_is_dirty_same_contents(repo, request):
+
+    alias = request.node.name
+
+    _commit_old_file(repo, alias)
+
+    writer.dump(obj=get_test_dict(repo.test_fmt), file_path=repo.tracked_file, fmt=repo.test_fmt)
+
+    assert not repo.is_dirty(alias)
+
+
+def test_is_dirty_same_size(repo, request):
+
+    alias = request.node.name
+
+    writer.dump(obj=get_dict({'key1': 'value2'}, fmt=repo.test_fmt),
+                file_path=repo.tracked_file,
+                fmt=repo.test_fmt)
+
+    assert repo.is_dirty(alias)
+
+
+def test_is_dirty_modified(repo, request):
+
+    alias = request.node.name
+
+    writer.dump(obj=get_dict({'key2': 'value2'}, fmt=repo.test_fmt),
+                file_path=repo.tracked_file,
+                fmt=repo.test_fmt)
+
+    assert repo.is_dirty(alias)
+
+
+def test_is_dirty_formatting_only(repo, request):
+
+    alias = request.node.name
+
+    with open(repo.tracked_file, 'a') as stream:
+        stream.write('\n\n')
+
+    assert not repo.is_dirty(alias)
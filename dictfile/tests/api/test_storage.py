@@ -0,0 +1,145 @@
+#############################################################################
+# Copyright (c) 2018 Eli Polonsky. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#   * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   * See the License for the specific language governing permissions and
+#   * limitations under the License.
+#
+#############################################################################
+
+import os
+
+import pytest
+
+from dictfile.api import compression
+from dictfile.api import exceptions
+from dictfile.api import storage
+
+
+@pytest.fixture(name='store', params=storage.ENGINES)
+def _store(temp_dir, request):
+    yield storage.create(engine=request.param, directory=temp_dir)
+
+
+def _entry(version):
+    return {'version': version, 'timestamp': float(version), 'message': 'message',
+            'hash': str(version), 'size': 0}
+
+
+def test_create_unknown_engine(temp_dir):
+
+    with pytest.raises(exceptions.InvalidArgumentsException):
+        storage.create(engine='unknown', directory=temp_dir)
+
+
+def test_sqlite_single_file(temp_dir):
+
+    store = storage.create(engine=storage.SQLITE, directory=temp_dir)
+    store.save_file('alias', {'file_path': 'path', 'fmt': 'json'})
+
+    assert os.path.isfile(os.path.join(temp_dir, 'repo.sqlite'))
+    assert 'wal' == store.execute('PRAGMA journal_mode').fetchone()[0]
+
+
+def test_files(store):
+
+    store.save_file('b', {'file_path': 'path-b', 'fmt': 'json'})
+    store.save_file('a', {'file_path': 'path-a', 'fmt': 'yaml'})
+
+    assert ['a', 'b'] == store.aliases()
+    assert {'file_path': 'path-a', 'fmt': 'yaml'} == store.load_file('a')
+    assert store.load_file('unknown') is None
+
+
+def test_files_verified(store):
+
+    entry = {'file_path': 'path', 'fmt': 'json', 'verified': {'version': 1, 'mtime': 1.5}}
+    store.save_file('alias', entry)
+
+    assert entry == store.load_file('alias')
+
+
+def test_index(store):
+
+    store.save_file('alias', {'file_path': 'path', 'fmt': 'json'})
+    index = store.index('alias')
+
+    assert index.latest() is None
+
+    for version in range(3):
+        index.append(_entry(version))
+
+    assert [_entry(version) for version in range(3)] == index.entries()
+    assert _entry(1) == index.get(1)
+    assert index.get(3) is None
+    assert _entry(2) == store.index('alias').latest()
+
+    index.rewrite([_entry(0)])
+
+    assert [_entry(0)] == store.index('alias').entries()
+
+
+@pytest.mark.parametrize("codec", compression.names())
+def test_objects(store, codec):
+
+    key = store.objects.put(b'contents', codec=codec)
+
+    assert store.objects.exists(key)
+    assert b'contents' == store.objects.get(key)
+    assert key == store.objects.put(b'contents')
+    assert {key} == store.objects.keys()
+
+    store.objects.delete(key)
+
+    assert not store.objects.exists(key)
+    assert store.objects.get(key) is None
+
+
+def test_remove(store):
+
+    store.save_file('alias', {'file_path': 'path', 'fmt': 'json'})
+    store.index('alias').append(_entry(0))
+    key = store.objects.put(b'contents')
+
+    store.remove('alias')
+
+    assert [] == store.aliases()
+    assert store.load_file('alias') is None
+
+    # objects may be shared with other aliases
+    assert store.objects.exists(key)
+
+
+def test_clear(store):
+
+    store.save_file('alias', {'file_path': 'path', 'fmt': 'json'})
+    store.index('alias').append(_entry(0))
+    store.objects.put(b'contents')
+
+    store.clear()
+
+    assert [] == store.aliases()
+    assert set() == store.objects.keys()
+
+
+def test_transaction_rollback(temp_dir):
+
+    store = storage.create(engine=storage.SQLITE, directory=temp_dir)
+
+    with pytest.raises(RuntimeError):
+        with store.transaction():
+            store.save_file('alias', {'file_path': 'path', 'fmt': 'json'})
+            with store.transaction():
+                store.objects.put(b'contents')
+            raise RuntimeError()
+
+    assert [] == store.aliases()
+    assert set() == store.objects.keys()
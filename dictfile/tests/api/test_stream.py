@@ -0,0 +1,254 @@
+#############################################################################
+# Copyright (c) 2018 Eli Polonsky. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#   * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   * See the License for the specific language governing permissions and
+#   * limitations under the License.
+#
+#############################################################################
+
+import json
+import os
+import random
+
+import pytest
+import six
+import yaml
+
+from dictfile.api import constants
+from dictfile.api import exceptions
+from dictfile.api import stream
+from dictfile.api import writer
+from dictfile.api.keypath import KeyPath
+
+DOCUMENT = {
+    'key1': {
+        'key2': 'value1',
+        'key3': [1, 2.5, True, None, {'key4': 'value "quoted" \\ with éscapes'}],
+        'key5': {}
+    },
+    'servers': [{'host': 'host1', 'port': 8080}, {'host': 'host2', 'port': 12345678901234567890}],
+    'empty': []
+}
+
+KEYS = ['key1', 'key1:key2', 'key1:key3', 'key1:key3:1', 'key1:key3:4:key4', 'key1:key5',
+        'servers:1', 'servers:1:port', 'empty']
+
+NON_EXISTING_KEYS = ['non-existing', 'key1:non-existing', 'key1:key2:key3', 'key1:key3:5',
+                     'servers:host', 'empty:0']
+
+
+@pytest.fixture(name='document', params=stream.STREAMING_FORMATS)
+def _document(request, temp_dir):
+
+    fmt = request.param
+    file_path = os.path.join(temp_dir, 'document')
+    writer.dump(obj=DOCUMENT, file_path=file_path, fmt=fmt)
+
+    return file_path, fmt
+
+
+@pytest.mark.parametrize("key", KEYS)
+def test_get(document, key):
+
+    file_path, fmt = document
+
+    assert KeyPath(key).get(DOCUMENT) == stream.get(file_path, fmt=fmt, key=key)
+
+
+@pytest.mark.parametrize("key", NON_EXISTING_KEYS)
+def test_get_non_existing_key(document, key):
+
+    file_path, fmt = document
+
+    with pytest.raises(exceptions.KeyNotFoundException):
+        stream.get(file_path, fmt=fmt, key=key)
+
+
+@pytest.mark.parametrize("fmt", stream.STREAMING_FORMATS)
+def test_get_empty_document(temp_dir, fmt):
+
+    file_path = os.path.join(temp_dir, 'document')
+    open(file_path, 'w').close()
+
+    with pytest.raises(exceptions.KeyNotFoundException):
+        stream.get(file_path, fmt=fmt, key='key1')
+
+
+@pytest.mark.parametrize("fmt,contents", [
+    (constants.JSON, '{"key1": {"key2" "value1"}}'),
+    (constants.JSON, '{"key1": {"key2": [1, 2'),
+    (constants.JSON, '{"key0": [1, {"key1": 2}, "value1'),
+    (constants.YAML, 'key1:\n  key2: [value1\n')
+])
+def test_get_corrupt_document(temp_dir, fmt, contents):
+
+    file_path = os.path.join(temp_dir, 'document')
+    with open(file_path, 'w') as f:
+        f.write(contents)
+
+    with pytest.raises(exceptions.CorruptFileException):
+        stream.get(file_path, fmt=fmt, key='key1:key2')
+
+
+def test_get_unsupported_format(temp_dir):
+
+    with pytest.raises(exceptions.UnsupportedFormatException):
+        stream.get(temp_dir, fmt=constants.PROPERTIES, key='key1')
+
+
+@pytest.mark.parametrize("key,expected", [
+    ('key2:key3', 'value1'),
+    ('key4:key3', 'value1'),
+    ('key5:key6', 'value2'),
+    ('key7', set(['value3']))
+])
+def test_get_yaml_aliases_and_tags(temp_dir, key, expected):
+
+    file_path = os.path.join(temp_dir, 'document')
+    with open(file_path, 'w') as f:
+        f.write('key1: &anchor {key3: value1}\n'
+                'key2: *anchor\n'
+                'key4:\n'
+                '  <<: *anchor\n'
+                'key5: {key6: value2}\n'
+                'key7: !!set {value3}\n')
+
+    assert expected == stream.get(file_path, fmt=constants.YAML, key=key)
+
+
+@pytest.mark.parametrize("fmt,contents", [
+    (constants.JSON, '{"key1": {"key2": 1, "key3": 2, "key2": 3}, "key4": [1, {}]}'),
+    (constants.JSON, '{"key1": {"key2": 1}, "key4": [1, {}], "key1": {"key2": 3}}'),
+    (constants.YAML, 'key1: {key2: 1, key3: 2, key2: 3}\nkey4: [1, {}]\n'),
+    (constants.YAML, 'key1:\n  key2: 1\nkey4: [1, {}]\nkey1:\n  key2: 3\n')
+])
+def test_get_duplicate_keys(temp_dir, fmt, contents):
+
+    file_path = os.path.join(temp_dir, 'document')
+    with open(file_path, 'w') as f:
+        f.write(contents)
+
+    # the last occurrence, the same as loading the document
+    assert 3 == stream.get(file_path, fmt=fmt, key='key1:key2')
+    assert [1, {}] == stream.get(file_path, fmt=fmt, key='key4')
+
+
+@pytest.mark.parametrize("fmt,contents", [
+    (constants.JSON, '{"key1": {"key3": 1}, "key1": {"key2": 2}}'),
+    (constants.YAML, 'key1:\n  key3: 1\nkey1:\n  key2: 2\n')
+])
+def test_get_duplicate_keys_only_later_occurrence(temp_dir, fmt, contents):
+
+    file_path = os.path.join(temp_dir, 'document')
+    with open(file_path, 'w') as f:
+        f.write(contents)
+
+    assert 2 == stream.get(file_path, fmt=fmt, key='key1:key2')
+
+
+@pytest.mark.parametrize("fmt,contents", [
+    (constants.JSON, '{"key1": 1, "\\u006bey1": 2}'),
+    (constants.YAML, 'key1: 1\n"\\x6bey1": 2\n'),
+    (constants.YAML, '{&anchor key1: 1, *anchor : 2}')
+])
+def test_get_duplicate_keys_spelled_differently(temp_dir, fmt, contents):
+
+    file_path = os.path.join(temp_dir, 'document')
+    with open(file_path, 'w') as f:
+        f.write(contents)
+
+    assert 2 == stream.get(file_path, fmt=fmt, key='key1')
+
+
+@pytest.mark.parametrize("fmt,contents", [
+    (constants.JSON, '{"key1": {"key2": 1, "key3": 2}, "key4": ['),
+    (constants.YAML, 'key1:\n  key2: 1\n  key3: 2\nkey4: [\n')
+])
+def test_get_unique_keys_stops_at_value(temp_dir, fmt, contents):
+
+    file_path = os.path.join(temp_dir, 'document')
+    with open(file_path, 'w') as f:
+        f.write(contents)
+
+    # the keys do not appear again, so the (invalid) rest of the document is never read
+    assert 1 == stream.get(file_path, fmt=fmt, key='key1:key2')
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64])
+def test_repeated_chunk_boundaries(monkeypatch, chunk_size):
+
+    monkeypatch.setattr(stream, 'CHUNK_SIZE', chunk_size)
+
+    text = six.StringIO('{"key1": {"key2": 1, "key22": 2}, "key3": {"key2": 3}}')
+
+    # a key appears once along the way to the value for every level it is found in
+    assert {'key2'} == stream._repeated(  # pylint: disable=protected-access
+        text, ['key1', 'key2', 'key3', 'key3'])
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64])
+def test_get_json_chunk_boundaries(temp_dir, monkeypatch, chunk_size):
+
+    monkeypatch.setattr(stream, 'CHUNK_SIZE', chunk_size)
+
+    file_path = os.path.join(temp_dir, 'document')
+
+    with open(file_path, 'w') as f:
+        f.write(json.dumps(DOCUMENT, indent=1))
+
+    for key in KEYS:
+        assert KeyPath(key).get(DOCUMENT) == stream.get(file_path, fmt=constants.JSON, key=key)
+
+
+def test_get_equivalent_to_load(temp_dir):
+
+    # a randomized equivalence test against loading the entire document.
+    rand = random.Random(0)
+
+    def _value(depth):
+        choice = rand.randint(0, 6 if depth < 3 else 3)
+        if choice == 0:
+            return rand.randint(-10 ** 20, 10 ** 20)
+        if choice == 1:
+            return rand.choice([True, False, None, 0.5, -1e-5])
+        if choice in [2, 3]:
+            return ''.join(rand.choice('ab:,"{}[]\\ \n') for _ in range(rand.randint(0, 5)))
+        if choice in [4, 5]:
+            return {'key{0}'.format(i): _value(depth + 1) for i in range(rand.randint(0, 4))}
+        return [_value(depth + 1) for _ in range(rand.randint(0, 4))]
+
+    def _keys(value, prefix):
+        if isinstance(value, dict):
+            items = value.items()
+        elif isinstance(value, list):
+            items = enumerate(value)
+        else:
+            return
+        for name, child in items:
+            key = '{0}{1}'.format(prefix, name)
+            yield key
+            for nested in _keys(child, key + ':'):
+                yield nested
+
+    file_path = os.path.join(temp_dir, 'document')
+
+    for _ in range(50):
+
+        document = {'key': _value(0)}
+
+        for fmt, dump in [(constants.JSON, json.dumps), (constants.YAML, yaml.safe_dump)]:
+
+            with open(file_path, 'w') as f:
+                f.write(dump(document))
+
+            for key in _keys(document, ''):
+                assert KeyPath(key).get(document) == stream.get(file_path, fmt=fmt, key=key)
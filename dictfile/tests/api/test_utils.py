@@ -61,3 +61,20 @@ def test_smkdir_directory_does_not_exist():
     utils.smkdir(temp_dir)
 
     assert os.path.isdir(temp_dir)
+
+
+def test_fingerprint():
+
+    temp_dir = tempfile.mkdtemp()
+    file_path = os.path.join(temp_dir, 'file1')
+    with open(file_path, 'w') as stream:
+        stream.write('hello')
+
+    before = utils.fingerprint(file_path)
+
+    assert before == utils.fingerprint(file_path)
+
+    with open(file_path, 'w') as stream:
+        stream.write('hello world')
+
+    assert before != utils.fingerprint(file_path)
@@ -131,7 +131,10 @@ class CommandLineFixture(object):
 
 
 def get_parse_error(fmt):
-    expected_exception_message = 'mapping values are not allowed here'
+    # libyaml phrases this error slightly differently ('... allowed in this context')
+    expected_exception_message = 'mapping values are not allowed'
+    if fmt == constants.JSON:
+        expected_exception_message = 'Expecting value'
     if fmt == constants.INI:
         expected_exception_message = 'File contains no section headers'
     return expected_exception_message
@@ -15,12 +15,14 @@
 #############################################################################
 
 import copy
+import json
 import os
 
 import click
 import pytest
 
 from dictfile.api import constants
+from dictfile.api import parser
 from dictfile.api import writer
 from dictfile.shell import solutions, causes
 from dictfile.tests.shell.commands import CommandLineFixture, get_parse_error
@@ -119,6 +121,51 @@ def test_put_with_simple_value(configure):
     assert expected_message == configure.repo.message(alias=configure.alias, version=2)
 
 
+def test_put_existing_value(configure):
+
+    write_file(
+        dictionary={
+            'key1': 'value1'
+        },
+        configure=configure
+    )
+
+    file_path = configure.repo.path(configure.alias)
+    before = os.stat(file_path)
+
+    configure.run('put --key {0} --value value1'.format(get_key('key1', configure)))
+
+    after = os.stat(file_path)
+
+    # the file is not even rewritten, and nothing is committed
+    assert (before.st_ino, before.st_mtime) == (after.st_ino, after.st_mtime)
+    assert 1 == configure.repo.latest_version(configure.alias)
+
+
+def test_put_remembers_parsed_file(configure, request, mocker):
+
+    if request.node.callspec.params['runner'] == 'binary':
+        pytest.skip('The binary runs in its own process, where the parser cannot be spied on')
+
+    write_file(
+        dictionary={
+            'key1': 'value1'
+        },
+        configure=configure
+    )
+
+    configure.run('put --key {0} --value value2'.format(get_key('key1', configure)))
+
+    load_contents = mocker.spy(parser, 'load_contents')
+
+    configure.run('put --key {0} --value value3'.format(get_key('key1', configure)))
+
+    # the file written by the first command is not parsed again by the second
+    assert 0 == load_contents.call_count
+    assert write_string(dictionary={'key1': 'value3'}, configure=configure) == \
+        read_file(configure=configure)
+
+
 def test_put_with_int_value(configure):
 
     write_file(
@@ -329,6 +376,29 @@ def test_get(configure):
     assert expected in actual
 
 
+def test_put_profile(configure, runner, temp_dir):
+
+    write_file(dictionary={'key1': 'value1'}, configure=configure)
+
+    result = runner.run('--profile configure {0} put --key {1} --value value2'
+                        .format(configure.alias, get_key('key1', configure)))
+
+    # the repository may already be initialized (and its state loaded) by a previous command
+    for phase in ['phase', 'dirty check', 'parse', 'patch', 'serialize', 'write', 'commit']:
+        assert phase in result.std_out
+
+    output = os.path.join(temp_dir, 'profile.json')
+
+    runner.run('--profile --profile-format json --profile-output {0} configure {1} get --key {2}'
+               .format(output, configure.alias, get_key('key1', configure)))
+
+    with open(output) as stream:
+        phases = [row['path'] for row in json.load(stream)]
+
+    assert 'dirty check' in phases
+    assert 'commit' not in phases
+
+
 def test_get_non_existing_key(configure):
 
     write_file(
@@ -403,6 +473,32 @@ def test_get_complex_key(configure):
     assert expected in actual
 
 
+def test_get_streaming(configure, monkeypatch):
+
+    skip_if_not_compound(configure)
+
+    monkeypatch.setattr('dictfile.shell.commands.configure.STREAMING_GET_THRESHOLD', 0)
+
+    write_file(
+        dictionary={
+            'key1': {
+                'key2': ['value1', {'key3': 'value2'}]
+            }
+        },
+        configure=configure)
+
+    assert 'value2' in configure.run('get --key key1:key2:1:key3').std_out
+
+    expected = write_string(dictionary={'key2': ['value1', {'key3': 'value2'}]},
+                            configure=configure)
+
+    assert expected.strip() in configure.run('get --key key1').std_out
+
+    result = configure.run('get --key key1:key4', catch_exceptions=True)
+
+    assert "Error: Key 'key1:key4' does not exist" in result.std_out
+
+
 def test_add(configure):
 
     fmt = configure.fmt
@@ -539,6 +635,32 @@ def test_remove_from_complex_key(configure):
     assert expected in actual
 
 
+FORMATTED_STRINGS = {
+    constants.JSON: '{\n    "key2": "value2",\n    "key1": "value1"\n}\n',
+    constants.YAML: '# comment\nkey2: value2\nkey1:   value1\n',
+    constants.PROPERTIES: '# comment\nkey2 = value2\nkey1 = value1\n',
+    constants.INI: '# comment\n[section1]\nkey2 = value2\nkey1 = value1\n'
+}
+
+
+def test_put_preserves_formatting(configure):
+
+    string = FORMATTED_STRINGS[configure.fmt]
+
+    with open(configure.repo.path(configure.alias), 'w') as stream:
+        stream.write(string)
+    configure.repo.commit(alias=configure.alias)
+
+    configure.run('put --key {0} --value value3'.format(get_key('key1', configure)))
+
+    expected = string.replace('value1', 'value3')
+    if configure.fmt == constants.PROPERTIES:
+        # the modified line is written in the standard form
+        expected = expected.replace('key1 = value3', 'key1=value3')
+
+    assert expected == read_file(configure=configure)
+
+
 def test_corrupt_file(configure):
 
     fmt = configure.fmt
@@ -583,3 +705,145 @@ def test_different_file(configure):
     assert causes.DIFFER_FROM_LATEST in result.std_out
     assert solutions.reset_to_latest(configure.alias) in result.std_out
     assert solutions.commit(configure.alias) in result.std_out
+
+
+def write_operations(operations, configure):
+
+    file_path = os.path.join(os.path.dirname(configure.repo.root), 'operations')
+
+    with open(file_path, 'w') as stream:
+        stream.write(operations)
+
+    return file_path
+
+
+def test_apply_json_lines(configure):
+
+    write_file(
+        dictionary={
+            'key1': 'value1',
+            'key2': 'value2'
+        },
+        configure=configure
+    )
+
+    expected = write_string(
+        dictionary={
+            'key1': 'value3',
+            'key3': 5
+        },
+        configure=configure)
+
+    operations = '\n'.join([
+        '{{"operation": "put", "key": "{0}", "value": "value3"}}'
+        .format(get_key('key1', configure)),
+        '{{"operation": "put", "key": "{0}", "value": 5}}'.format(get_key('key3', configure)),
+        '{{"operation": "delete", "key": "{0}"}}'.format(get_key('key2', configure))
+    ])
+
+    configure.run('apply --operations {0} --message applied'
+                  .format(write_operations(operations, configure)))
+
+    revisions = configure.repo.revisions(configure.alias)
+
+    assert expected == read_file(configure=configure)
+    assert 3 == len(revisions)
+    assert 'applied' == revisions[-1].commit_message
+
+
+def test_apply_yaml(configure):
+
+    skip_if_not_compound(configure)
+
+    write_file(
+        dictionary={
+            'key1': ['value1']
+        },
+        configure=configure
+    )
+
+    expected = write_string(
+        dictionary={
+            'key1': ['value2', 'value3']
+        },
+        configure=configure)
+
+    operations = '''
+- operation: add
+  key: key1
+  value: value2
+- operation: add
+  key: key1
+  value: value3
+- operation: remove
+  key: key1
+  value: value1
+'''
+
+    configure.run('apply --operations {0}'.format(write_operations(operations, configure)))
+
+    assert expected == read_file(configure=configure)
+
+
+def test_apply_all_or_nothing(configure):
+
+    write_file(
+        dictionary={
+            'key1': 'value1'
+        },
+        configure=configure
+    )
+
+    expected = read_file(configure=configure)
+
+    operations = '\n'.join([
+        '{{"operation": "put", "key": "{0}", "value": "value2"}}'
+        .format(get_key('key1', configure)),
+        '{{"operation": "delete", "key": "{0}"}}'.format(get_key('non-existing', configure))
+    ])
+
+    result = configure.run('apply --operations {0}'
+                           .format(write_operations(operations, configure)),
+                           catch_exceptions=True)
+
+    assert 'does not exist' in result.std_out
+    assert expected == read_file(configure=configure)
+    assert 2 == len(configure.repo.revisions(configure.alias))
+
+
+def test_apply_unknown_operation(configure):
+
+    operations = '{"operation": "unknown", "key": "key1"}'
+
+    result = configure.run('apply --operations {0}'
+                           .format(write_operations(operations, configure)),
+                           catch_exceptions=True)
+
+    assert 'Error: Operation must be one of put, add, remove, delete' in result.std_out
+
+
+def test_apply_non_string_key(configure):
+
+    operations = '{"operation": "put", "key": 5, "value": "value1"}'
+
+    result = configure.run('apply --operations {0}'
+                           .format(write_operations(operations, configure)),
+                           catch_exceptions=True)
+
+    assert 'Error: Operation key must be a string' in result.std_out
+
+
+def test_apply_unsupported_operation(configure):
+
+    if configure.fmt in constants.COMPOUND_FORMATS:
+        pytest.skip('{0} format supports this'.format(configure.fmt))
+
+    operations = '{"operation": "add", "key": "key1", "value": "value1"}'
+
+    result = configure.run('apply --operations {0}'
+                           .format(write_operations(operations, configure)),
+                           catch_exceptions=True)
+
+    expected = 'Error: Unsupported operation: add (format={0})'.format(configure.fmt)
+
+    assert expected in result.std_out
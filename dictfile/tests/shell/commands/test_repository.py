@@ -69,7 +69,8 @@ def test_add_alias_with_spaces(repository):
     result = repository.run('add --alias "alias with spaces" --file-path dummy --fmt {0}'
                             .format(repository.fmt), catch_exceptions=True)
 
-    expected_output = 'Error: Alias is illegal (Must not contain spaces nor path separators)'
+    expected_output = 'Error: Alias is illegal (Must not contain spaces nor path separators, ' \
+                      'and must not start with a dot)'
 
     assert expected_output in result.std_out
 
@@ -79,7 +80,8 @@ def test_add_alias_with_path_sep(repository):
     result = repository.run('add --alias="alias{0}with{0}sep" --file-path=dummy --fmt={1}'
                             .format(os.sep, repository.fmt), catch_exceptions=True)
 
-    expected_output = 'Error: Alias is illegal (Must not contain spaces nor path separators)'
+    expected_output = 'Error: Alias is illegal (Must not contain spaces nor path separators, ' \
+                      'and must not start with a dot)'
 
     assert expected_output in result.std_out
 
@@ -205,6 +207,11 @@ def test_reset(repository):
 
     alias = repository.alias
     file_path = repository.repo.path(alias)
+
+    changed = get_dict(base_dict={'key5': 'value5'}, repository=repository)
+    writer.dump(obj=changed, file_path=file_path, fmt=repository.fmt)
+    repository.run('commit --alias {0}'.format(alias))
+
     with open(file_path, 'w') as stream:
         stream.write('corrupted')
 
@@ -216,11 +223,11 @@ def test_reset(repository):
 
     revisions = repository.repo.revisions(alias)
 
-    expected_number_of_revisions = 2
+    expected_number_of_revisions = 3
 
     assert expected == actual
     assert expected_number_of_revisions == len(revisions)
-    assert alias == repository.repo.message(alias=alias, version=1)
+    assert alias == repository.repo.message(alias=alias, version=2)
 
 
 def test_reset_latest(repository):
@@ -238,12 +245,43 @@ def test_reset_latest(repository):
 
     revisions = repository.repo.revisions(alias)
 
-    expected_number_of_revisions = 2
+    # the file is identical to the latest version again, so there is nothing to commit
+    expected_number_of_revisions = 1
 
     assert expected == actual
     assert expected_number_of_revisions == len(revisions)
 
 
+def test_reset_locale_encoding(repository, request, mocker):
+
+    if request.node.callspec.params['runner'] == 'binary':
+        pytest.skip('The binary runs in its own process, where the locale cannot be patched')
+
+    alias = repository.alias
+    file_path = repository.repo.path(alias)
+
+    mocker.patch('locale.getpreferredencoding', return_value='latin-1')
+
+    text = writer.dumps(obj=get_dict(base_dict={'key1': 'cafe'}, repository=repository),
+                        fmt=repository.fmt).replace('cafe', u'caf\xe9')
+
+    with open(file_path, 'wb') as stream:
+        stream.write(text.encode('latin-1'))
+    repository.run('commit --alias {0}'.format(alias))
+
+    with open(file_path, 'w') as stream:
+        stream.write('corrupted')
+
+    result = repository.run('show --alias {0} --version 1'.format(alias))
+    repository.run('reset --alias {0} --version 1'.format(alias))
+
+    with open(file_path, 'rb') as stream:
+        actual = stream.read()
+
+    assert text.strip() in result.std_out
+    assert text.encode('latin-1') == actual
+
+
 def test_reset_wrong_alias(repository):
 
     result = repository.run('reset --alias unknown --version 1', catch_exceptions=True)
@@ -276,6 +314,16 @@ def test_remove(repository):
     assert expected_number_of_files == len(files)
 
 
+def test_gc(repository):
+
+    alias = repository.alias
+
+    repository.run('remove --alias {0}'.format(alias))
+    repository.run('gc')
+
+    assert [] == list(repository.repo._storage.objects.keys())
+
+
 def test_remove_wrong_alias(repository):
 
     result = repository.run('remove --alias unknown', catch_exceptions=True)
@@ -344,3 +392,36 @@ def test_commit_unknown_alias(repository):
     expected = 'Error: Alias unknown not found'
 
     assert expected in result.std_out
+
+
+def test_settings(repository):
+
+    result = repository.run('settings')
+
+    assert 'storage' in result.std_out
+    assert 'full' in result.std_out
+
+
+def test_settings_change(repository):
+
+    repository.run('settings --name storage --value delta')
+
+    assert 'delta' == repository.repo.settings['storage']
+
+
+def test_settings_name_without_value(repository):
+
+    result = repository.run('settings --name storage', catch_exceptions=True)
+
+    expected = 'Error: --name and --value must be given together'
+
+    assert expected in result.std_out
+
+
+def test_settings_unknown(repository):
+
+    result = repository.run('settings --name unknown --value value', catch_exceptions=True)
+
+    expected = 'Error: Unknown setting: unknown'
+
+    assert expected in result.std_out
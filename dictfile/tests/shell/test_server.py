@@ -0,0 +1,206 @@
+# Copyright (c) 2018 Eli Polonsky. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#   * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   * See the License for the specific language governing permissions and
+#   * limitations under the License.
+#
+#############################################################################
+
+import os
+import socket
+import threading
+
+import pytest
+
+from dictfile.api import constants
+from dictfile.api import writer
+from dictfile.api.repository import Repository
+from dictfile.shell import server as dictfile_server
+from dictfile.shell.commands.serve import execute
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'),
+                                reason='Unix domain sockets are not supported')
+
+ALIAS = 'alias'
+
+
+@pytest.fixture(name='config_dir')
+def _config_dir(home_dir):
+
+    config_dir = os.path.join(home_dir, '.{0}'.format(constants.PROGRAM_NAME))
+
+    file_path = os.path.join(home_dir, 'file.json')
+    writer.dump(obj={'key1': 'value1'}, file_path=file_path, fmt=constants.JSON)
+    Repository(config_dir).add(alias=ALIAS, file_path=file_path, fmt=constants.JSON)
+
+    yield config_dir
+
+
+@pytest.fixture(name='server')
+def _server(config_dir):
+
+    server = dictfile_server.Server(path=dictfile_server.socket_path(config_dir),
+                                    execute=execute)
+    server.bind()
+
+    thread = threading.Thread(target=server.serve)
+    thread.start()
+
+    try:
+        yield server
+    finally:
+        server.close()
+        thread.join()
+
+
+def test_forward(server):
+
+    output, error, exit_code = dictfile_server.forward(
+        ['configure', ALIAS, 'get', '--key', 'key1'], path=server.path)
+
+    assert 'value1\n' == output
+    assert '' == error
+    assert 0 == exit_code
+
+
+def test_forward_keeps_state_fresh(server):
+
+    dictfile_server.forward(['configure', ALIAS, 'put', '--key', 'key1', '--value', 'value2'],
+                            path=server.path)
+
+    output, _, _ = dictfile_server.forward(['configure', ALIAS, 'get', '--key', 'key1'],
+                                           path=server.path)
+
+    assert 'value2\n' == output
+
+
+def test_forward_failure(server):
+
+    output, _, exit_code = dictfile_server.forward(
+        ['configure', 'unknown', 'get', '--key', 'key1'], path=server.path)
+
+    assert 'Error: Alias unknown not found' in output
+    assert 1 == exit_code
+
+
+def test_forward_error_output(server):
+
+    output, error, exit_code = dictfile_server.forward(
+        ['--profile', 'configure', ALIAS, 'get', '--key', 'key1'], path=server.path)
+
+    # each output is replayed by the client to its own stream
+    assert 'value1\n' == output
+    assert 'wall (ms)' in error
+    assert 0 == exit_code
+
+
+def test_forward_debug_logs(server, home_dir):
+
+    file_path = os.path.join(home_dir, 'other.json')
+    writer.dump(obj={'key2': 'value2'}, file_path=file_path, fmt=constants.JSON)
+
+    output, _, exit_code = dictfile_server.forward(
+        ['--debug', 'repository', 'add', '--alias', 'other', '--file-path', file_path,
+         '--fmt', 'json'], path=server.path)
+
+    # replayed by the client, rather than written to the output of the server
+    assert 'DEBUG - Verifying the file can be parsed to json' in output
+    assert 0 == exit_code
+
+
+def test_forward_usage_error(server):
+
+    _, error, exit_code = dictfile_server.forward(['unknown'], path=server.path)
+
+    assert 'No such command' in error
+    assert 2 == exit_code
+
+
+def test_forward_relative_path(server, home_dir):
+
+    writer.dump(obj={'key2': 'value2'},
+                file_path=os.path.join(home_dir, 'other.json'),
+                fmt=constants.JSON)
+
+    cwd = os.getcwd()
+    os.chdir(home_dir)
+    try:
+        _, _, exit_code = dictfile_server.forward(['repository', 'add', '--alias', 'other',
+                                                   '--file-path', 'other.json', '--fmt', 'json'],
+                                                  path=server.path)
+    finally:
+        os.chdir(cwd)
+
+    assert 0 == exit_code
+    assert os.path.join(home_dir, 'other.json') == Repository(
+        os.path.dirname(server.path)).path('other')
+
+
+def test_forward_no_server(config_dir):
+
+    path = dictfile_server.socket_path(config_dir)
+
+    assert dictfile_server.forward(['repository', 'files'], path=path) is None
+
+
+def test_forward_stale_socket(config_dir):
+
+    path = dictfile_server.socket_path(config_dir)
+
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()
+
+    assert dictfile_server.forward(['repository', 'files'], path=path) is None
+
+
+def test_forward_disabled(server, monkeypatch):
+
+    monkeypatch.setenv(dictfile_server.NO_SERVER_ENV_VAR, '1')
+
+    assert dictfile_server.forward(['repository', 'files'], path=server.path) is None
+
+
+@pytest.mark.parametrize("args", [['serve'],
+                                  ['--debug', 'serve'],
+                                  ['--profile-format', 'json', 'serve'],
+                                  ['configure', ALIAS, 'apply', '--operations', '-']])
+def test_forward_unsupported(server, args):
+
+    assert dictfile_server.forward(args, path=server.path) is None
+
+
+def test_forward_serve_argument(server):
+
+    output, _, exit_code = dictfile_server.forward(
+        ['configure', ALIAS, 'put', '--key', 'serve', '--value', 'serve'], path=server.path)
+
+    assert '' == output
+    assert 0 == exit_code
+
+
+def test_serve_after_client_went_away(server):
+
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.connect(server.path)
+    client.sendall(b'{"args": ["repository", "files"], "cwd": "/"}\n')
+    client.close()
+
+    _, _, exit_code = dictfile_server.forward(['configure', ALIAS, 'get', '--key', 'key1'],
+                                              path=server.path)
+
+    assert 0 == exit_code
+
+
+def test_bind_already_running(server):
+
+    with pytest.raises(RuntimeError):
+        dictfile_server.Server(path=server.path, execute=execute).bind()
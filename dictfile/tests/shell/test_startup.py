@@ -0,0 +1,89 @@
+#############################################################################
+# Copyright (c) 2018 Eli Polonsky. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#   * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   * See the License for the specific language governing permissions and
+#   * limitations under the License.
+#
+#############################################################################
+
+import subprocess
+import sys
+
+import pytest
+
+pytestmark = pytest.mark.skipif(sys.version_info < (3, 7),
+                                reason='-X importtime requires python 3.7 or later')
+
+MODULE = 'dictfile.shell.main'
+
+# the entry point of the installed command line, it forwards commands to a running server.
+CLIENT_MODULE = 'dictfile.client'
+
+# cumulative import time (in microseconds) allowed for the command line entry point.
+# loading every format backend eagerly used to cost well over 100ms.
+IMPORT_TIME_BUDGET = 80000
+
+# modules that must only be imported by the commands that need them.
+LAZY_MODULES = ['yaml', 'javaproperties', 'configparser', 'prettytable',
+                'dictfile.api.repository', 'dictfile.api.patcher']
+
+
+def _import_times(module=MODULE):
+
+    process = subprocess.Popen([sys.executable, '-X', 'importtime', '-c',
+                                'import {0}'.format(module)],
+                               stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE,
+                               universal_newlines=True)
+    _, err = process.communicate()
+
+    assert process.returncode == 0, err
+
+    times = {}
+
+    # import time: self [us] | cumulative | imported package
+    for line in err.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not cumulative.strip().isdigit():
+            # the header line
+            continue
+        times[name.strip()] = int(cumulative)
+
+    return times
+
+
+def test_lazy_modules():
+
+    imported = _import_times()
+
+    for module in LAZY_MODULES:
+        assert module not in imported
+
+
+def test_client_imports_only_the_standard_library():
+
+    imported = _import_times(CLIENT_MODULE)
+
+    assert [] == [module for module in imported if module.startswith('dictfile.shell')]
+    assert 'click' not in imported
+
+
+def test_import_time_budget():
+
+    # the first run also compiles byte code, and the
+    # minimum of a few runs filters out a noisy machine.
+    best = min(_import_times()[MODULE] for _ in range(4))
+
+    assert best < IMPORT_TIME_BUDGET, \
+        'Importing {0} took {1}us, the budget is {2}us'.format(MODULE, best, IMPORT_TIME_BUDGET)
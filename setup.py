@@ -36,14 +36,13 @@ setup(
     description="Command Line Interface for manipulating configuration files",
     entry_points={
         'console_scripts': [
-            '{0} = {0}.shell.main:app'.format(PROGRAM_NAME)
+            '{0} = {0}.client:main'.format(PROGRAM_NAME)
         ]
     },
     install_requires=[
         'click==6.7',
         'colorama==0.3.9',
         'coloredlogger==1.3.12',
-        'flatdict==3.0.0',
         'javaproperties==0.4.0',
         'prettytable==0.7.2',
         'PyYAML==5.1',